@@ -0,0 +1,77 @@
+import threading
+import time
+
+from app.collectors.mgmt_load import mgmt_load
+
+DEFAULT_SETTINGS = {
+    # Management CPU percent at or above which the device counts as busy
+    "busy_cpu": 80,
+    # CPU percent below which backoff starts to recover
+    "recover_cpu": 60,
+    # Cap on the backoff multiplier applied to an expensive collector's interval
+    "max_backoff": 8,
+}
+
+# Load samples older than this are ignored (e.g. system_resources_collector disabled)
+MAX_SAMPLE_AGE = 300
+
+
+class AdaptivePolicy:
+    """
+    Backs off expensive collectors while a firewall's management plane is busy.
+    - Each scrape, the device's backoff multiplier doubles while CPU >= busy_cpu
+      (up to max_backoff) and halves once CPU < recover_cpu
+    - With a multiplier above 1, an expensive collector runs only every
+      default_ttl * multiplier seconds; in between its last output is served
+    - Without a recent load sample nothing is backed off
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._backoff = {}
+        self._last = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def settings(device_config):
+        settings = device_config.get("adaptive_polling", {})
+        if settings is False:
+            return None
+        return {**DEFAULT_SETTINGS, **(settings or {})}
+
+    def update(self, host, device_config):
+        """
+        Adjust and return the device's backoff multiplier from its latest load.
+        """
+        settings = self.settings(device_config)
+        load = mgmt_load.get(host, max_age=MAX_SAMPLE_AGE)
+        with self._lock:
+            backoff = self._backoff.get(host, 1)
+            if settings is None or load is None:
+                backoff = 1
+            elif load[0] >= settings["busy_cpu"]:
+                backoff = min(backoff * 2, settings["max_backoff"])
+            elif load[0] < settings["recover_cpu"]:
+                backoff = max(backoff // 2, 1)
+            self._backoff[host] = backoff
+        return backoff
+
+    def cached(self, host, spec, backoff):
+        """
+        Return the collector's last output if it should be skipped this scrape, else None.
+        """
+        if backoff <= 1 or spec.cost != "expensive":
+            return None
+        with self._lock:
+            last = self._last.get((host, spec.name))
+        if last is None or self.clock() - last[0] >= spec.default_ttl * backoff:
+            return None
+        return last[1]
+
+    def record(self, host, spec, output):
+        """
+        Remember a successful run of an expensive collector.
+        """
+        if spec.cost == "expensive":
+            with self._lock:
+                self._last[(host, spec.name)] = (self.clock(), output)
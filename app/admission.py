@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Device priority classes, in the order queued requests are admitted
+PRIORITIES = ("critical", "normal", "low")
+DEFAULT_PRIORITY = "normal"
+DEFAULT_MAX_QUEUE_SECONDS = 5.0
+
+
+class Shed(Exception):
+    """
+    A request was not admitted; reason is "overloaded" or "queue_timeout".
+    """
+
+    def __init__(self, reason):
+        super().__init__(f"request shed: {reason}")
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Global cap on /metrics requests being served by this worker.
+    - Up to max_in_flight requests run; the rest queue for at most
+      max_queue_seconds (or the scrape's own timeout, if shorter)
+    - A freed slot goes to the oldest waiter of the highest priority class
+    - low priority requests never queue: they are shed when no slot is free
+    - max_in_flight=0 admits everything
+    """
+
+    def __init__(self, max_in_flight=0, max_queue_seconds=DEFAULT_MAX_QUEUE_SECONDS):
+        self.max_in_flight = max_in_flight
+        self.max_queue_seconds = max_queue_seconds
+        self.in_flight = 0
+        self.shed = Counter()
+        self._waiters = {priority: deque() for priority in PRIORITIES}
+        self._lock = threading.Lock()
+
+    def _queued(self):
+        return any(self._waiters.values())
+
+    def acquire(self, priority=DEFAULT_PRIORITY, timeout=None):
+        """
+        Take a slot or raise Shed. timeout caps the queue time further.
+        """
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._queued():
+                self.in_flight += 1
+                return
+            if priority == "low":
+                self.shed[(priority, "overloaded")] += 1
+                raise Shed("overloaded")
+            waiter = threading.Event()
+            self._waiters[priority].append(waiter)
+        limit = self.max_queue_seconds if timeout is None else min(timeout, self.max_queue_seconds)
+        if waiter.wait(limit):
+            return
+        with self._lock:
+            # The slot may have been handed over just as the wait timed out
+            if waiter.is_set():
+                return
+            self._waiters[priority].remove(waiter)
+            self.shed[(priority, "queue_timeout")] += 1
+        raise Shed("queue_timeout")
+
+    def release(self):
+        with self._lock:
+            for priority in PRIORITIES:
+                if self._waiters[priority]:
+                    self._waiters[priority].popleft().set()
+                    return
+            self.in_flight -= 1
+
+    @contextmanager
+    def admit(self, priority=DEFAULT_PRIORITY, timeout=None):
+        """
+        Hold a slot for the duration of the block; raises Shed if none is granted.
+        """
+        if not self.max_in_flight:
+            yield
+            return
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self):
+        """
+        Prometheus text for this worker's in-flight and shed request counts.
+        """
+        with self._lock:
+            in_flight = self.in_flight
+            queued = sum(len(waiters) for waiters in self._waiters.values())
+            shed = dict(self.shed)
+        lines = [
+            "# HELP panos_exporter_requests_in_flight /metrics requests being served\n"
+            "# TYPE panos_exporter_requests_in_flight gauge\n"
+            f"panos_exporter_requests_in_flight {in_flight}\n"
+            "# HELP panos_exporter_requests_queued /metrics requests waiting for a slot\n"
+            "# TYPE panos_exporter_requests_queued gauge\n"
+            f"panos_exporter_requests_queued {queued}\n"
+            "# HELP panos_exporter_requests_shed_total Requests shed by admission control\n"
+            "# TYPE panos_exporter_requests_shed_total counter\n"
+        ]
+        for priority in PRIORITIES:
+            for reason in ("overloaded", "queue_timeout"):
+                count = shed.get((priority, reason), 0)
+                lines.append(
+                    f'panos_exporter_requests_shed_total{{priority="{priority}",'
+                    f'reason="{reason}"}} {count}\n'
+                )
+        return "".join(lines)
+
+
+def scrape_timeout(headers, margin=0.5):
+    """
+    Seconds Prometheus will wait for this scrape (X-Prometheus-Scrape-Timeout-Seconds),
+    less a margin, or None if the header is missing.
+    """
+    value = headers.get("X-Prometheus-Scrape-Timeout-Seconds")
+    try:
+        return max(0.0, float(value) - margin) if value else None
+    except ValueError:
+        return None
+
+
+class LastOutput:
+    """
+    Most recent successful output per target, served when a request is shed.
+    """
+
+    def __init__(self):
+        self._outputs = {}
+
+    def put(self, target, output):
+        self._outputs[target] = (time.time(), output)
+
+    def get(self, target):
+        return self._outputs.get(target)
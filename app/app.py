@@ -1,19 +1,34 @@
 """
 Flask entry point for panos_exporter.
 - Serves /metrics endpoint for Prometheus
+- Serves snapshots from the poller process when SNAPSHOT_DIR is set
+- Redirects devices owned by another replica when sharded (SHARD_REPLICAS)
+- Serves the device-to-replica map for Prometheus http_sd_configs at /sd
+- Serves /debug/* endpoints when DEBUG_ENDPOINTS is set
+- Sheds live scrapes beyond ADMISSION_MAX_IN_FLIGHT, by device priority
 - Handles config loading, logging, and debug mode
 """
 
 import logging
+import multiprocessing
 import os
+import threading
+import time
+from urllib.parse import urlencode
 
 import urllib3
-from flask import Flask, Response, jsonify, request
+from flask import Flask, Response, jsonify, redirect, request
 
+from app.admission import DEFAULT_PRIORITY, AdmissionController, LastOutput, Shed, scrape_timeout
 from app.config_loader import ConfigLoader
 from app.exporter import Exporter
+from app.flight_recorder import flight_recorder
+from app.profiling import profile_in_subprocess
+from app.sharding import shard_from_env
+from app.snapshot_store import SnapshotStore
 
 DEBUG = os.environ.get("DEBUG", "0").lower() in ("1", "true", "yes")
+DEBUG_ENDPOINTS = os.environ.get("DEBUG_ENDPOINTS", "0").lower() in ("1", "true", "yes")
 logging.basicConfig(
     level=logging.DEBUG if DEBUG else logging.INFO,
     format="%(asctime)s %(levelname)s %(name)s %(message)s",
@@ -25,7 +40,193 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 app = Flask(__name__)
 config_loader = ConfigLoader("config.yaml")
 config = config_loader.load()
-exporter = Exporter(config)
+
+# With a poller process (POLLER=1) workers only serve its snapshots
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR")
+snapshot_store = SnapshotStore(SNAPSHOT_DIR) if SNAPSHOT_DIR else None
+exporter = None if snapshot_store else Exporter(config)
+shard = shard_from_env()
+
+# Live scrapes beyond the in-flight limit queue briefly, then get the target's last
+# output (ADMISSION_SHED_RESPONSE=snapshot) or a 503
+admission = AdmissionController(
+    max_in_flight=int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "0") or 0),
+    max_queue_seconds=float(os.environ.get("ADMISSION_QUEUE_SECONDS", "5") or 5),
+)
+SHED_RESPONSE = os.environ.get("ADMISSION_SHED_RESPONSE", "snapshot").lower()
+last_output = LastOutput() if admission.max_in_flight and SHED_RESPONSE == "snapshot" else None
+
+# One profiled scrape at a time per worker
+profile_lock = threading.Lock()
+
+
+def serve_snapshot(target):
+    """
+    Serve the poller's latest snapshot for target, with its age appended.
+    """
+    snapshot = snapshot_store.read_snapshot(target)
+    if snapshot is None:
+        logger.warning(f"No snapshot yet for target={target}")
+        return jsonify({"error": f"No snapshot yet for target: {target}"}), 503
+    age = (
+        "# HELP panos_exporter_snapshot_age_seconds Age of the served snapshot\n"
+        "# TYPE panos_exporter_snapshot_age_seconds gauge\n"
+        f"panos_exporter_snapshot_age_seconds {max(0.0, time.time() - snapshot.timestamp):.3f}\n"
+        "# HELP panos_exporter_snapshot_stale 1 if the snapshot was restored from warm state\n"
+        "# TYPE panos_exporter_snapshot_stale gauge\n"
+        f"panos_exporter_snapshot_stale {int(snapshot.restored)}\n"
+    )
+    return Response(snapshot.payload + age.encode(), mimetype="text/plain")
+
+
+def shed(target, reason):
+    """
+    Response for a shed scrape: the target's last good output, if kept, else a fast 503.
+    """
+    cached = last_output.get(target) if last_output is not None else None
+    logger.warning(f"Shed scrape of target={target}: {reason}")
+    if cached is None:
+        response = jsonify({"error": f"Overloaded ({reason})", "target": target})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
+    timestamp, output = cached
+    age = (
+        "# HELP panos_exporter_snapshot_age_seconds Age of the served snapshot\n"
+        "# TYPE panos_exporter_snapshot_age_seconds gauge\n"
+        f"panos_exporter_snapshot_age_seconds {max(0.0, time.time() - timestamp):.3f}\n"
+    )
+    return Response(output + age + admission.metrics(), mimetype="text/plain")
+
+
+def check_target(target):
+    """
+    Raise ValueError unless target is a configured device or, with Panoramas
+    configured, a firewall serial known to the exporter or the poller. Until the
+    poller has published its targets, serials are accepted (and get a 503).
+    """
+    if target in config["devices"] or not config.get("panoramas"):
+        config_loader.get_device(target)
+    elif snapshot_store is not None:
+        targets = snapshot_store.read_targets()
+        if targets is not None and target not in targets:
+            raise ValueError(f"Target {target} is not managed by a configured Panorama")
+    else:
+        exporter.device_config(target)
+
+
+def all_targets():
+    """
+    Every device the exporter knows about, including Panorama-managed serials.
+    With a poller, its published target list (config devices until the first cycle).
+    """
+    if exporter is not None:
+        return exporter.targets()
+    targets = snapshot_store.read_targets()
+    return list(config["devices"]) if targets is None else targets
+
+
+def misdirected(target):
+    """
+    Response for a target owned by another replica: a 307 redirect to the owner,
+    or a 421 Misdirected Request naming it.
+    """
+    owner = shard.ring.owner(target)
+    location = f"{request.scheme}://{owner}/metrics?{urlencode({'target': target})}"
+    logger.info(f"target={target} is owned by replica {owner}")
+    if shard.misdirected == "421":
+        response = jsonify({"error": f"Target {target} is owned by {owner}", "owner": owner})
+        response.status_code = 421
+        response.headers["Location"] = location
+        return response
+    return redirect(location, code=307)
+
+
+@app.route("/sd")
+def service_discovery():
+    """
+    Prometheus http_sd_configs endpoint: one target group per replica, with the
+    owning replica in the __meta_panos_exporter_replica label.
+    """
+    targets = all_targets()
+    if shard is None:
+        owners = {request.host: targets}
+    else:
+        owners = shard.ring.assignments(targets)
+    return jsonify(
+        [
+            {"targets": devices, "labels": {"__meta_panos_exporter_replica": replica}}
+            for replica, devices in owners.items()
+            if devices
+        ]
+    )
+
+
+@app.route("/debug/profile")
+def debug_profile():
+    """
+    Profile one scrape of target in a separate process: hottest functions, top
+    allocation sites and the fetch/parse/render breakdown per collector.
+    Requires DEBUG_ENDPOINTS=1.
+    Query params: target, limit (entries per list, default 20)
+    """
+    if not DEBUG_ENDPOINTS:
+        return jsonify({"error": "Not found"}), 404
+    target = request.args.get("target")
+    if not target:
+        return jsonify({"error": "Missing target parameter"}), 400
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not profile_lock.acquire(blocking=False):
+        return jsonify({"error": "A profile is already running"}), 429
+    try:
+        try:
+            check_target(target)
+        except ValueError:
+            return jsonify({"error": f"Unknown target: {target}"}), 400
+        # Serving snapshots, the worker has no exporter: the child builds its own and
+        # does any Panorama discovery itself
+        state = exporter.export_state() if exporter is not None else {}
+        logger.info(f"Profiling scrape of target={target}")
+        try:
+            report = profile_in_subprocess(config, state, target, limit)
+        except multiprocessing.TimeoutError:
+            return jsonify({"error": "Profile timed out"}), 504
+        return jsonify(report)
+    finally:
+        profile_lock.release()
+
+
+@app.route("/debug/scrapes")
+def debug_scrapes():
+    """
+    The target's last scrapes from the flight recorder, newest first: start time,
+    per-collector fetch/parse/render seconds, response bytes, series, retries and
+    errors. Requires DEBUG_ENDPOINTS=1. Query param: target
+    """
+    if not DEBUG_ENDPOINTS:
+        return jsonify({"error": "Not found"}), 404
+    target = request.args.get("target")
+    if not target:
+        return jsonify({"error": "Missing target parameter"}), 400
+    if snapshot_store is not None:
+        # Scrapes run in the poller, which publishes its records next to the snapshots
+        scrapes = snapshot_store.read_scrapes(target) or []
+    else:
+        scrapes = flight_recorder.scrapes(target)
+    return jsonify({"target": target, "size": flight_recorder.size, "scrapes": scrapes})
+
+
+@app.route("/ready")
+def ready():
+    """
+    Readiness probe: with a poller, ready once it has loaded its warm state.
+    """
+    if snapshot_store is not None and not snapshot_store.is_ready():
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True})
 
 
 @app.route("/metrics")
@@ -40,14 +241,29 @@ def metrics():
     if not target:
         logger.warning("Missing target parameter")
         return jsonify({"error": "Missing target parameter"}), 400
+    if shard is not None and not shard.owns(target):
+        return misdirected(target)
     try:
-        config_loader.get_device(target)
+        check_target(target)
     except ValueError as e:
         logger.warning(f"Unknown target: {target}")
         return jsonify({"error": f"Unknown target: {target}"}, debug=str(e) if DEBUG else None), 400
+    if snapshot_store is not None:
+        return serve_snapshot(target)
+    priority = exporter.device_config(target).get("priority", DEFAULT_PRIORITY)
+    # Prometheus gives up after its scrape timeout, including time spent queued here
+    timeout = scrape_timeout(request.headers)
+    deadline = time.monotonic() + timeout if timeout is not None else None
     try:
-        output = exporter.collect_metrics(target)
+        with admission.admit(priority, timeout=timeout):
+            output = exporter.collect_metrics(target, deadline=deadline)
+        if last_output is not None and f'panos_up{{device="{target}"}} 1' in output:
+            last_output.put(target, output)
+        if admission.max_in_flight:
+            output += admission.metrics()
         return Response(output, mimetype="text/plain")
+    except Shed as e:
+        return shed(target, e.reason)
     except Exception as e:
         logger.exception(f"Exporter error for target={target}")
         if DEBUG:
@@ -0,0 +1,106 @@
+"""
+Command line tools for panos_exporter.
+
+    python -m app.cli scrape --replay DIR --target X [--repeat N] [--config config.yaml]
+
+Runs the full collect and render pipeline against a corpus recorded with
+PANOS_RECORD_DIR, without network access, and prints timing and memory.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from app.collectors import context
+from app.collectors.context import SessionPool
+from app.collectors.recording import ReplaySession
+from app.collectors.tracing import tracing
+from app.config_loader import ConfigLoader
+from app.exporter import Exporter
+
+
+def _load_config(path, target, collectors):
+    """
+    Use the device's entry from config.yaml when available, else a bare device
+    (replayed requests need no credentials).
+    """
+    config = {"devices": {target: {"username": "", "password": ""}}}
+    if path and os.path.exists(path):
+        loaded = ConfigLoader(path).load()
+        if target in loaded.get("devices", {}):
+            config = {**loaded, "devices": {target: loaded["devices"][target]}}
+        else:
+            config.update({k: v for k, v in loaded.items() if k not in ("devices", "panoramas")})
+    if collectors:
+        config["collectors"] = collectors
+    return config
+
+
+def scrape(args):
+    context.session_pool = SessionPool(factory=lambda: ReplaySession(args.replay, args.latency))
+    exporter = Exporter(_load_config(args.config, args.target, args.collectors))
+    timings = []
+    phases = {}
+    tracemalloc.start()
+    for _ in range(args.repeat):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        with tracing() as trace:
+            started = time.perf_counter()
+            output = exporter.collect_metrics(args.target)
+            timings.append(time.perf_counter() - started)
+        _, peak = tracemalloc.get_traced_memory()
+        for name, values in trace.breakdown().items():
+            for phase, seconds in values.items():
+                phases.setdefault(name, {}).setdefault(phase, []).append(seconds)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if args.print_metrics:
+        sys.stdout.write(output)
+    series = sum(1 for line in output.splitlines() if line and not line.startswith("#"))
+    steady = timings[1:] or timings
+    print(f"target: {args.target}  repeats: {args.repeat}  collectors: {len(exporter.collectors)}")
+    print(f"output: {len(output)} bytes, {series} series")
+    print(
+        f"scrape: first {timings[0] * 1000:.2f} ms, "
+        f"steady mean {statistics.mean(steady) * 1000:.2f} ms, "
+        f"min {min(steady) * 1000:.2f} ms, max {max(steady) * 1000:.2f} ms"
+    )
+    print(f"memory: last scrape peak {peak - baseline} bytes, retained {retained} bytes")
+    columns = ("total", "fetch", "parse", "render")
+    print(f"{'collector':<48} " + " ".join(f"{p:>9}" for p in columns) + "  (mean ms)")
+    for name, values in phases.items():
+        cells = " ".join(f"{statistics.mean(values[p]) * 1000:>9.3f}" for p in columns)
+        print(f"{name:<48} {cells}")
+    return 0 if 'panos_up{device="' + args.target + '"} 1' in output else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scrape_parser = commands.add_parser("scrape", help="Run one target's scrape offline")
+    scrape_parser.add_argument("--replay", required=True, help="Recorded corpus directory")
+    scrape_parser.add_argument("--target", required=True, help="Device as recorded")
+    scrape_parser.add_argument("--repeat", type=int, default=1, help="Number of scrapes")
+    scrape_parser.add_argument("--config", default="config.yaml", help="Device settings")
+    scrape_parser.add_argument("--collectors", nargs="+", help="Collectors to run")
+    scrape_parser.add_argument(
+        "--latency", action="store_true", help="Delay responses by their recorded fetch time"
+    )
+    scrape_parser.add_argument(
+        "--print-metrics", action="store_true", help="Print the last scrape's output"
+    )
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s %(message)s")
+    return scrape(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
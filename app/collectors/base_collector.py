@@ -1,53 +1,280 @@
+import contextvars
 import logging
 import re
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 
-import requests
-from requests.adapters import HTTPAdapter, Retry
+from . import context, recording
+from .capabilities import (
+    DEFAULT_REPROBE_INTERVAL,
+    Unsupported,
+    capabilities,
+    command_name,
+    reprobe_interval,
+    unsupported_reason,
+)
+from .context import ScrapeContext
+from .limiter import device_limiter
+from .limits import LimitExceeded, ScrapeBudget, check_prolog, read_body, response_limit
+from .parse_cache import ParseCache
+from .series_cache import SeriesCache
+from .tracing import current_trace, traced_collector
+
+
+def _retries(response):
+    """
+    Retries urllib3 made for this response under the session's Retry policy.
+    """
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    return len(getattr(retries, "history", None) or ())
 
 
 class BaseCollector(ABC):
     """
     Base class for PAN-OS collectors.
+    - Instances are immutable definitions shared by all threads
+    - Per-call state (device, command, session, deadline) lives in a ScrapeContext
     - Handles XML API call with retries and error logging
+    - Every API call waits for a slot from the per-device limiter
+    - Response bodies are streamed under a size cap and the scrape's memory budget
     - Parses XML and emits Prometheus metrics
+    - Commands the device rejects as unsupported are skipped for a while (see Capabilities)
+    - Output is reused while a response is byte-for-byte unchanged (see ParseCache);
+      collectors whose parse() has side effects set cache_parse = False
     - Subclasses must implement parse()
     """
 
+    cache_parse = True
+
     def __init__(self, name, api_command, help_text):
         self.name = name
         self.api_command = api_command
         self.help_text = help_text
         self.logger = logging.getLogger(f"panos_exporter.{self.name}")
-        # Set up a session with retries
-        self.session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
+        self._series_caches = {}
+        self._parse_caches = {}
+
+    def series_cache(self, device):
+        """
+        Return the rendered-series cache for a device, creating it on first use.
+        """
+        cache = self._series_caches.get(device)
+        if cache is None:
+            cache = self._series_caches.setdefault(device, SeriesCache())
+        return cache
+
+    def parse_cache(self, device):
+        """
+        Return the parsed-output cache for a device, creating it on first use.
+        """
+        cache = self._parse_caches.get(device)
+        if cache is None:
+            cache = self._parse_caches.setdefault(device, ParseCache())
+        return cache
+
+    def probing_enabled(self, device_config):
+        """
+        Whether unsupported commands are skipped; not when the device forces
+        this collector on with collector_overrides.
+        """
+        return (device_config.get("collector_overrides") or {}).get(self.name) is not True
+
+    def parse_cache_enabled(self, device_config):
+        return self.cache_parse and device_config.get("parse_cache", True)
+
+    def parse_cached(self, ctx, xml_data, parse=None, key=None):
+        """
+        Return parse(xml_data, device_config) (default: self.parse), reusing the
+        output of the last response for the same key (default: the command) if
+        the raw response has not changed since.
+        """
+        parse = parse or self.parse
+        if not self.parse_cache_enabled(ctx.device_config):
+            return parse(xml_data, ctx.device_config)
+        return self.parse_cache(ctx.host).output(
+            (key or ctx.command, parse.__name__),
+            xml_data,
+            lambda: parse(xml_data, ctx.device_config),
+            reuse=self.series_cache(ctx.host).touch,
+        )
+
+    def command(self, device_config):
+        """
+        Return the op command for a device. Override for per-device commands.
+        """
+        return self.api_command
+
+    def default_commands(self):
+        """
+        Op commands one scrape issues with default device settings, for schedulers.
+        Override when scrape() sends more than command().
+        """
+        return [self.command({})]
+
+    def collect(self, device_config, deadline=None, budget=None):
+        """
+        Run one scrape of the device and return Prometheus-formatted metrics.
+        A session is checked out of the shared pool for the duration of the call.
+        Rendered series not produced by this scrape are evicted from the device's cache.
+        budget is the ScrapeBudget shared by all collectors of the device scrape.
+        """
+        if budget is None:
+            budget = ScrapeBudget()
+        trace = current_trace()
+        if trace is not None:
+            started = time.perf_counter()
+            try:
+                with traced_collector(self.name):
+                    return self._collect(device_config, deadline, budget)
+            finally:
+                trace.add(self.name, "total", time.perf_counter() - started)
+        return self._collect(device_config, deadline, budget)
+
+    def _collect(self, device_config, deadline, budget):
+        with context.session_pool.acquire(
+            device_config.get("api_host", device_config["host"])
+        ) as session:
+            ctx = ScrapeContext(
+                device_config=device_config,
+                session=session,
+                command=self.command(device_config),
+                deadline=deadline,
+                budget=budget,
+            )
+            with self.series_cache(ctx.host).scrape():
+                return self.scrape(ctx)
 
-    def collect(self, device_config):
+    def scrape(self, ctx):
         """
         Calls the PAN-OS XML API with retries and returns parsed metrics.
         Logs errors and emits Prometheus error metrics on failure.
         """
-        url = f"https://{device_config['host']}/api/"
+        try:
+            xml_data = self.fetch(ctx)
+            return self.parse_cached(ctx, xml_data)
+        except Unsupported as e:
+            self.logger.debug(f"Skipped on device={ctx.host}: {e}")
+            return ""
+        except Exception as e:
+            self.logger.error(f"HTTP error for device={ctx.host}: {e}")
+            return self.prometheus_error_metric(ctx.host, str(e))
+
+    def fetch(self, ctx, cmd=None):
+        """
+        Run a single op command (default: ctx.command) and return the raw XML text.
+        Raises on HTTP errors or when the scrape deadline has passed, including
+        while queued for one of the device's request slots, and LimitExceeded when
+        the response is too large, over the scrape budget or declares a DOCTYPE.
+        Raises Unsupported, without sending it, for a command the device rejected
+        recently, and when the device rejects it now; RuntimeError instead when
+        this collector is not probed (forced on, or capability_reprobe_interval 0).
+        """
+        device_config = ctx.device_config
+        command = cmd or ctx.command
+        probing = self.probing_enabled(device_config)
+        if probing:
+            reason = capabilities.skipped(ctx.host, self.name, command)
+            if reason is not None:
+                raise Unsupported(f"{command_name(command)}: {reason}")
+        url = f"https://{ctx.api_host}/api/"
         params = {
             "type": "op",
-            "cmd": self.api_command,
+            "cmd": command,
             "key": device_config.get("api_key"),
         }
+        # Requests proxied through Panorama are routed by the firewall's serial
+        if device_config.get("target_serial"):
+            params["target"] = device_config["target_serial"]
+        trace = current_trace()
+        started = time.perf_counter()
+        budget = ctx.budget if ctx.budget is not None else ScrapeBudget()
         try:
-            response = self.session.get(
-                url,
-                params=params,
-                verify=False,
-                timeout=5,
-                auth=(device_config["username"], device_config["password"]),
-            )
+            with device_limiter.slot(ctx):
+                response = ctx.session.get(
+                    url,
+                    params=params,
+                    verify=False,
+                    timeout=ctx.timeout(),
+                    auth=(device_config["username"], device_config["password"]),
+                    stream=True,
+                )
+                text, size = read_body(response, response_limit(self.name, device_config), budget)
+            elapsed = time.perf_counter() - started
+            if trace is not None:
+                trace.add(self.name, "fetch", elapsed)
+                trace.count(self.name, "requests")
+                trace.count(self.name, "response_bytes", size)
+                trace.count(self.name, "retries", _retries(response))
             response.raise_for_status()
-            return self.parse(response.text, device_config)
+            check_prolog(text)
         except Exception as e:
-            self.logger.error(f"HTTP error for device={device_config['host']}: {e}")
-            return self.prometheus_error_metric(device_config["host"], str(e))
+            if isinstance(e, LimitExceeded):
+                budget.record(self.name, e.kind)
+            if trace is not None:
+                trace.error(self.name, str(e))
+            raise
+        recording.record(ctx.host, params["cmd"], text, elapsed)
+        reason = unsupported_reason(text)
+        if reason is not None:
+            message = f"{command_name(command)}: {reason}"
+            interval = reprobe_interval(
+                reason, device_config.get("capability_reprobe_interval", DEFAULT_REPROBE_INTERVAL)
+            )
+            if not (probing and interval):
+                # Not skipped (forced on or caching off): report it like any other failure
+                if trace is not None:
+                    trace.error(self.name, message)
+                raise RuntimeError(message)
+            self.logger.info(
+                f"{command_name(command)} unsupported on device={ctx.host}, "
+                f"re-probing in {interval}s: {reason}"
+            )
+            capabilities.mark_unsupported(ctx.host, self.name, command, reason, interval)
+            raise Unsupported(message)
+        return text
+
+    def fetch_concurrently(self, ctx, cmds):
+        """
+        Fetch several op commands in parallel, each on its own pooled session,
+        with at most the device's request limit in flight.
+        Returns (xml_data, error) pairs in command order.
+        """
+
+        def fetch_one(cmd):
+            with context.session_pool.acquire(ctx.api_host) as session:
+                return self._fetch_or_error(replace(ctx, session=session), cmd)
+
+        limit = device_limiter.limit_for(ctx.device_config)
+        if ctx.api_host != ctx.host:
+            # Proxied through Panorama: its session pool is shared by all firewalls and
+            # capped, so reuse the scrape's session instead of checking out more
+            return [self._fetch_or_error(ctx, cmd) for cmd in cmds]
+        if len(cmds) <= 1 or limit <= 1:
+            return [fetch_one(cmd) for cmd in cmds]
+        # Each worker runs in a copy of this context so scrape tracing follows the fetch
+        contexts = [contextvars.copy_context() for _ in cmds]
+        with ThreadPoolExecutor(max_workers=min(limit, len(cmds))) as pool:
+            return list(pool.map(lambda c, cmd: c.run(fetch_one, cmd), contexts, cmds))
+
+    def _fetch_or_error(self, ctx, cmd):
+        try:
+            return self.fetch(ctx, cmd), None
+        except Exception as e:
+            return None, e
+
+    def export_state(self):
+        """
+        Return JSON-serializable state worth keeping across restarts, or None.
+        """
+        return None
+
+    def import_state(self, state):
+        """
+        Restore state previously returned by export_state().
+        """
+        return None
 
     @abstractmethod
     def parse(self, xml_data, device_config):
@@ -61,18 +288,13 @@ class BaseCollector(ABC):
     ):
         """
         Format a Prometheus metric line with HELP/TYPE and labels.
+        Headers and `name{labels}` prefixes come from the device's series cache,
+        so only the value is formatted for series seen on earlier scrapes.
         Do not emit an 'instance' or 'device' label.
         """
-        help_text = help_text or self.help_text
-        if labels:
-            label_str = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
-        else:
-            label_str = ""
-        return (
-            f"# HELP {metric} {help_text}\n"
-            f"# TYPE {metric} {metric_type}\n"
-            f"{metric}{label_str} {value}\n"
-        )
+        cache = self.series_cache(device)
+        header = cache.header(metric, help_text or self.help_text, metric_type)
+        return f"{header}{cache.prefix(metric, labels)} {value}\n"
 
     def prometheus_error_metric(self, device, error):
         """
@@ -0,0 +1,192 @@
+"""
+Aggregated views of BGP loc-rib-detail and rib-out-detail output.
+Routes are streamed member by member into per-VR counters and histograms,
+so the rendered series depend on VRs, peers and buckets, never on RIB size.
+split_members cuts the same output into per-route chunks for incremental parsing.
+"""
+
+import re
+from bisect import bisect_left
+from collections import Counter
+from xml.sax.saxutils import unescape
+
+from . import xml_backend
+from .field_schema import to_int
+
+# Histogram upper bounds (le); every histogram also has +Inf
+PREFIX_LENGTH_BUCKETS = {
+    "ipv4": (8, 12, 16, 18, 20, 22, 23, 24, 28, 32),
+    "ipv6": (16, 24, 32, 36, 40, 44, 46, 48, 56, 64, 128),
+}
+AS_PATH_LENGTH_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 15, 20)
+MED_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+LOCAL_PREFERENCE_BUCKETS = (0, 50, 80, 90, 100, 110, 120, 150, 200, 300, 500, 1000)
+
+# An AS_SET counts as one hop; confederation segments do not count
+_AS_PATH_SEGMENT = re.compile(r"\{[^}]*\}|\([^)]*\)|\S+")
+
+_RIB_REGIONS = re.compile(r"<entry\b([^>]*)>|<(loc-rib|rib-out)>(.*?)</\2>", re.S)
+_VR_ATTR = re.compile(r'\bvr="([^"]*)"')
+_MEMBER = re.compile(r"<member>.*?</member>", re.S)
+
+# kind: (RIB element, peer field, state label, state of a member)
+RIB_KINDS = {
+    "loc_rib": (
+        "loc-rib",
+        "received-from",
+        "best",
+        lambda member: "yes" if "*" in (member.findtext("flag") or "") else "no",
+    ),
+    "rib_out": (
+        "rib-out",
+        "peer",
+        "advertise_status",
+        lambda member: member.findtext("advertise-status") or "unknown",
+    ),
+}
+
+
+def as_path_length(as_path):
+    """
+    Number of AS hops in a PAN-OS as-path string, e.g. "65001 {65002 65003}" -> 2.
+    """
+    return sum(1 for segment in _AS_PATH_SEGMENT.findall(as_path) if segment[0] != "(")
+
+
+class Histogram:
+    """
+    Cumulative-on-render Prometheus histogram over fixed buckets.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative(self):
+        """
+        Yield (le, cumulative count) pairs, ending with "+Inf".
+        """
+        total = 0
+        for le, count in zip(self.buckets + ("+Inf",), self.counts, strict=True):
+            total += count
+            yield le, total
+
+
+class RouteCounts:
+    """
+    Route counts and distributions for one VR.
+    - routes: {state: n}
+    - peer_routes: {(peer, state): n}
+    - histograms: {(name, afi or None): Histogram}
+    """
+
+    def __init__(self):
+        self.routes = Counter()
+        self.peer_routes = Counter()
+        self.histograms = {}
+
+    def observe(self, name, afi, buckets, value):
+        histogram = self.histograms.get((name, afi))
+        if histogram is None:
+            histogram = self.histograms[(name, afi)] = Histogram(buckets)
+        histogram.observe(value)
+
+    def merge(self, other):
+        self.routes.update(other.routes)
+        self.peer_routes.update(other.peer_routes)
+        for key, histogram in other.histograms.items():
+            if key in self.histograms:
+                self.histograms[key].merge(histogram)
+            else:
+                self.histograms[key] = histogram
+
+
+class RibAggregate:
+    """
+    Streams loc-rib-detail or rib-out-detail responses into per-VR RouteCounts.
+    kind is a key of RIB_KINDS.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rib_tag, self.peer_field, self.state_label, self._state = RIB_KINDS[kind]
+        self.by_vr = {}
+
+    def add_response(self, xml_data):
+        """
+        One pass over the response: route members (direct children of the RIB
+        element, not list members nested inside a route) are counted as they
+        complete and attributed to their VR when its <entry> closes.
+        Returns routes seen.
+        """
+        pending = RouteCounts()
+        seen = 0
+        for elem in xml_backend.iterparse(
+            xml_data, ("member", "entry"), parents={"member": self.rib_tag, "entry": "result"}
+        ):
+            if elem.tag == "entry":
+                vr = elem.get("vr", "unknown")
+                self.by_vr.setdefault(vr, RouteCounts()).merge(pending)
+                pending = RouteCounts()
+            else:
+                self.add_member(pending, elem)
+                seen += 1
+            elem.clear()
+        return seen
+
+    def add_member(self, counts, member):
+        state = self._state(member)
+        counts.routes[state] += 1
+        counts.peer_routes[(member.findtext(self.peer_field) or "unknown", state)] += 1
+        prefix = member.findtext("prefix") or ""
+        length = to_int(prefix.rpartition("/")[2]) if "/" in prefix else None
+        if length is not None:
+            afi = "ipv6" if ":" in prefix else "ipv4"
+            counts.observe("prefix_length", afi, PREFIX_LENGTH_BUCKETS[afi], length)
+        as_path = member.findtext("as-path")
+        if as_path is not None:
+            counts.observe("as_path_length", None, AS_PATH_LENGTH_BUCKETS, as_path_length(as_path))
+        for name, path, buckets in (
+            ("med", "attr/med", MED_BUCKETS),
+            ("local_preference", "attr/local-preference", LOCAL_PREFERENCE_BUCKETS),
+        ):
+            value = to_int(member.findtext(path))
+            if value is not None:
+                counts.observe(name, None, buckets, value)
+
+
+def split_members(xml_data, element):
+    """
+    Split loc-rib-detail or rib-out-detail output into (vr, member XML) chunks,
+    in document order, without parsing it. element is "loc-rib" or "rib-out".
+    Returns None if the members cannot be cut out safely (nested or empty
+    members), in which case the response has to be parsed as a whole.
+    """
+    chunks = []
+    vr = "unknown"
+    for match in _RIB_REGIONS.finditer(xml_data):
+        if match.group(1) is not None:
+            attr = _VR_ATTR.search(match.group(1))
+            vr = unescape(attr.group(1), {"&quot;": '"', "&apos;": "'"}) if attr else "unknown"
+            continue
+        if match.group(2) != element:
+            continue
+        region = match.group(3)
+        members = _MEMBER.findall(region)
+        if region.count("<member") != len(members):
+            return None
+        chunks.extend((vr, member) for member in members)
+    return chunks
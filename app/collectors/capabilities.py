@@ -0,0 +1,174 @@
+import re
+import threading
+import time
+
+# Seconds an unsupported command is skipped before it is sent again
+DEFAULT_REPROBE_INTERVAL = 3600
+# Shorter re-probe for rejections caused by current configuration, which may change any time
+NOT_CONFIGURED_REPROBE_INTERVAL = 60
+
+# Collectors a model family cannot serve: (model prefixes, collector, reason)
+MODEL_RULES = ((("PA-VM", "PA-CTNR"), "system_environmentals_collector", "no hardware sensors"),)
+
+# PAN-OS rejects commands it does not know or cannot run with an error response, e.g.
+# <response status="error" code="17"><msg><line>show -> foo  is unexpected</line></msg>
+_ERROR_RESPONSE = re.compile(r"<response\b[^>]*\bstatus=[\"']error[\"']")
+_UNSUPPORTED = re.compile(
+    r"is unexpected|invalid syntax|unknown command|not supported|not (?:configured|enabled)",
+    re.I,
+)
+_NOT_CONFIGURED = re.compile(r"not (?:configured|enabled)", re.I)
+_MESSAGE = re.compile(r"<(?:line|msg)>\s*(?:<!\[CDATA\[)?([^<\]]+)")
+_COMMAND_TOKENS = re.compile(r"</[^>]*>|<([\w-]+)[^>]*>|([^<]+)")
+
+
+class Unsupported(Exception):
+    """
+    The device rejected a command as unsupported, or it is cached as such.
+    """
+
+
+def unsupported_reason(xml_data):
+    """
+    Return the device's message if xml_data is an error response rejecting the
+    command as unknown or unsupported, else None. Only the head is searched.
+    """
+    head = xml_data[:4096]
+    if not _ERROR_RESPONSE.search(head):
+        return None
+    match = _UNSUPPORTED.search(head)
+    if match is None:
+        return None
+    message = _MESSAGE.search(head)
+    return " ".join((message.group(1) if message else match.group(0)).split())
+
+
+def reprobe_interval(reason, interval):
+    """
+    Seconds to skip a command rejected with reason: interval for syntax and
+    unknown-command errors, at most NOT_CONFIGURED_REPROBE_INTERVAL when the
+    feature is merely not configured or enabled yet.
+    """
+    if _NOT_CONFIGURED.search(reason):
+        return min(interval, NOT_CONFIGURED_REPROBE_INTERVAL)
+    return interval
+
+
+def command_name(cmd):
+    """
+    Readable form of an op command for labels: "show routing protocol bgp summary".
+    """
+    words = []
+    for tag, text in _COMMAND_TOKENS.findall(cmd):
+        word = (tag or text).strip()
+        if word:
+            words.append(word)
+    return " ".join(words)
+
+
+class Capabilities:
+    """
+    What each device can answer, learned from system info and error responses.
+    - model and sw-version are reported by system_info_collector
+    - Collectors known not to work on a model family are skipped (MODEL_RULES)
+    - Commands rejected as unsupported are skipped until they are re-probed,
+      capability_reprobe_interval seconds later (a minute for "not configured"
+      rejections) or as soon as sw-version changes
+    """
+
+    def __init__(self):
+        self._info = {}
+        self._unsupported = {}
+        self._lock = threading.Lock()
+
+    def set_info(self, host, model, sw_version):
+        with self._lock:
+            previous = self._info.get(host)
+            self._info[host] = (model, sw_version)
+            if previous is not None and previous[1] != sw_version:
+                # An upgrade may bring new commands: probe everything again
+                self._unsupported.pop(host, None)
+
+    def info(self, host):
+        """
+        Return (model, sw_version) for host, or (None, None) if not known yet.
+        """
+        with self._lock:
+            return self._info.get(host, (None, None))
+
+    def collector_skip_reason(self, device_config, collector):
+        """
+        Reason the device's model cannot serve a collector, or None.
+        """
+        model = device_config.get("model") or self.info(device_config["host"])[0]
+        if not model:
+            return None
+        for prefixes, name, reason in MODEL_RULES:
+            if name == collector and model.startswith(prefixes):
+                return reason
+        return None
+
+    def mark_unsupported(self, host, collector, cmd, reason, interval):
+        with self._lock:
+            self._unsupported.setdefault(host, {})[(collector, cmd)] = (
+                time.monotonic() + interval,
+                reason,
+            )
+
+    def skipped(self, host, collector, cmd):
+        """
+        Return the reason a command is cached as unsupported, or None if it
+        should be sent (never rejected, or due for a re-probe).
+        """
+        with self._lock:
+            commands = self._unsupported.get(host)
+            entry = commands.get((collector, cmd)) if commands else None
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del commands[(collector, cmd)]
+                return None
+            return entry[1]
+
+    def unsupported(self, host):
+        """
+        Return [(collector, cmd, reason)] currently skipped on host.
+        """
+        now = time.monotonic()
+        with self._lock:
+            commands = dict(self._unsupported.get(host, {}))
+        return [
+            (collector, cmd, reason)
+            for (collector, cmd), (expires, reason) in commands.items()
+            if expires > now
+        ]
+
+    def export_state(self):
+        # Re-probe times are kept as wall-clock time so they survive a restart
+        offset = time.time() - time.monotonic()
+        state = {}
+        with self._lock:
+            for host in self._info.keys() | self._unsupported.keys():
+                commands = self._unsupported.get(host, {})
+                state[host] = {
+                    "info": list(self._info.get(host, (None, None))),
+                    "unsupported": [
+                        [collector, cmd, expires + offset, reason]
+                        for (collector, cmd), (expires, reason) in commands.items()
+                    ],
+                }
+        return state
+
+    def import_state(self, state):
+        offset = time.monotonic() - time.time()
+        with self._lock:
+            for host, device in state.items():
+                model, sw_version = device.get("info") or (None, None)
+                if model is not None:
+                    self._info.setdefault(host, (model, sw_version))
+                commands = self._unsupported.setdefault(host, {})
+                for collector, cmd, expires, reason in device.get("unsupported", []):
+                    commands.setdefault((collector, cmd), (expires + offset, reason))
+
+
+capabilities = Capabilities()
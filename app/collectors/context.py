@@ -0,0 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+# Per-request HTTP timeout when no tighter scrape deadline applies
+DEFAULT_TIMEOUT = 5
+
+
+def new_session():
+    """
+    Create a requests.Session with the exporter's retry policy.
+    """
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(max_retries=retries))
+    return session
+
+
+class SessionPool:
+    """
+    Per-host pool of keep-alive sessions.
+    A session is checked out by exactly one scrape at a time, so sessions are
+    never used concurrently while connections are still reused across scrapes.
+    """
+
+    def __init__(self, factory=new_session):
+        self.factory = factory
+        self._idle = {}
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def set_limit(self, host, size):
+        """
+        Cap the number of sessions (and so connections) open to host.
+        acquire() blocks while all of them are checked out.
+        """
+        with self._lock:
+            self._limits[host] = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def acquire(self, host):
+        limit = self._limits.get(host)
+        if limit is not None:
+            limit.acquire()
+        try:
+            with self._lock:
+                idle = self._idle.setdefault(host, [])
+                session = idle.pop() if idle else None
+            if session is None:
+                session = self.factory()
+            try:
+                yield session
+            finally:
+                with self._lock:
+                    self._idle[host].append(session)
+        finally:
+            if limit is not None:
+                limit.release()
+
+    def clear(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for session in idle:
+                session.close()
+
+
+session_pool = SessionPool()
+
+
+@dataclass(frozen=True)
+class ScrapeContext:
+    """
+    Execution state for one collector run against one device.
+    Collectors keep no per-scrape state on self; everything a scrape needs
+    (device, op command, HTTP session, deadline, memory budget) travels in this object.
+    """
+
+    device_config: dict
+    session: object
+    command: str = ""
+    deadline: float | None = None
+    budget: object = None
+
+    @property
+    def host(self):
+        return self.device_config["host"]
+
+    @property
+    def api_host(self):
+        """
+        Host the XML API request is sent to: the device itself, or a Panorama
+        proxying to it.
+        """
+        return self.device_config.get("api_host", self.device_config["host"])
+
+    def with_command(self, command):
+        return replace(self, command=command)
+
+    def with_deadline(self, deadline):
+        """
+        Copy of this context whose deadline is also capped at deadline.
+        """
+        if self.deadline is not None:
+            deadline = min(deadline, self.deadline)
+        return replace(self, deadline=deadline)
+
+    def timeout(self):
+        """
+        HTTP timeout for the next request, bounded by the scrape deadline.
+        Raises TimeoutError once the deadline has passed.
+        """
+        if self.deadline is None:
+            return DEFAULT_TIMEOUT
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("scrape deadline exceeded")
+        return min(DEFAULT_TIMEOUT, remaining)
@@ -1,37 +1,143 @@
-import xml.etree.ElementTree as ET
+import math
 
+from . import xml_backend
 from .base_collector import BaseCollector
+from .routing_helpers import dedupe_metrics
+
+# Sample windows understood by <show><running><resource-monitor>
+RESOURCE_MONITOR_INTERVALS = ("second", "minute", "hour", "day", "week")
+DEFAULT_INTERVAL = "second"
+DEFAULT_LAST = 60
+
+WINDOW_STATS = ("max", "mean", "p95", "p99")
+
+
+def window_stats(rows):
+    """
+    Summarize each row of samples (one list of floats per series) on its own:
+    max, mean and nearest-rank p95/p99 over that row's window.
+    Returns one {stat: value} dict per row, in input order.
+    """
+    results = []
+    for samples in rows:
+        ordered = sorted(samples)
+        n = len(ordered)
+        results.append(
+            {
+                "max": ordered[-1],
+                "mean": math.fsum(ordered) / n,
+                # Nearest-rank percentiles
+                "p95": ordered[max(math.ceil(0.95 * n) - 1, 0)],
+                "p99": ordered[max(math.ceil(0.99 * n) - 1, 0)],
+            }
+        )
+    return results
+
+
+def parse_samples(text):
+    """
+    Parse a resource-monitor value list ("3,5,1", newest first) into floats.
+    Returns None if any sample is not numeric.
+    """
+    try:
+        return [float(v) for v in text.split(",") if v.strip()] or None
+    except ValueError:
+        return None
 
 
 class DataProcessorResourceUtilizationCollector(BaseCollector):
     """
     Collector for data processor resource utilization metrics from PAN-OS.
     Parses resource-monitor XML from the PAN-OS running resource-monitor API.
+    - Fetches a window of samples per scrape (per-device `resource_monitor` settings)
+    - Emits the newest sample plus max/mean/p95/p99 over the window per DP and core
     """
 
     def __init__(self):
         super().__init__(
             name="data_processor_resource_utilization_collector",
-            api_command="<show><running><resource-monitor><second><last>1</last></second></resource-monitor></running></show>",
+            api_command=self.build_command(DEFAULT_INTERVAL, DEFAULT_LAST),
             help_text="Data processor resource utilization metrics from PAN-OS",
         )
 
+    @staticmethod
+    def build_command(interval, last):
+        return (
+            f"<show><running><resource-monitor><{interval}><last>{last}</last></{interval}>"
+            "</resource-monitor></running></show>"
+        )
+
+    @staticmethod
+    def _window(device_config):
+        settings = device_config.get("resource_monitor") or {}
+        return (
+            settings.get("interval", DEFAULT_INTERVAL),
+            int(settings.get("last", DEFAULT_LAST)),
+        )
+
+    def command(self, device_config):
+        """
+        Return the resource-monitor command for the device's configured window.
+        """
+        return self.build_command(*self._window(device_config))
+
+    def _entry_metrics(self, section, key_field, label, metric, help_text, dp_name, device):
+        """
+        Emit newest-sample and window summary metrics for <entry> lists such as
+        cpu-load-average, where each entry carries a comma-separated sample list.
+        """
+        keys = []
+        rows = []
+        for entry in section.findall("entry"):
+            key = entry.findtext(key_field)
+            samples = parse_samples(entry.findtext("value") or "")
+            if key is None or samples is None:
+                continue
+            if key_field == "name":
+                key = self.sanitize_metric_name(key)
+            keys.append(key)
+            rows.append(samples)
+        metrics = []
+        for key, samples in zip(keys, rows, strict=True):
+            metrics.append(
+                self.prometheus_metric(
+                    metric=metric,
+                    value=samples[0],
+                    device=device,
+                    help_text=help_text,
+                    labels={"dp": dp_name, label: key},
+                )
+            )
+        for key, stats in zip(keys, window_stats(rows), strict=True):
+            for stat in WINDOW_STATS:
+                metrics.append(
+                    self.prometheus_metric(
+                        metric=f"{metric}_window",
+                        value=stats[stat],
+                        device=device,
+                        help_text=f"{help_text} over the sample window",
+                        labels={"dp": dp_name, label: key, "stat": stat},
+                    )
+                )
+        return metrics
+
     def parse(self, xml_data, device_config):
         """
         Parse data processor resource utilization XML and emit Prometheus metrics.
         """
         metrics = []
+        interval, _ = self._window(device_config)
         try:
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             device = device_config["host"]
             # Find all data processors (e.g., dp0, dp1, ...)
-            for dp_elem in root.findall(".//data-processors/*"):
+            for dp_elem in xml_backend.findall(root, ".//data-processors/*"):
                 dp_name = dp_elem.tag  # e.g., 'dp0'
-                second = dp_elem.find("second")
-                if second is None:
+                window = dp_elem.find(interval)
+                if window is None:
                     continue
                 # <task> percent metrics
-                task = second.find("task")
+                task = window.find("task")
                 if task is not None:
                     for tchild in task:
                         val = tchild.text
@@ -51,78 +157,47 @@ class DataProcessorResourceUtilizationCollector(BaseCollector):
                             except ValueError:
                                 pass
                 # <cpu-load-average>/entry
-                cpu_avg = second.find("cpu-load-average")
+                cpu_avg = window.find("cpu-load-average")
                 if cpu_avg is not None:
-                    for entry in cpu_avg.findall("entry"):
-                        coreid = entry.findtext("coreid")
-                        value = entry.findtext("value")
-                        if coreid is not None and value is not None:
-                            try:
-                                metrics.append(
-                                    self.prometheus_metric(
-                                        metric="panos_data_processor_cpu_load_average",
-                                        value=float(value),
-                                        device=device,
-                                        help_text="Data processor CPU load average per core",
-                                        labels={"dp": dp_name, "coreid": coreid},
-                                    )
-                                )
-                            except ValueError:
-                                pass
+                    metrics.extend(
+                        self._entry_metrics(
+                            cpu_avg,
+                            "coreid",
+                            "coreid",
+                            "panos_data_processor_cpu_load_average",
+                            "Data processor CPU load average per core",
+                            dp_name,
+                            device,
+                        )
+                    )
                 # <cpu-load-maximum>/entry
-                cpu_max = second.find("cpu-load-maximum")
+                cpu_max = window.find("cpu-load-maximum")
                 if cpu_max is not None:
-                    for entry in cpu_max.findall("entry"):
-                        coreid = entry.findtext("coreid")
-                        value = entry.findtext("value")
-                        if coreid is not None and value is not None:
-                            try:
-                                metrics.append(
-                                    self.prometheus_metric(
-                                        metric="panos_data_processor_cpu_load_maximum",
-                                        value=float(value),
-                                        device=device,
-                                        help_text="Data processor CPU load maximum per core",
-                                        labels={"dp": dp_name, "coreid": coreid},
-                                    )
-                                )
-                            except ValueError:
-                                pass
+                    metrics.extend(
+                        self._entry_metrics(
+                            cpu_max,
+                            "coreid",
+                            "coreid",
+                            "panos_data_processor_cpu_load_maximum",
+                            "Data processor CPU load maximum per core",
+                            dp_name,
+                            device,
+                        )
+                    )
                 # <resource-utilization>/entry
-                res_util = second.find("resource-utilization")
+                res_util = window.find("resource-utilization")
                 if res_util is not None:
-                    for entry in res_util.findall("entry"):
-                        res_name = entry.findtext("name")
-                        res_name = (
-                            self.sanitize_metric_name(res_name) if res_name is not None else None
+                    metrics.extend(
+                        self._entry_metrics(
+                            res_util,
+                            "name",
+                            "resource",
+                            "panos_data_processor_resource_utilization",
+                            "Data processor resource utilization",
+                            dp_name,
+                            device,
                         )
-                        value = entry.findtext("value")
-                        if res_name is not None and value is not None:
-                            try:
-                                metrics.append(
-                                    self.prometheus_metric(
-                                        metric="panos_data_processor_resource_utilization",
-                                        value=float(value),
-                                        device=device,
-                                        help_text="Data processor resource utilization",
-                                        labels={"dp": dp_name, "resource": res_name},
-                                    )
-                                )
-                            except ValueError:
-                                pass
+                    )
         except Exception as e:
             return self.prometheus_error_metric(device_config["host"], f"data_processor_parse: {e}")
-        # Deduplicate metrics
-        seen = set()
-        deduped_metrics = []
-        for m in metrics:
-            lines = m.split("\n")
-            metric_line = next((line for line in lines if line and not line.startswith("#")), None)
-            if metric_line:
-                metric_name = metric_line.split("{")[0]
-                label_str = metric_line.split("{")[1].split("}")[0] if "{" in metric_line else ""
-                key = (metric_name, label_str)
-                if key not in seen:
-                    seen.add(key)
-                    deduped_metrics.append(m)
-        return "".join(deduped_metrics)
+        return "".join(dedupe_metrics(metrics))
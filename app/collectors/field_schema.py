@@ -0,0 +1,186 @@
+"""
+Declarative field extraction for PAN-OS XML entries.
+- Collectors declare fields (tag, kind, metric name, help text) once at import time
+- A Schema extracts all declared fields in a single pass over an element's children
+- Conversions (int/float/yes-no/info) live here instead of per-collector try/except ladders
+"""
+
+
+def to_int(text):
+    """Convert element text to int, or None if empty or not numeric."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def to_float(text):
+    """Convert element text to float, or None if empty or not numeric."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def yes_no(text):
+    """Convert 'yes'/'no' element text to 1/0, or None for anything else."""
+    text = (text or "").strip()
+    if text == "yes":
+        return 1
+    if text == "no":
+        return 0
+    return None
+
+
+def to_text(text):
+    """Return stripped element text, or None if empty."""
+    text = (text or "").strip()
+    return text or None
+
+
+def findtext(text):
+    """Return element text unchanged, or "" for an empty element, like findtext()."""
+    return text or ""
+
+
+def stripped(text):
+    """Return stripped element text, "" if empty."""
+    return (text or "").strip()
+
+
+def raw(text):
+    """Return element text unchanged."""
+    return text
+
+
+CONVERTERS = {
+    "int": to_int,
+    "float": to_float,
+    "yes_no": yes_no,
+    "info": to_text,
+    "label": findtext,
+    "raw": raw,
+}
+
+
+class Field:
+    """
+    A single child element to extract.
+    - kind: int, float, yes_no, info, label, raw or element (keeps the child element)
+    - label fields behave like findtext(tag, default): text is kept as is, an
+      empty element gives "" and default only applies when the child is missing
+    - metric/help_text: emitted metric; omit for fields only used as labels
+    - label: label name holding the value for info fields
+    - default: value used when the child is missing or does not convert
+    - convert: optional callable overriding the kind's converter
+    """
+
+    __slots__ = ("tag", "kind", "metric", "help_text", "label", "default", "convert")
+
+    def __init__(
+        self,
+        tag,
+        kind,
+        metric=None,
+        help_text=None,
+        label="value",
+        default=None,
+        convert=None,
+    ):
+        self.tag = tag
+        self.kind = kind
+        self.metric = metric
+        self.help_text = help_text
+        self.label = label
+        self.default = default
+        self.convert = convert or CONVERTERS.get(kind)
+
+
+class Schema:
+    """
+    Precompiled set of fields extracted from an element's direct children in one pass.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._by_tag = {f.tag: f for f in self.fields}
+        self._defaults = [(f.tag, f.default) for f in self.fields if f.default is not None]
+        self._rendered = [f for f in self.fields if f.metric]
+
+    def extract(self, elem):
+        """
+        Return {tag: value} for every declared field found among elem's children.
+        Like findtext(), the first occurrence of a tag wins.
+        """
+        values = {}
+        by_tag = self._by_tag
+        for child in elem:
+            field = by_tag.get(child.tag)
+            if field is None or field.tag in values:
+                continue
+            if field.kind == "element":
+                values[field.tag] = child
+            else:
+                values[field.tag] = field.convert(child.text)
+        for tag, default in self._defaults:
+            if values.get(tag) is None:
+                values[tag] = default
+        return values
+
+    def render(self, values, prometheus_metric, device, labels=None):
+        """
+        Format the extracted values of all metric-bearing fields, in declaration order.
+        """
+        metrics = []
+        for field in self._rendered:
+            value = values.get(field.tag)
+            if value is None:
+                continue
+            if field.kind == "info":
+                metrics.append(
+                    prometheus_metric(
+                        metric=field.metric,
+                        value=1,
+                        device=device,
+                        help_text=field.help_text,
+                        labels={**(labels or {}), field.label: value},
+                    )
+                )
+            else:
+                metrics.append(
+                    prometheus_metric(
+                        metric=field.metric,
+                        value=value,
+                        device=device,
+                        help_text=field.help_text,
+                        labels=labels,
+                    )
+                )
+        return metrics
+
+
+def metric_fields(tags, kind, metric_prefix, help_prefix, lower=False):
+    """
+    Build Fields for a list of tags whose metric names derive from the tag
+    (dashes become underscores), e.g. remote-as -> panos_bgp_peer_remote_as.
+    """
+    fields = []
+    for tag in tags:
+        name = tag.replace("-", "_")
+        if lower:
+            name = name.lower()
+        if kind == "info":
+            fields.append(Field(tag, kind, f"{metric_prefix}_{name}_info", f"{help_prefix} {name}"))
+        elif kind == "yes_no":
+            fields.append(
+                Field(tag, kind, f"{metric_prefix}_{name}", f"{help_prefix} {name} (1=yes, 0=no)")
+            )
+        else:
+            fields.append(Field(tag, kind, f"{metric_prefix}_{name}", f"{help_prefix} {name}"))
+    return fields
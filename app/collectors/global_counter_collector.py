@@ -1,12 +1,36 @@
-import xml.etree.ElementTree as ET
+import re
+from xml.sax.saxutils import escape
 
+from . import xml_backend
 from .base_collector import BaseCollector
+from .capabilities import Unsupported
+from .field_schema import Field, Schema
+
+# Filter keys understood by <show><counter><global><filter>
+SERVER_FILTER_FIELDS = ("severity", "category", "aspect")
+
+COUNTER_SCHEMA = Schema(
+    [
+        Field("name", "raw", default="unknown"),
+        Field("severity", "raw", default="unknown"),
+        Field("category", "raw", default="unknown"),
+        Field("aspect", "raw", default="unknown"),
+        Field("desc", "raw", default=""),
+        Field("value", "raw"),
+        Field("rate", "raw"),
+    ]
+)
 
 
 class GlobalCounterCollector(BaseCollector):
     """
     Collector for global counter metrics from PAN-OS.
     Parses <show><counter><global></global></counter></show> XML.
+    - Optional per-device `global_counters` settings push severity/category/aspect
+      filters and specific counter names to the firewall
+    - Named counters are fetched concurrently, one command each
+    - `include`/`exclude` regex lists are applied exporter-side as a fallback,
+      compiled once per distinct settings
     """
 
     def __init__(self):
@@ -15,24 +39,118 @@ class GlobalCounterCollector(BaseCollector):
             api_command="<show><counter><global></global></counter></show>",
             help_text="Global counter metrics from PAN-OS",
         )
+        self._filters = {}
+
+    def api_commands(self, settings):
+        """
+        Build the op commands for the given `global_counters` settings.
+        Named counters are fetched one command each; otherwise a single
+        (optionally filtered) command is returned. Values are XML-escaped.
+        """
+        names = settings.get("names") or []
+        if names:
+            return [
+                f"<show><counter><global><name>{escape(str(n))}</name></global></counter></show>"
+                for n in names
+            ]
+        filters = "".join(
+            f"<{field}>{escape(str(settings[field]))}</{field}>"
+            for field in SERVER_FILTER_FIELDS
+            if settings.get(field)
+        )
+        if not filters:
+            return [self.api_command]
+        return [f"<show><counter><global><filter>{filters}</filter></global></counter></show>"]
+
+    def default_commands(self):
+        return self.api_commands({})
+
+    def scrape(self, ctx):
+        """
+        Fetch global counters using the device's filter settings and return metrics.
+        """
+        settings = ctx.device_config.get("global_counters") or {}
+        cmds = self.api_commands(settings)
+        metrics = []
+        for cmd, (xml_data, error) in zip(cmds, self.fetch_concurrently(ctx, cmds), strict=True):
+            if isinstance(error, Unsupported):
+                self.logger.debug(f"Skipped on device={ctx.host}: {error}")
+                continue
+            if error is not None:
+                self.logger.error(f"HTTP error for device={ctx.host}: {error}")
+                return self.prometheus_error_metric(ctx.host, str(error))
+            metrics.append(self.parse_cached(ctx, xml_data, key=cmd))
+        errors = [m for m in metrics if "# TYPE panos_error gauge" in m]
+        if errors:
+            return errors[0]
+        return "".join(metrics)
+
+    def _counter_filter(self, settings):
+        """
+        Return a predicate(name, severity, category, aspect) for exporter-side
+        filtering, built once per distinct settings.
+        """
+        key = (
+            tuple(settings.get("names") or ()),
+            tuple(settings.get("include") or ()),
+            tuple(settings.get("exclude") or ()),
+            tuple((f, settings[f]) for f in SERVER_FILTER_FIELDS if settings.get(f)),
+        )
+        allowed = self._filters.get(key)
+        if allowed is None:
+            allowed = self._filters.setdefault(key, self._build_filter(*key))
+        return allowed
+
+    @staticmethod
+    def _build_filter(names, include, exclude, wanted):
+        names = set(names)
+        include = [re.compile(p) for p in include]
+        exclude = [re.compile(p) for p in exclude]
+        wanted = dict(wanted)
+
+        def allowed(name, severity, category, aspect):
+            if names and name not in names:
+                return False
+            if include and not any(p.search(name) for p in include):
+                return False
+            if exclude and any(p.search(name) for p in exclude):
+                return False
+            if wanted:
+                fields = {"severity": severity, "category": category, "aspect": aspect}
+                if any(fields[f] != v for f, v in wanted.items()):
+                    return False
+            return True
+
+        return allowed
 
     def parse(self, xml_data, device_config):
         """
         Parse global counter XML and emit Prometheus metrics.
         """
         metrics = []
+        seen = set()
+        allowed = self._counter_filter(device_config.get("global_counters") or {})
         try:
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             device = device_config["host"]
-            for entry in root.findall(".//global//counters//entry"):
-                name = entry.findtext("name", default="unknown")
-                name = self.sanitize_metric_name(name)
-                value = entry.findtext("value")
-                rate = entry.findtext("rate")
-                severity = entry.findtext("severity", default="unknown")
-                category = entry.findtext("category", default="unknown")
-                aspect = entry.findtext("aspect", default="unknown")
-                desc = entry.findtext("desc", default="")
+            for entry in xml_backend.findall(root, ".//global//counters//entry"):
+                values = COUNTER_SCHEMA.extract(entry)
+                raw_name = values["name"]
+                severity = values["severity"]
+                category = values["category"]
+                aspect = values["aspect"]
+                if not allowed(raw_name, severity, category, aspect):
+                    continue
+                name = self.sanitize_metric_name(raw_name)
+                labels = {"severity": severity, "category": category, "aspect": aspect}
+                # Deduplicate on metric name and label set
+                key = (name, severity, category, aspect)
+                if key in seen:
+                    continue
+                seen.add(key)
+                value = values.get("value")
+                rate = values.get("rate")
+                desc = values["desc"]
                 # Main value metric
                 if value is not None:
                     metrics.append(
@@ -41,7 +159,7 @@ class GlobalCounterCollector(BaseCollector):
                             value=value,
                             device=device,
                             help_text=desc or f"Global counter for {name}",
-                            labels={"severity": severity, "category": category, "aspect": aspect},
+                            labels=labels,
                         )
                     )
                 # Rate metric
@@ -52,22 +170,9 @@ class GlobalCounterCollector(BaseCollector):
                             value=rate,
                             device=device,
                             help_text=f"Rate for {desc or name}",
-                            labels={"severity": severity, "category": category, "aspect": aspect},
+                            labels=labels,
                         )
                     )
         except Exception as e:
             return self.prometheus_error_metric(device_config["host"], f"global_counter_parse: {e}")
-        # Deduplicate metrics
-        seen = set()
-        deduped_metrics = []
-        for m in metrics:
-            lines = m.split("\n")
-            metric_line = next((line for line in lines if line and not line.startswith("#")), None)
-            if metric_line:
-                metric_name = metric_line.split("{")[0]
-                label_str = metric_line.split("{")[1].split("}")[0] if "{" in metric_line else ""
-                key = (metric_name, label_str)
-                if key not in seen:
-                    seen.add(key)
-                    deduped_metrics.append(m)
-        return "".join(deduped_metrics)
+        return "".join(metrics)
@@ -1,12 +1,21 @@
-import xml.etree.ElementTree as ET
+import time
 
+from . import xml_backend
 from .base_collector import BaseCollector
+from .capabilities import Unsupported
+from .field_schema import to_int
+from .interface_inventory import INVENTORY_COMMAND, STATIC_FIELDS, get_inventory, inventory_cache
+from .routing_helpers import dedupe_metrics
 
 
 class InterfaceCounterCollector(BaseCollector):
     """
     Collector for interface counter metrics from PAN-OS.
     Parses <show><counter><interface>all</interface></counter></show> XML.
+    - panos_interface_info carries type, zone and vsys for each interface from
+      the cached interface metadata (empty when the interface is not in it), to
+      join onto the counter series by interface
+    - A change in the number of interfaces drops the cached metadata
     """
 
     def __init__(self):
@@ -16,109 +25,153 @@ class InterfaceCounterCollector(BaseCollector):
             help_text="Interface counter metrics from PAN-OS",
         )
 
-    def parse(self, xml_data, device_config):
+    def _counter_metrics(self, elem, labels, device, help_prefix, skip=("name",)):
+        """
+        Emit one metric per integer-valued child of elem.
+        """
+        metrics = []
+        for child in elem:
+            if child.tag in skip:
+                continue
+            value = to_int(child.text)
+            if value is None:
+                continue
+            tag = self.sanitize_metric_name(child.tag)
+            metrics.append(
+                self.prometheus_metric(
+                    metric=f"panos_interface_counter_{tag}",
+                    value=value,
+                    device=device,
+                    help_text=f"{help_prefix}: {tag}",
+                    labels=labels,
+                )
+            )
+        return metrics
+
+    def default_commands(self):
+        return [self.api_command, INVENTORY_COMMAND]
+
+    def scrape(self, ctx):
+        """
+        Fetch interface counters and add the info series from the interface metadata.
+        """
+        try:
+            xml_data = self.fetch(ctx)
+        except Unsupported as e:
+            self.logger.debug(f"Skipped on device={ctx.host}: {e}")
+            return ""
+        except Exception as e:
+            self.logger.error(f"HTTP error for device={ctx.host}: {e}")
+            return self.prometheus_error_metric(ctx.host, str(e))
+        try:
+            root = xml_backend.fromstring(xml_data)
+            hw, ifnet = self._entries(root)
+        except Exception as e:
+            return self.prometheus_error_metric(ctx.host, f"interface_counter_parse: {e}")
+        if inventory_cache.check_interface_count(ctx.host, len(hw) + len(ifnet)):
+            self.logger.info(f"Interface count changed on device={ctx.host}, refreshing inventory")
+        error = ""
+        try:
+            fetched_at, inventory = get_inventory(self, ctx)
+        except Unsupported as e:
+            self.logger.debug(f"Interface inventory skipped on device={ctx.host}: {e}")
+            fetched_at, inventory = None, {}
+        except Exception as e:
+            self.logger.error(f"Interface inventory error for device={ctx.host}: {e}")
+            error = self.prometheus_error_metric(ctx.host, f"interface_inventory: {e}")
+            fetched_at, inventory = None, {}
+        metrics = self.render(hw, ifnet, ctx.host, inventory)
+        if error:
+            # Counters are still served, without the info series' metadata
+            return error + metrics
+        if fetched_at is not None and "# TYPE panos_error gauge" not in metrics:
+            metrics += self.prometheus_metric(
+                metric="panos_interface_inventory_age_seconds",
+                value=f"{max(0.0, time.time() - fetched_at):.3f}",
+                device=ctx.host,
+                help_text="Age of the cached interface metadata",
+            )
+        return metrics
+
+    def parse(self, xml_data, device_config, inventory=None):
         """
         Parse interface counter XML and emit Prometheus metrics.
         """
+        try:
+            hw, ifnet = self._entries(xml_backend.fromstring(xml_data))
+        except Exception as e:
+            return self.prometheus_error_metric(
+                device_config["host"], f"interface_counter_parse: {e}"
+            )
+        return self.render(hw, ifnet, device_config["host"], inventory or {})
+
+    @staticmethod
+    def _entries(root):
+        """
+        Return the named (name, entry) pairs of the <hw> and <ifnet> sections.
+        """
+        hw = []
+        for entry in xml_backend.findall(root, ".//hw/entry"):
+            iface = entry.findtext("name") or entry.findtext("interface")
+            if iface:
+                hw.append((iface, entry))
+        ifnet = []
+        for entry in xml_backend.findall(root, ".//ifnet/ifnet/entry"):
+            iface = entry.findtext("name")
+            if iface:
+                ifnet.append((iface, entry))
+        return hw, ifnet
+
+    def _info_metric(self, iface, device, inventory):
+        info = inventory.get(iface) or {}
+        labels = {"interface": iface}
+        for name in STATIC_FIELDS:
+            labels[name] = info.get(name, "")
+        return self.prometheus_metric(
+            metric="panos_interface_info",
+            value=1,
+            device=device,
+            help_text="Interface type, zone and vsys",
+            labels=labels,
+        )
+
+    def render(self, hw, ifnet, device, inventory):
+        """
+        Emit counter metrics and one panos_interface_info series per interface.
+        """
         metrics = []
         try:
-            root = ET.fromstring(xml_data)
-            device = device_config["host"]
-            # Parse <hw>/entry
-            for entry in root.findall(".//hw/entry"):
-                iface = entry.findtext("name") or entry.findtext("interface")
-                if not iface:
-                    continue
+            for iface, entry in hw:
+                labels = {"interface": iface}
+                metrics.append(self._info_metric(iface, device, inventory))
                 # Top-level numeric fields
-                for child in entry:
-                    if child.tag in ("name", "interface", "port"):
-                        continue
-                    try:
-                        value = int(child.text)
-                        tag = self.sanitize_metric_name(child.tag)
-                        metrics.append(
-                            self.prometheus_metric(
-                                metric=f"panos_interface_counter_{tag}",
-                                value=value,
-                                device=device,
-                                help_text=f"Interface counter: {tag}",
-                                labels={"interface": iface},
-                            )
-                        )
-                    except (ValueError, TypeError):
-                        pass
+                metrics.extend(
+                    self._counter_metrics(
+                        entry,
+                        labels,
+                        device,
+                        "Interface counter",
+                        skip=("name", "interface", "port"),
+                    )
+                )
                 # <port> child: nested counters
                 port = entry.find("port")
                 if port is not None:
-                    for pchild in port:
-                        try:
-                            value = int(pchild.text)
-                            tag = self.sanitize_metric_name(pchild.tag)
-                            metrics.append(
-                                self.prometheus_metric(
-                                    metric=f"panos_interface_counter_{tag}",
-                                    value=value,
-                                    device=device,
-                                    help_text=f"Interface port counter: {tag}",
-                                    labels={"interface": iface},
-                                )
-                            )
-                        except (ValueError, TypeError):
-                            pass
-            # Parse <ifnet>/ifnet/entry
-            for entry in root.findall(".//ifnet/ifnet/entry"):
-                iface = entry.findtext("name")
-                if not iface:
-                    continue
-                for child in entry:
-                    if child.tag == "name":
-                        continue
-                    try:
-                        value = int(child.text)
-                        tag = self.sanitize_metric_name(child.tag)
-                        metrics.append(
-                            self.prometheus_metric(
-                                metric=f"panos_interface_counter_{tag}",
-                                value=value,
-                                device=device,
-                                help_text=f"Interface ifnet counter: {tag}",
-                                labels={"interface": iface},
-                            )
-                        )
-                    except (ValueError, TypeError):
-                        pass
-                    # <counters> child: nested counters
-                    if child.tag == "counters":
-                        for cchild in child:
-                            try:
-                                value = int(cchild.text)
-                                tag = self.sanitize_metric_name(cchild.tag)
-                                metrics.append(
-                                    self.prometheus_metric(
-                                        metric=f"panos_interface_counter_{tag}",
-                                        value=value,
-                                        device=device,
-                                        help_text=f"Interface ifnet counters: {tag}",
-                                        labels={"interface": iface},
-                                    )
-                                )
-                            except (ValueError, TypeError):
-                                pass
+                    metrics.extend(
+                        self._counter_metrics(port, labels, device, "Interface port counter")
+                    )
+            for iface, entry in ifnet:
+                labels = {"interface": iface}
+                metrics.append(self._info_metric(iface, device, inventory))
+                metrics.extend(
+                    self._counter_metrics(entry, labels, device, "Interface ifnet counter")
+                )
+                # <counters> child: nested counters
+                counters = entry.find("counters")
+                if counters is not None:
+                    metrics.extend(
+                        self._counter_metrics(counters, labels, device, "Interface ifnet counters")
+                    )
         except Exception as e:
-            return self.prometheus_error_metric(
-                device_config["host"], f"interface_counter_parse: {e}"
-            )
-        # Deduplicate metrics
-        seen = set()
-        deduped_metrics = []
-        for m in metrics:
-            lines = m.split("\n")
-            metric_line = next((line for line in lines if line and not line.startswith("#")), None)
-            if metric_line:
-                metric_name = metric_line.split("{")[0]
-                label_str = metric_line.split("{")[1].split("}")[0] if "{" in metric_line else ""
-                key = (metric_name, label_str)
-                if key not in seen:
-                    seen.add(key)
-                    deduped_metrics.append(m)
-        return "".join(deduped_metrics)
+            return self.prometheus_error_metric(device, f"interface_counter_parse: {e}")
+        return "".join(dedupe_metrics(metrics))
@@ -0,0 +1,149 @@
+import threading
+import time
+
+from . import xml_backend
+
+INVENTORY_COMMAND = "<show><interface>all</interface></show>"
+
+# Seconds interface metadata is reused before `show interface all` is fetched again
+DEFAULT_INVENTORY_TTL = 300
+
+# Attributes that only change with configuration; operational state is never cached
+STATIC_FIELDS = ("type", "zone", "vsys")
+
+TYPE_NAMES = {
+    "0": "ethernet",
+    "2": "ha",
+    "3": "vlan",
+    "4": "aggregate",
+    "5": "loopback",
+    "6": "tunnel",
+    "7": "hsci",
+}
+
+
+def parse_inventory(xml_data):
+    """
+    Parse `show interface all` into {name: attributes}.
+    Logical (<ifnet>) interfaces come first, merged with their <hw> entry;
+    hardware-only interfaces follow with logical=False.
+    """
+    root = xml_backend.fromstring(xml_data)
+    hw_info = {}
+    for entry in xml_backend.findall(root, ".//hw/entry"):
+        name = entry.findtext("name")
+        if not name:
+            continue
+        type_code = entry.findtext("type", default="unknown")
+        hw_info[name] = {
+            "mac": entry.findtext("mac", default="unknown"),
+            "speed": entry.findtext("speed", default="ukn"),
+            "duplex": entry.findtext("duplex", default="ukn"),
+            "state": entry.findtext("state", default="unknown"),
+            "type": TYPE_NAMES.get(type_code, type_code),
+        }
+    inventory = {}
+    for entry in xml_backend.findall(root, ".//ifnet/entry"):
+        name = entry.findtext("name")
+        if not name or name in inventory:
+            continue
+        info = {
+            "mac": "unknown",
+            "speed": "ukn",
+            "duplex": "ukn",
+            "state": "unknown",
+            "type": "unknown",
+        }
+        info.update(hw_info.get(name, {}))
+        for tag in ("zone", "vsys", "tag", "fwd", "ip"):
+            info[tag] = entry.findtext(tag, default="")
+        info["logical"] = True
+        inventory[name] = info
+    for name, hw in hw_info.items():
+        if name not in inventory:
+            inventory[name] = {**hw, "logical": False}
+    return inventory
+
+
+class InventoryCache:
+    """
+    Per-device static interface metadata (STATIC_FIELDS) for interface_counter_collector.
+    - interface_collector refreshes it from its own `show interface all` every scrape
+    - It is reused for the device's interface_inventory_ttl seconds
+    - It is dropped early when the number of interfaces seen in counter
+      output changes, so added or removed interfaces are picked up
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        """
+        Return (fetched_at, inventory) if a fresh inventory is cached, else None.
+        """
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None or time.monotonic() >= entry["expires"]:
+                return None
+            return entry["fetched_at"], entry["inventory"]
+
+    def put(self, host, inventory, ttl):
+        with self._lock:
+            self._entries[host] = {
+                "expires": time.monotonic() + ttl,
+                "fetched_at": time.time(),
+                "inventory": inventory,
+                "counter_interfaces": None,
+            }
+
+    def check_interface_count(self, host, count):
+        """
+        Record how many interfaces counter output reports for host and drop
+        the cached inventory if that number changed since the last check.
+        Returns True if the inventory was dropped.
+        """
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return False
+            if entry["counter_interfaces"] is None:
+                entry["counter_interfaces"] = count
+                return False
+            if entry["counter_interfaces"] == count:
+                return False
+            del self._entries[host]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+inventory_cache = InventoryCache()
+
+
+def store_inventory(device_config, inventory):
+    """
+    Cache the static fields of a parsed `show interface all` for the device.
+    """
+    static = {
+        name: {field: info.get(field, "") for field in STATIC_FIELDS}
+        for name, info in inventory.items()
+    }
+    ttl = device_config.get("interface_inventory_ttl", DEFAULT_INVENTORY_TTL)
+    inventory_cache.put(device_config["host"], static, ttl)
+    return static
+
+
+def get_inventory(collector, ctx):
+    """
+    Return (fetched_at, {name: static fields}) for the scrape's device, fetching
+    `show interface all` through collector only when the cache is stale.
+    """
+    cached = inventory_cache.get(ctx.host)
+    if cached is not None:
+        return cached
+    inventory = parse_inventory(collector.fetch(ctx, INVENTORY_COMMAND))
+    static = store_inventory(ctx.device_config, inventory)
+    return inventory_cache.get(ctx.host) or (time.time(), static)
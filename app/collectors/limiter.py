@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# API calls in flight to one firewall when neither the device nor its model sets a limit
+DEFAULT_MAX_CONCURRENT_REQUESTS = 2
+
+
+class FairSemaphore:
+    """
+    Counting semaphore that grants slots strictly in arrival order.
+    A released slot is handed directly to the oldest waiter, so a steady
+    stream of new callers cannot starve one that is already queued.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a slot. Returns False if timeout (seconds) passed first.
+        """
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return True
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if waiter.wait(timeout):
+            return True
+        with self._lock:
+            # The slot may have been handed over just as the wait timed out
+            if waiter.is_set():
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self):
+        with self._lock:
+            if self._waiters and self._active <= self.limit:
+                self._waiters.popleft().set()
+            else:
+                self._active -= 1
+
+    def resize(self, limit):
+        """
+        Change the limit, admitting queued callers if it grew.
+        """
+        with self._lock:
+            self.limit = limit
+            while self._waiters and self._active < limit:
+                self._active += 1
+                self._waiters.popleft().set()
+
+
+class DeviceLimiter:
+    """
+    Per-firewall cap on concurrent API calls, shared by every collector and scrape.
+    - Limit: the device's max_concurrent_requests, else its model's entry in the
+      config's model_limits (passed in the device config), else
+      DEFAULT_MAX_CONCURRENT_REQUESTS
+    - The model comes from the device config (`model`) or is learned from system info
+    - Time spent queued is accumulated per device for the exporter's metrics
+    """
+
+    def __init__(self):
+        self._semaphores = {}
+        self._models = {}
+        self._waits = {}
+        self._lock = threading.Lock()
+
+    def set_model(self, host, model):
+        self._models[host] = model
+
+    def limit_for(self, device_config):
+        limit = device_config.get("max_concurrent_requests")
+        if limit is not None:
+            return limit
+        model = device_config.get("model") or self._models.get(device_config["host"])
+        model_limits = device_config.get("model_limits") or {}
+        return model_limits.get(model, DEFAULT_MAX_CONCURRENT_REQUESTS)
+
+    def _semaphore(self, host, limit):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = FairSemaphore(limit)
+                self._waits[host] = [0.0, 0]
+        if semaphore.limit != limit:
+            semaphore.resize(limit)
+        return semaphore
+
+    @contextmanager
+    def slot(self, ctx):
+        """
+        Hold one of the device's request slots for the duration of the block.
+        Raises TimeoutError if the scrape deadline passes while queued.
+        """
+        semaphore = self._semaphore(ctx.host, self.limit_for(ctx.device_config))
+        started = time.monotonic()
+        timeout = None if ctx.deadline is None else max(0.0, ctx.deadline - started)
+        acquired = semaphore.acquire(timeout)
+        waited = time.monotonic() - started
+        with self._lock:
+            stats = self._waits[ctx.host]
+            stats[0] += waited
+            stats[1] += 1
+        if not acquired:
+            raise TimeoutError("scrape deadline exceeded waiting for a request slot")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def queue_wait(self, host):
+        """
+        Return (total seconds queued, number of requests) for a device.
+        """
+        with self._lock:
+            sum_, count = self._waits.get(host, (0.0, 0))
+            return sum_, count
+
+
+device_limiter = DeviceLimiter()
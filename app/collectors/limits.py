@@ -0,0 +1,124 @@
+import threading
+
+# Largest API response a collector buffers unless configured otherwise
+DEFAULT_MAX_RESPONSE_BYTES = 64 * 1024 * 1024
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class LimitExceeded(Exception):
+    """
+    A response or scrape went over a configured bound; kind names the limit.
+    """
+
+    kind = "limit"
+
+
+class ResponseTooLarge(LimitExceeded):
+    kind = "response_bytes"
+
+
+class MemoryBudgetExceeded(LimitExceeded):
+    kind = "memory_budget"
+
+
+class UnsafeXML(LimitExceeded):
+    kind = "unsafe_xml"
+
+
+class ScrapeBudget:
+    """
+    Memory budget shared by all collectors of one device scrape, accounted as
+    response bytes buffered. limit=None only records limit violations.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.used = 0
+        self.exceeded = []
+        self._lock = threading.Lock()
+
+    def charge(self, size):
+        with self._lock:
+            self.used += size
+            if self.limit is not None and self.used > self.limit:
+                raise MemoryBudgetExceeded(
+                    f"scrape memory budget of {self.limit} bytes exceeded ({self.used} bytes)"
+                )
+
+    def record(self, collector, kind):
+        with self._lock:
+            if (collector, kind) not in self.exceeded:
+                self.exceeded.append((collector, kind))
+
+
+def response_limit(collector_name, device_config):
+    """
+    Resolve a collector's response size cap from the device's max_response_bytes:
+    a number for all collectors, or {collector: bytes, "default": bytes}.
+    """
+    setting = device_config.get("max_response_bytes")
+    if isinstance(setting, dict):
+        return setting.get(collector_name, setting.get("default", DEFAULT_MAX_RESPONSE_BYTES))
+    return setting or DEFAULT_MAX_RESPONSE_BYTES
+
+
+def read_body(response, max_bytes, budget):
+    """
+    Read a streamed response body, failing as soon as it passes max_bytes or the
+    scrape budget. Returns (decoded text, size in bytes).
+    """
+    iter_content = getattr(response, "iter_content", None)
+    if iter_content is None:
+        # Session factories may hand back plain response objects (replay, tests)
+        data = response.text.encode()
+        if len(data) > max_bytes:
+            raise ResponseTooLarge(f"response larger than {max_bytes} bytes")
+        budget.charge(len(data))
+        return response.text, len(data)
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        response.close()
+        raise ResponseTooLarge(f"response of {declared} bytes exceeds {max_bytes} bytes")
+    chunks = []
+    size = 0
+    try:
+        for chunk in iter_content(READ_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseTooLarge(f"response larger than {max_bytes} bytes")
+            budget.charge(len(chunk))
+            chunks.append(chunk)
+    except LimitExceeded:
+        response.close()
+        raise
+    return b"".join(chunks).decode(response.encoding or "utf-8", errors="replace"), size
+
+
+_PROLOG_MARKERS = {
+    str: ("<", "<?", "?>", "<!--", "-->", ("<!DOCTYPE", "<!ENTITY")),
+    bytes: (b"<", b"<?", b"?>", b"<!--", b"-->", (b"<!DOCTYPE", b"<!ENTITY")),
+}
+
+
+def check_prolog(data):
+    """
+    Raise UnsafeXML if the document (str or bytes) declares a DOCTYPE, and so
+    possibly entities, before its root element. Only the prolog is scanned.
+    """
+    tag, pi, pi_end, comment, comment_end, unsafe = _PROLOG_MARKERS[type(data)]
+    pos = 0
+    while True:
+        pos = data.find(tag, pos)
+        if pos < 0:
+            return
+        if data.startswith(pi, pos):
+            pos = data.find(pi_end, pos)
+        elif data.startswith(comment, pos):
+            pos = data.find(comment_end, pos)
+        elif data.startswith(unsafe, pos):
+            raise UnsafeXML("XML with a DOCTYPE or entity declaration rejected")
+        else:
+            return
+        if pos < 0:
+            return
@@ -0,0 +1,30 @@
+import threading
+import time
+
+
+class MgmtLoad:
+    """
+    Latest management-plane load per device, reported by system_resources_collector
+    and read by the exporter's adaptive polling policy.
+    """
+
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, host, cpu_percent, load1):
+        with self._lock:
+            self._samples[host] = (time.monotonic(), cpu_percent, load1)
+
+    def get(self, host, max_age=None):
+        """
+        Return (cpu_percent, load1) for host, or None if unknown or older than max_age.
+        """
+        with self._lock:
+            sample = self._samples.get(host)
+        if sample is None or (max_age is not None and time.monotonic() - sample[0] > max_age):
+            return None
+        return sample[1], sample[2]
+
+
+mgmt_load = MgmtLoad()
@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import Counter
+
+KINDS = ("response", "chunk")
+
+
+def digest(text):
+    """
+    Digest of a raw response (or a region of one) used to detect unchanged input.
+    """
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class ParseCache:
+    """
+    Per-device memo of rendered output keyed by a digest of the raw response.
+    - One slot per key (command and parser): the last response's digest and output
+    - Chunked responses keep the rendered output of each chunk from the last parse,
+      so only the chunks that changed are parsed again
+    - Error output is never cached
+    - Hits and misses are counted per kind ("response" or "chunk")
+    """
+
+    def __init__(self):
+        self._outputs = {}
+        self._chunks = {}
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, kind, hits, misses):
+        with self._lock:
+            self._stats[(kind, "hits")] += hits
+            self._stats[(kind, "misses")] += misses
+
+    def stats(self):
+        """
+        Return {(kind, "hits"|"misses"): count}.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def output(self, key, text, parse, reuse=None):
+        """
+        Return the output cached for key if text is unchanged, else parse() and cache it.
+        reuse(output) is called with output served from the cache.
+        """
+        text_digest = digest(text)
+        entry = self._outputs.get(key)
+        if entry is not None and entry[0] == text_digest:
+            self._count("response", 1, 0)
+            if reuse is not None:
+                reuse(entry[1])
+            return entry[1]
+        self._count("response", 0, 1)
+        output = parse()
+        if "# TYPE panos_error gauge" in output:
+            self._outputs.pop(key, None)
+        else:
+            self._outputs[key] = (text_digest, output)
+        return output
+
+    def chunks(self, key, chunks, render, reuse=None):
+        """
+        Render a response split into (context, text) chunks and return the
+        concatenated series. Chunks unchanged since the last call reuse their
+        output; render(pending) is called once with the changed chunks and
+        returns one list of series per chunk. reuse(output) is called with the
+        reused chunks' series.
+        """
+        previous = self._chunks.get(key, {})
+        current = {}
+        pending = {}
+        order = []
+        for context, text in chunks:
+            chunk_key = (context, digest(text))
+            order.append(chunk_key)
+            if chunk_key in current or chunk_key in pending:
+                continue
+            series = previous.get(chunk_key)
+            if series is None:
+                pending[chunk_key] = (context, text)
+            else:
+                current[chunk_key] = series
+        self._count("chunk", len(order) - len(pending), len(pending))
+        if reuse is not None and current:
+            reuse("".join(line for series in current.values() for line in series))
+        if pending:
+            current.update(zip(pending, render(list(pending.values())), strict=True))
+        # Only this response's chunks are kept, so the cache follows the current table
+        self._chunks[key] = current
+        return [line for chunk_key in order for line in current[chunk_key]]
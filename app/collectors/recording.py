@@ -0,0 +1,111 @@
+"""
+Record/replay of raw PAN-OS API responses.
+- PANOS_RECORD_DIR=<dir> makes every BaseCollector.fetch save its response
+- ReplaySession serves a recorded corpus in place of HTTP (see app.cli)
+Corpus layout: <dir>/<device>/<sha1 of command>.xml plus a .json sidecar with
+the command, fetch duration and recording time.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from urllib.parse import quote, urlsplit
+
+import requests
+
+logger = logging.getLogger("panos_exporter.recording")
+
+
+def _command_key(cmd):
+    return hashlib.sha1(cmd.encode(), usedforsecurity=False).hexdigest()
+
+
+class Recorder:
+    """
+    Saves raw responses per device and command. The latest response wins.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, device, cmd):
+        return os.path.join(self.directory, quote(device, safe=""), _command_key(cmd))
+
+    def save(self, device, cmd, text, seconds):
+        base = self.path(device, cmd)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        meta = {"command": cmd, "seconds": round(seconds, 6), "recorded_at": time.time()}
+        for suffix, data in ((".xml", text), (".json", json.dumps(meta))):
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(base), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, base + suffix)
+
+    def load(self, device, cmd):
+        """
+        Return (text, meta) for a recorded command, or None.
+        """
+        base = self.path(device, cmd)
+        try:
+            with open(base + ".xml", encoding="utf-8") as f:
+                text = f.read()
+            with open(base + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        return text, meta
+
+
+recorder = Recorder(os.environ["PANOS_RECORD_DIR"]) if os.environ.get("PANOS_RECORD_DIR") else None
+
+
+def record(device, cmd, text, seconds):
+    """
+    Save a response when recording is enabled. Never raises.
+    """
+    if recorder is None:
+        return
+    try:
+        recorder.save(device, cmd, text, seconds)
+    except OSError as e:
+        logger.warning(f"Recording response for device={device} failed: {e}")
+
+
+class ReplayResponse:
+    def __init__(self, text, status_code=200, url=""):
+        self.text = text
+        self.status_code = status_code
+        self.url = url
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} no recording for {self.url}")
+
+
+class ReplaySession:
+    """
+    Drop-in for requests.Session that answers from a recorded corpus.
+    The device is the request's target serial (Panorama) or the URL host.
+    With latency=True each response is delayed by its recorded fetch time.
+    """
+
+    def __init__(self, directory, latency=False):
+        self.recorder = Recorder(directory)
+        self.latency = latency
+
+    def get(self, url, params=None, **kwargs):
+        params = params or {}
+        device = params.get("target") or urlsplit(url).netloc
+        recorded = self.recorder.load(device, params.get("cmd", ""))
+        if recorded is None:
+            return ReplayResponse("", status_code=404, url=f"{device} {params.get('cmd')}")
+        text, meta = recorded
+        if self.latency:
+            time.sleep(meta.get("seconds", 0))
+        return ReplayResponse(text)
+
+    def close(self):
+        pass
@@ -0,0 +1,201 @@
+import importlib
+import logging
+from importlib.metadata import entry_points
+
+# Site-specific collectors register here: name = "package.module:CollectorClass"
+ENTRY_POINT_GROUP = "panos_exporter.collectors"
+
+COST_CLASSES = ("cheap", "moderate", "expensive")
+
+
+class CollectorSpec:
+    """
+    Registry entry for a collector.
+    - target: "module:Class", imported only when the collector is created
+    - cost: cheap, moderate or expensive (load on the firewall management plane)
+    - default_ttl: seconds a result stays useful, for schedulers
+    - commands: op commands one scrape issues with default settings, taken from
+      the collector's default_commands() (imports the collector)
+    - default: run when config.yaml has no collectors list
+    """
+
+    __slots__ = ("name", "target", "cost", "default_ttl", "default", "_cls", "_commands")
+
+    def __init__(self, name, target, cost="moderate", default_ttl=30, default=True):
+        if cost not in COST_CLASSES:
+            raise ValueError(f"Unknown cost class for {name}: {cost}")
+        self.name = name
+        self.target = target
+        self.cost = cost
+        self.default_ttl = default_ttl
+        self.default = default
+        self._cls = None
+        self._commands = None
+
+    def load(self):
+        """
+        Import and return the collector class.
+        """
+        if self._cls is None:
+            module_name, _, attr = self.target.partition(":")
+            self._cls = getattr(importlib.import_module(module_name), attr)
+        return self._cls
+
+    @property
+    def commands(self):
+        if self._commands is None:
+            self._commands = tuple(self.load()().default_commands())
+        return self._commands
+
+
+MANIFEST = (
+    CollectorSpec(
+        "system_info_collector",
+        "app.collectors.system_info_collector:SystemInfoCollector",
+        cost="cheap",
+        default_ttl=60,
+    ),
+    CollectorSpec(
+        "system_environmentals_collector",
+        "app.collectors.system_environmentals_collector:SystemEnvironmentalsCollector",
+        cost="cheap",
+        default_ttl=60,
+    ),
+    CollectorSpec(
+        "system_resources_collector",
+        "app.collectors.system_resources_collector:SystemResourcesCollector",
+        cost="cheap",
+        default_ttl=30,
+    ),
+    CollectorSpec(
+        "global_counter_collector",
+        "app.collectors.global_counter_collector:GlobalCounterCollector",
+        cost="expensive",
+        default_ttl=30,
+    ),
+    CollectorSpec(
+        "session_collector",
+        "app.collectors.session_collector:SessionCollector",
+        cost="cheap",
+        default_ttl=30,
+    ),
+    CollectorSpec(
+        "interface_collector",
+        "app.collectors.interface_collector:InterfaceCollector",
+        cost="moderate",
+        default_ttl=30,
+    ),
+    CollectorSpec(
+        "interface_counter_collector",
+        "app.collectors.interface_counter_collector:InterfaceCounterCollector",
+        cost="moderate",
+        default_ttl=30,
+    ),
+    CollectorSpec(
+        "data_processor_resource_utilization_collector",
+        "app.collectors.data_processor_resource_utilization_collector:"
+        "DataProcessorResourceUtilizationCollector",
+        cost="moderate",
+        default_ttl=60,
+    ),
+    CollectorSpec(
+        "routing_resource_collector",
+        "app.collectors.routing_resource_collector:RoutingResourceCollector",
+        cost="cheap",
+        default_ttl=60,
+    ),
+    CollectorSpec(
+        "routing_summary_collector",
+        "app.collectors.routing_summary_collector:RoutingSummaryCollector",
+        cost="cheap",
+        default_ttl=60,
+    ),
+    CollectorSpec(
+        "routing_route_collector",
+        "app.collectors.routing_route_collector:RoutingRouteCollector",
+        cost="expensive",
+        default_ttl=120,
+    ),
+    CollectorSpec(
+        "routing_bgp_collector",
+        "app.collectors.routing_bgp_collector:RoutingBgpCollector",
+        cost="expensive",
+        default_ttl=60,
+    ),
+    CollectorSpec(
+        "session_table_collector",
+        "app.collectors.session_table_collector:SessionTableCollector",
+        cost="expensive",
+        default_ttl=60,
+        # Walks the whole session table; enable explicitly
+        default=False,
+    ),
+)
+
+
+class CollectorRegistry:
+    """
+    Single source of truth for collector names and metadata.
+    - Built-in collectors come from MANIFEST
+    - Plugins are discovered from the panos_exporter.collectors entry point group
+    - Collector modules are imported only when a collector is created
+    """
+
+    def __init__(self, manifest=MANIFEST, entry_point_group=ENTRY_POINT_GROUP):
+        self.logger = logging.getLogger("panos_exporter.registry")
+        self._builtin = {spec.name: spec for spec in manifest}
+        self._entry_point_group = entry_point_group
+        self._plugins = None
+
+    def _discover_plugins(self):
+        if self._plugins is None:
+            plugins = {}
+            for ep in entry_points(group=self._entry_point_group):
+                if ep.name in self._builtin:
+                    self.logger.warning(f"Ignoring plugin {ep.value}: {ep.name} is built in")
+                    continue
+                plugins[ep.name] = CollectorSpec(ep.name, ep.value)
+            self._plugins = plugins
+        return self._plugins
+
+    def builtin_names(self):
+        """
+        Names of the built-in collectors, in default run order.
+        """
+        return list(self._builtin)
+
+    def default_names(self):
+        """
+        Built-in collectors run when no collectors list is configured.
+        """
+        return [name for name, spec in self._builtin.items() if spec.default]
+
+    def names(self):
+        """
+        All known collector names (built-in and plugins) without importing any of them.
+        """
+        return self.builtin_names() + list(self._discover_plugins())
+
+    def register(self, spec):
+        """
+        Register a collector spec at runtime (e.g. from tests or site code).
+        """
+        self._discover_plugins()[spec.name] = spec
+
+    def get(self, name):
+        """
+        Return the CollectorSpec for name. Raises ValueError if unknown.
+        """
+        spec = self._builtin.get(name) or self._discover_plugins().get(name)
+        if spec is None:
+            raise ValueError(f"Unknown collector: {name}")
+        return spec
+
+    def create(self, name):
+        """
+        Import (if needed) and instantiate the named collector.
+        """
+        return self.get(name).load()()
+
+
+registry = CollectorRegistry()
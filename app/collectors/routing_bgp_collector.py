@@ -1,11 +1,20 @@
-import xml.etree.ElementTree as ET
-
+from . import xml_backend
 from .base_collector import BaseCollector
+from .bgp_rib import RibAggregate, split_members
+from .capabilities import Unsupported
+from .field_schema import Field, Schema, metric_fields, stripped, to_int
 from .routing_helpers import dedupe_metrics
 
 _BGP = "<show><routing><protocol><bgp>"
 _BGP_END = "</bgp></protocol></routing></show>"
 
+RIB_HISTOGRAMS = {
+    "prefix_length": "Prefix length of {} routes",
+    "as_path_length": "AS path length of {} routes",
+    "med": "MED of {} routes",
+    "local_preference": "Local preference of {} routes",
+}
+
 BGP_COMMANDS = {
     "summary": f"{_BGP}<summary></summary>{_BGP_END}",
     "peer": f"{_BGP}<peer></peer>{_BGP_END}",
@@ -46,6 +55,21 @@ PEER_YES_NO_FIELDS = [
     "nexthop-peer",
 ]
 
+PEER_INFO_FIELDS = [
+    "peer-router-id",
+    "peer-address",
+    "local-address",
+    "peering-type",
+]
+
+PEER_GROUP_YES_NO_FIELDS = [
+    "aggregate-confed-as",
+    "soft-reset-support",
+    "nexthop-self",
+    "nexthop-thirdparty",
+    "nexthop-peer",
+]
+
 BGP_SUMMARY_YES_NO = [
     "reject-default-route",
     "install-route",
@@ -72,11 +96,73 @@ BGP_SUMMARY_INFO = [
     "cluster-id",
 ]
 
+SUMMARY_SCHEMA = Schema(
+    metric_fields(BGP_SUMMARY_NUMERIC, "int", "panos_bgp", "BGP")
+    + metric_fields(BGP_SUMMARY_YES_NO, "yes_no", "panos_bgp", "BGP")
+    + metric_fields(BGP_SUMMARY_INFO, "info", "panos_bgp", "BGP")
+)
+
+PEER_SCHEMA = Schema(
+    [
+        Field("peer-group", "label", default="unknown"),
+        Field("status", "label", default="unknown"),
+    ]
+    + metric_fields(PEER_NUMERIC_FIELDS, "int", "panos_bgp_peer", "BGP peer", lower=True)
+    + metric_fields(PEER_YES_NO_FIELDS, "yes_no", "panos_bgp_peer", "BGP peer")
+    + metric_fields(PEER_INFO_FIELDS, "info", "panos_bgp_peer", "BGP peer")
+)
+
+PEER_GROUP_SCHEMA = Schema(
+    [Field("type", "label", default="unknown")]
+    + metric_fields(PEER_GROUP_YES_NO_FIELDS, "yes_no", "panos_bgp_peer_group", "BGP peer group")
+)
+
+LOC_RIB_SCHEMA = Schema(
+    [
+        Field("prefix", "label", default="unknown"),
+        Field("flag", "label", default="", convert=stripped),
+        Field("nexthop", "label", default="", convert=stripped),
+        Field("received-from", "label", default="unknown"),
+        Field("as-path", "label", default=""),
+        Field("attr", "element"),
+        Field("flap-stat", "element"),
+    ]
+)
+
+LOC_RIB_ATTR_SCHEMA = Schema(
+    metric_fields(
+        ("weight", "med", "local-preference"), "int", "panos_bgp_loc_rib", "BGP local RIB"
+    )
+)
+
+FLAP_SCHEMA = Schema(
+    metric_fields(("flap-value",), "float", "panos_bgp_loc_rib", "BGP local RIB")
+    + metric_fields(("flap-count",), "int", "panos_bgp_loc_rib", "BGP local RIB")
+)
+
+RIB_OUT_SCHEMA = Schema(
+    [
+        Field("prefix", "label", default="unknown"),
+        Field("peer", "label", default="unknown"),
+        Field("nexthop", "label", default="", convert=stripped),
+        Field("advertise-status", "label", default="unknown"),
+        Field("as-path", "label", default=""),
+        Field("attr", "element"),
+    ]
+)
+
+RIB_OUT_ATTR_SCHEMA = Schema(
+    metric_fields(("med", "local-preference"), "int", "panos_bgp_rib_out", "BGP RIB-out")
+)
+
 
 class RoutingBgpCollector(BaseCollector):
     """
     Collector for BGP metrics from PAN-OS.
     Fetches summary, peer, peer-group, loc-rib-detail, and rib-out-detail.
+    Sub-commands the device rejects are skipped; all of them when summary is.
+    With bgp_rib_mode: aggregate the RIBs are reduced in one streaming pass to
+    per-VR and per-peer route counts and histograms instead of per-route series.
     """
 
     def __init__(self):
@@ -86,24 +172,10 @@ class RoutingBgpCollector(BaseCollector):
             help_text="BGP routing metrics from PAN-OS",
         )
 
-    def _fetch_op(self, device_config, cmd):
-        url = f"https://{device_config['host']}/api/"
-        params = {
-            "type": "op",
-            "cmd": cmd,
-            "key": device_config.get("api_key"),
-        }
-        response = self.session.get(
-            url,
-            params=params,
-            verify=False,
-            timeout=5,
-            auth=(device_config["username"], device_config["password"]),
-        )
-        response.raise_for_status()
-        return response.text
+    def default_commands(self):
+        return list(BGP_COMMANDS.values())
 
-    def collect(self, device_config):
+    def scrape(self, ctx):
         metrics = []
         errors = []
         parsers = {
@@ -113,15 +185,23 @@ class RoutingBgpCollector(BaseCollector):
             "loc_rib_detail": self._parse_loc_rib_detail,
             "rib_out_detail": self._parse_rib_out_detail,
         }
+        if ctx.device_config.get("bgp_rib_mode") == "aggregate":
+            parsers["loc_rib_detail"] = self._aggregate_loc_rib
+            parsers["rib_out_detail"] = self._aggregate_rib_out
         for subname, cmd in BGP_COMMANDS.items():
             try:
-                xml_data = self._fetch_op(device_config, cmd)
-                metrics.append(parsers[subname](xml_data, device_config))
+                xml_data = self.fetch(ctx, cmd)
+                metrics.append(self.parse_cached(ctx, xml_data, parsers[subname], cmd))
+            except Unsupported as e:
+                self.logger.debug(f"BGP {subname} skipped on device={ctx.host}: {e}")
+                # Without BGP summary (BGP not configured or not available) the rest fails too
+                if subname == "summary":
+                    break
             except Exception as e:
-                self.logger.error(f"BGP {subname} error for device={device_config['host']}: {e}")
+                self.logger.error(f"BGP {subname} error for device={ctx.host}: {e}")
                 errors.append(
                     self.prometheus_error_metric(
-                        device_config["host"],
+                        ctx.host,
                         f"routing_bgp_{subname}: {e}",
                     )
                 )
@@ -134,72 +214,25 @@ class RoutingBgpCollector(BaseCollector):
 
     def _parse_summary(self, xml_data, device_config):
         metrics = []
-        root = ET.fromstring(xml_data)
+        root = xml_backend.fromstring(xml_data)
         device = device_config["host"]
-        for entry in root.findall(".//result/entry"):
-            vr = entry.get("virtual-router", "unknown")
-            labels = {"virtual_router": vr}
-            for field in BGP_SUMMARY_NUMERIC:
-                text = (entry.findtext(field) or "").strip()
-                if not text:
-                    continue
-                tag = field.replace("-", "_")
-                try:
-                    metrics.append(
-                        self.prometheus_metric(
-                            metric=f"panos_bgp_{tag}",
-                            value=int(text),
-                            device=device,
-                            help_text=f"BGP {tag}",
-                            labels=labels,
-                        )
-                    )
-                except ValueError:
-                    pass
-            for field in BGP_SUMMARY_YES_NO:
-                text = (entry.findtext(field) or "").strip()
-                if text not in ("yes", "no"):
-                    continue
-                tag = field.replace("-", "_")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric=f"panos_bgp_{tag}",
-                        value=1 if text == "yes" else 0,
-                        device=device,
-                        help_text=f"BGP {tag} (1=yes, 0=no)",
-                        labels=labels,
-                    )
-                )
-            for field in BGP_SUMMARY_INFO:
-                text = (entry.findtext(field) or "").strip()
-                if not text:
-                    continue
-                tag = field.replace("-", "_")
-                info_labels = {**labels, "value": text}
-                metrics.append(
-                    self.prometheus_metric(
-                        metric=f"panos_bgp_{tag}_info",
-                        value=1,
-                        device=device,
-                        help_text=f"BGP {tag}",
-                        labels=info_labels,
-                    )
-                )
+        for entry in xml_backend.findall(root, ".//result/entry"):
+            labels = {"virtual_router": entry.get("virtual-router", "unknown")}
+            values = SUMMARY_SCHEMA.extract(entry)
+            metrics.extend(SUMMARY_SCHEMA.render(values, self.prometheus_metric, device, labels))
         return "".join(dedupe_metrics(metrics))
 
     def _parse_peer(self, xml_data, device_config):
         metrics = []
-        root = ET.fromstring(xml_data)
+        root = xml_backend.fromstring(xml_data)
         device = device_config["host"]
-        for entry in root.findall(".//result/entry"):
-            peer = entry.get("peer", "unknown")
-            vr = entry.get("vr", "unknown")
-            peer_group = entry.findtext("peer-group", default="unknown")
-            status = entry.findtext("status", default="unknown")
+        for entry in xml_backend.findall(root, ".//result/entry"):
+            values = PEER_SCHEMA.extract(entry)
+            status = values["status"]
             base_labels = {
-                "peer": peer,
-                "virtual_router": vr,
-                "peer_group": peer_group,
+                "peer": entry.get("peer", "unknown"),
+                "virtual_router": entry.get("vr", "unknown"),
+                "peer_group": values["peer-group"],
             }
             metrics.append(
                 self.prometheus_metric(
@@ -219,221 +252,204 @@ class RoutingBgpCollector(BaseCollector):
                     labels={**base_labels, "status": status},
                 )
             )
-            for field in PEER_NUMERIC_FIELDS:
-                text = (entry.findtext(field) or "").strip()
-                if not text:
-                    continue
-                tag = field.replace("-", "_").lower()
-                try:
-                    metrics.append(
-                        self.prometheus_metric(
-                            metric=f"panos_bgp_peer_{tag}",
-                            value=int(text),
-                            device=device,
-                            help_text=f"BGP peer {tag}",
-                            labels=base_labels,
-                        )
-                    )
-                except ValueError:
-                    pass
-            for field in PEER_YES_NO_FIELDS:
-                text = (entry.findtext(field) or "").strip()
-                if text not in ("yes", "no"):
-                    continue
-                tag = field.replace("-", "_")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric=f"panos_bgp_peer_{tag}",
-                        value=1 if text == "yes" else 0,
-                        device=device,
-                        help_text=f"BGP peer {tag} (1=yes, 0=no)",
-                        labels=base_labels,
-                    )
-                )
-            for info_field in ("peer-router-id", "peer-address", "local-address", "peering-type"):
-                text = (entry.findtext(info_field) or "").strip()
-                if not text:
-                    continue
-                tag = info_field.replace("-", "_")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric=f"panos_bgp_peer_{tag}_info",
-                        value=1,
-                        device=device,
-                        help_text=f"BGP peer {tag}",
-                        labels={**base_labels, "value": text},
-                    )
-                )
+            metrics.extend(PEER_SCHEMA.render(values, self.prometheus_metric, device, base_labels))
             for counter in entry.findall(".//prefix-counter/entry"):
-                afi_safi = counter.get("afi-safi", "unknown")
-                counter_labels = {**base_labels, "afi_safi": afi_safi}
+                counter_labels = {**base_labels, "afi_safi": counter.get("afi-safi", "unknown")}
                 for field in counter:
-                    text = (field.text or "").strip()
-                    if not text:
+                    value = to_int(field.text)
+                    if value is None:
                         continue
                     tag = field.tag.replace("-", "_")
-                    try:
-                        metrics.append(
-                            self.prometheus_metric(
-                                metric=f"panos_bgp_peer_prefix_{tag}",
-                                value=int(text),
-                                device=device,
-                                help_text=f"BGP peer prefix counter {tag}",
-                                labels=counter_labels,
-                            )
+                    metrics.append(
+                        self.prometheus_metric(
+                            metric=f"panos_bgp_peer_prefix_{tag}",
+                            value=value,
+                            device=device,
+                            help_text=f"BGP peer prefix counter {tag}",
+                            labels=counter_labels,
                         )
-                    except ValueError:
-                        pass
+                    )
         return "".join(dedupe_metrics(metrics))
 
     def _parse_peer_group(self, xml_data, device_config):
         metrics = []
-        root = ET.fromstring(xml_data)
+        root = xml_backend.fromstring(xml_data)
         device = device_config["host"]
-        for entry in root.findall(".//result/entry"):
-            peer_group = entry.get("peer-group", "unknown")
-            vr = entry.get("vr", "unknown")
-            labels = {"peer_group": peer_group, "virtual_router": vr}
-            pg_type = entry.findtext("type", default="unknown")
+        for entry in xml_backend.findall(root, ".//result/entry"):
+            labels = {
+                "peer_group": entry.get("peer-group", "unknown"),
+                "virtual_router": entry.get("vr", "unknown"),
+            }
+            values = PEER_GROUP_SCHEMA.extract(entry)
             metrics.append(
                 self.prometheus_metric(
                     metric="panos_bgp_peer_group_info",
                     value=1,
                     device=device,
                     help_text="BGP peer group",
-                    labels={**labels, "type": pg_type},
+                    labels={**labels, "type": values["type"]},
                 )
             )
-            for field in (
-                "aggregate-confed-as",
-                "soft-reset-support",
-                "nexthop-self",
-                "nexthop-thirdparty",
-                "nexthop-peer",
-            ):
-                text = (entry.findtext(field) or "").strip()
-                if text not in ("yes", "no"):
-                    continue
-                tag = field.replace("-", "_")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric=f"panos_bgp_peer_group_{tag}",
-                        value=1 if text == "yes" else 0,
-                        device=device,
-                        help_text=f"BGP peer group {tag} (1=yes, 0=no)",
-                        labels=labels,
-                    )
-                )
+            metrics.extend(PEER_GROUP_SCHEMA.render(values, self.prometheus_metric, device, labels))
         return "".join(dedupe_metrics(metrics))
 
     def _parse_loc_rib_detail(self, xml_data, device_config):
-        metrics = []
-        root = ET.fromstring(xml_data)
+        return self._parse_rib_detail(xml_data, device_config, "loc-rib", self._loc_rib_member)
+
+    def _parse_rib_out_detail(self, xml_data, device_config):
+        return self._parse_rib_detail(xml_data, device_config, "rib-out", self._rib_out_member)
+
+    def _parse_rib_detail(self, xml_data, device_config, element, render_member):
+        """
+        Render one series set per RIB member. With the parse cache enabled only
+        members that changed since the last response are parsed and rendered.
+        """
         device = device_config["host"]
-        for entry in root.findall(".//result/entry"):
-            vr = entry.get("vr", "unknown")
-            for member in entry.findall(".//loc-rib/member"):
-                prefix = member.findtext("prefix", default="unknown")
-                flag = (member.findtext("flag") or "").strip()
-                labels = {
-                    "virtual_router": vr,
-                    "prefix": prefix,
-                    "nexthop": (member.findtext("nexthop") or "").strip(),
-                    "received_from": member.findtext("received-from", default="unknown"),
-                    "as_path": member.findtext("as-path", default=""),
-                    "best": "yes" if "*" in flag else "no",
-                }
+        chunks = None
+        if self.parse_cache_enabled(device_config):
+            chunks = split_members(xml_data, element)
+        if chunks is None:
+            metrics = []
+            root = xml_backend.fromstring(xml_data)
+            for entry in xml_backend.findall(root, ".//result/entry"):
+                vr = entry.get("vr", "unknown")
+                for member in entry.findall(f".//{element}/member"):
+                    metrics.extend(render_member(member, vr, device))
+            return "".join(dedupe_metrics(metrics))
+
+        def render(pending):
+            # Changed members are parsed together as one small document
+            root = xml_backend.fromstring(
+                "<members>" + "".join(text for _, text in pending) + "</members>"
+            )
+            return [
+                render_member(member, vr, device)
+                for (vr, _), member in zip(pending, root, strict=True)
+            ]
+
+        metrics = self.parse_cache(device).chunks(
+            element, chunks, render, reuse=self.series_cache(device).touch
+        )
+        return "".join(dedupe_metrics(metrics))
+
+    def _loc_rib_member(self, member, vr, device):
+        metrics = []
+        values = LOC_RIB_SCHEMA.extract(member)
+        labels = {
+            "virtual_router": vr,
+            "prefix": values["prefix"],
+            "nexthop": values["nexthop"],
+            "received_from": values["received-from"],
+            "as_path": values["as-path"],
+            "best": "yes" if "*" in values["flag"] else "no",
+        }
+        metrics.append(
+            self.prometheus_metric(
+                metric="panos_bgp_loc_rib_route_info",
+                value=1,
+                device=device,
+                help_text="BGP local RIB route entry",
+                labels=labels,
+            )
+        )
+        for sub, schema in (("attr", LOC_RIB_ATTR_SCHEMA), ("flap-stat", FLAP_SCHEMA)):
+            if values.get(sub) is not None:
+                sub_values = schema.extract(values[sub])
+                metrics.extend(schema.render(sub_values, self.prometheus_metric, device, labels))
+        return metrics
+
+    def _rib_out_member(self, member, vr, device):
+        metrics = []
+        values = RIB_OUT_SCHEMA.extract(member)
+        labels = {
+            "virtual_router": vr,
+            "prefix": values["prefix"],
+            "peer": values["peer"],
+            "nexthop": values["nexthop"],
+            "advertise_status": values["advertise-status"],
+            "as_path": values["as-path"],
+        }
+        metrics.append(
+            self.prometheus_metric(
+                metric="panos_bgp_rib_out_route_info",
+                value=1,
+                device=device,
+                help_text="BGP RIB-out route entry",
+                labels=labels,
+            )
+        )
+        if values.get("attr") is not None:
+            attr_values = RIB_OUT_ATTR_SCHEMA.extract(values["attr"])
+            metrics.extend(
+                RIB_OUT_ATTR_SCHEMA.render(attr_values, self.prometheus_metric, device, labels)
+            )
+        return metrics
+
+    def _aggregate_loc_rib(self, xml_data, device_config):
+        return self._aggregate_rib("loc_rib", "BGP local RIB", xml_data, device_config)
+
+    def _aggregate_rib_out(self, xml_data, device_config):
+        return self._aggregate_rib("rib_out", "BGP RIB-out", xml_data, device_config)
+
+    def _aggregate_rib(self, kind, description, xml_data, device_config):
+        aggregate = RibAggregate(kind)
+        aggregate.add_response(xml_data)
+        return self.render_rib_aggregate(aggregate, description, device_config["host"])
+
+    def render_rib_aggregate(self, aggregate, description, device):
+        """
+        Render route counts and histograms; the series count is bounded by VRs,
+        peers and histogram buckets.
+        """
+        prefix = f"panos_bgp_{aggregate.kind}"
+        state_label = aggregate.state_label
+        metrics = []
+        for vr, counts in aggregate.by_vr.items():
+            for state, count in counts.routes.items():
                 metrics.append(
                     self.prometheus_metric(
-                        metric="panos_bgp_loc_rib_route_info",
-                        value=1,
+                        metric=f"{prefix}_routes",
+                        value=count,
                         device=device,
-                        help_text="BGP local RIB route entry",
-                        labels=labels,
+                        help_text=f"{description} routes",
+                        labels={"virtual_router": vr, state_label: state},
                     )
                 )
-                attr = member.find("attr")
-                if attr is not None:
-                    for field in ("weight", "med", "local-preference"):
-                        text = (attr.findtext(field) or "").strip()
-                        if not text:
-                            continue
-                        tag = field.replace("-", "_")
-                        try:
-                            metrics.append(
-                                self.prometheus_metric(
-                                    metric=f"panos_bgp_loc_rib_{tag}",
-                                    value=int(text),
-                                    device=device,
-                                    help_text=f"BGP local RIB {tag}",
-                                    labels=labels,
-                                )
-                            )
-                        except ValueError:
-                            pass
-                flap = member.find("flap-stat")
-                if flap is not None:
-                    for field in ("flap-value", "flap-count"):
-                        text = (flap.findtext(field) or "").strip()
-                        if not text:
-                            continue
-                        tag = field.replace("-", "_")
-                        try:
-                            value = float(text) if field == "flap-value" else int(text)
-                            metrics.append(
-                                self.prometheus_metric(
-                                    metric=f"panos_bgp_loc_rib_{tag}",
-                                    value=value,
-                                    device=device,
-                                    help_text=f"BGP local RIB {tag}",
-                                    labels=labels,
-                                )
-                            )
-                        except ValueError:
-                            pass
-        return "".join(dedupe_metrics(metrics))
-
-    def _parse_rib_out_detail(self, xml_data, device_config):
-        metrics = []
-        root = ET.fromstring(xml_data)
-        device = device_config["host"]
-        for entry in root.findall(".//result/entry"):
-            vr = entry.get("vr", "unknown")
-            for member in entry.findall(".//rib-out/member"):
-                labels = {
-                    "virtual_router": vr,
-                    "prefix": member.findtext("prefix", default="unknown"),
-                    "peer": member.findtext("peer", default="unknown"),
-                    "nexthop": (member.findtext("nexthop") or "").strip(),
-                    "advertise_status": member.findtext("advertise-status", default="unknown"),
-                    "as_path": member.findtext("as-path", default=""),
-                }
+            for (peer, state), count in counts.peer_routes.items():
                 metrics.append(
                     self.prometheus_metric(
-                        metric="panos_bgp_rib_out_route_info",
-                        value=1,
+                        metric=f"{prefix}_peer_routes",
+                        value=count,
                         device=device,
-                        help_text="BGP RIB-out route entry",
-                        labels=labels,
+                        help_text=f"{description} routes per peer",
+                        labels={"virtual_router": vr, "peer": peer, state_label: state},
                     )
                 )
-                attr = member.find("attr")
-                if attr is not None:
-                    for field in ("med", "local-preference"):
-                        text = (attr.findtext(field) or "").strip()
-                        if not text:
-                            continue
-                        tag = field.replace("-", "_")
-                        try:
-                            metrics.append(
-                                self.prometheus_metric(
-                                    metric=f"panos_bgp_rib_out_{tag}",
-                                    value=int(text),
-                                    device=device,
-                                    help_text=f"BGP RIB-out {tag}",
-                                    labels=labels,
-                                )
-                            )
-                        except ValueError:
-                            pass
-        return "".join(dedupe_metrics(metrics))
+            for (name, afi), histogram in sorted(
+                counts.histograms.items(), key=lambda item: (item[0][0], item[0][1] or "")
+            ):
+                labels = {"virtual_router": vr}
+                if afi is not None:
+                    labels["afi"] = afi
+                metrics.append(
+                    self.prometheus_histogram(
+                        f"{prefix}_route_{name}",
+                        histogram,
+                        device,
+                        RIB_HISTOGRAMS[name].format(description),
+                        labels,
+                    )
+                )
+        return "".join(metrics)
+
+    def prometheus_histogram(self, metric, histogram, device, help_text, labels):
+        """
+        Format a histogram's HELP/TYPE, _bucket, _sum and _count lines.
+        """
+        cache = self.series_cache(device)
+        lines = [cache.header(metric, help_text, "histogram")]
+        for le, count in histogram.cumulative():
+            lines.append(f"{cache.prefix(f'{metric}_bucket', {**labels, 'le': str(le)})} {count}\n")
+        lines.append(f"{cache.prefix(f'{metric}_sum', labels)} {histogram.sum}\n")
+        lines.append(f"{cache.prefix(f'{metric}_count', labels)} {histogram.count}\n")
+        return "".join(lines)
@@ -1,5 +1,4 @@
-import xml.etree.ElementTree as ET
-
+from . import xml_backend
 from .base_collector import BaseCollector
 from .routing_helpers import dedupe_metrics, parse_route_category_metrics
 
@@ -20,7 +19,7 @@ class RoutingResourceCollector(BaseCollector):
     def parse(self, xml_data, device_config):
         metrics = []
         try:
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             device = device_config["host"]
             entry = root.find(".//result/entry")
             if entry is not None:
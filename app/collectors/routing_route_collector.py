@@ -1,13 +1,39 @@
-import xml.etree.ElementTree as ET
+import time
 
+from . import xml_backend
 from .base_collector import BaseCollector
+from .capabilities import Unsupported
+from .field_schema import Field, Schema, stripped
 from .routing_helpers import dedupe_metrics
 
+# virtual_router value that discovers VRs from the routing summary
+AUTO = "auto"
+DISCOVERY_TTL = 300
+SUMMARY_COMMAND = "<show><routing><summary></summary></routing></show>"
+
+ROUTE_SCHEMA = Schema(
+    [
+        Field("virtual-router", "label", default="unknown"),
+        Field("destination", "label", default="unknown"),
+        Field("nexthop", "label", default=""),
+        Field("interface", "label", default=""),
+        Field("route-table", "label", default="unknown"),
+        Field("flags", "label", default="", convert=stripped),
+        Field("metric", "int", "panos_routing_route_metric", "Routing table entry metric"),
+        Field(
+            "age", "int", "panos_routing_route_age_seconds", "Routing table entry age in seconds"
+        ),
+    ]
+)
+
 
 class RoutingRouteCollector(BaseCollector):
     """
     Collector for routing table metrics from PAN-OS.
     Parses <show><routing><route><virtual-router>VR</virtual-router></route></routing></show> XML.
+    - `virtual_router` may be a name, a list of names, or `auto` to discover
+      VRs from <show><routing><summary>
+    - Each VR is fetched concurrently (bounded per device) and the results merged
     """
 
     def __init__(self):
@@ -16,30 +42,99 @@ class RoutingRouteCollector(BaseCollector):
             api_command="",
             help_text="Routing table metrics from PAN-OS",
         )
+        # host -> (expiry, [vr names]) for auto-discovered VRs
+        self._discovered = {}
 
-    def _api_command(self, device_config):
-        vr = device_config.get("virtual_router", "default")
+    @staticmethod
+    def vr_command(vr):
         return (
             f"<show><routing><route><virtual-router>{vr}</virtual-router></route></routing></show>"
         )
 
-    def collect(self, device_config):
-        self.api_command = self._api_command(device_config)
-        return super().collect(device_config)
+    def command(self, device_config):
+        vr = device_config.get("virtual_router", "default")
+        if isinstance(vr, list) or vr == AUTO:
+            return ""
+        return self.vr_command(vr)
+
+    def virtual_routers(self, ctx):
+        """
+        Resolve the device's VR setting to a list of VR names.
+        """
+        vr = ctx.device_config.get("virtual_router", "default")
+        if isinstance(vr, list):
+            return vr
+        if vr != AUTO:
+            return [vr]
+        cached = self._discovered.get(ctx.host)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        root = xml_backend.fromstring(self.fetch(ctx, SUMMARY_COMMAND))
+        names = [
+            e.get("name")
+            for e in xml_backend.findall(root, ".//result/entry")
+            if e.get("name") is not None
+        ]
+        ttl = ctx.device_config.get("virtual_router_discovery_ttl", DISCOVERY_TTL)
+        self._discovered[ctx.host] = (time.monotonic() + ttl, names)
+        return names
+
+    def export_state(self):
+        # Discovery expiry is kept as wall-clock time so it survives a restart
+        offset = time.time() - time.monotonic()
+        # Copied first: scrapes may add devices while the state is saved
+        discovered = tuple(self._discovered.items())
+        return {host: [expires + offset, names] for host, (expires, names) in discovered}
+
+    def import_state(self, state):
+        offset = time.monotonic() - time.time()
+        for host, (expires, names) in state.items():
+            self._discovered.setdefault(host, (expires + offset, names))
+
+    def scrape(self, ctx):
+        try:
+            vrs = self.virtual_routers(ctx)
+        except Unsupported as e:
+            self.logger.debug(f"VR discovery skipped on device={ctx.host}: {e}")
+            return ""
+        except Exception as e:
+            self.logger.error(f"VR discovery error for device={ctx.host}: {e}")
+            return self.prometheus_error_metric(ctx.host, f"routing_route_discovery: {e}")
+        metrics = []
+        errors = []
+        results = self.fetch_concurrently(ctx, [self.vr_command(vr) for vr in vrs])
+        for vr, (xml_data, error) in zip(vrs, results, strict=True):
+            if isinstance(error, Unsupported):
+                continue
+            if error is not None:
+                self.logger.error(f"Route error for device={ctx.host} vr={vr}: {error}")
+                errors.append(
+                    self.prometheus_error_metric(ctx.host, f"routing_route_{vr}: {error}")
+                )
+                continue
+            result = self.parse_cached(ctx, xml_data, key=self.vr_command(vr))
+            if "# TYPE panos_error gauge" in result:
+                errors.append(result)
+            else:
+                metrics.append(result)
+        if errors and not metrics:
+            return errors[0]
+        return "".join(errors + metrics)
 
     def parse(self, xml_data, device_config):
         metrics = []
         try:
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             device = device_config["host"]
-            for entry in root.findall(".//result/entry"):
+            for entry in xml_backend.findall(root, ".//result/entry"):
+                values = ROUTE_SCHEMA.extract(entry)
                 labels = {
-                    "virtual_router": entry.findtext("virtual-router", default="unknown"),
-                    "destination": entry.findtext("destination", default="unknown"),
-                    "nexthop": entry.findtext("nexthop", default=""),
-                    "interface": entry.findtext("interface", default=""),
-                    "route_table": entry.findtext("route-table", default="unknown"),
-                    "flags": (entry.findtext("flags", default="") or "").strip(),
+                    "virtual_router": values["virtual-router"],
+                    "destination": values["destination"],
+                    "nexthop": values["nexthop"],
+                    "interface": values["interface"],
+                    "route_table": values["route-table"],
+                    "flags": values["flags"],
                 }
                 metrics.append(
                     self.prometheus_metric(
@@ -50,34 +145,7 @@ class RoutingRouteCollector(BaseCollector):
                         labels=labels,
                     )
                 )
-                metric_text = (entry.findtext("metric") or "").strip()
-                if metric_text:
-                    try:
-                        metrics.append(
-                            self.prometheus_metric(
-                                metric="panos_routing_route_metric",
-                                value=int(metric_text),
-                                device=device,
-                                help_text="Routing table entry metric",
-                                labels=labels,
-                            )
-                        )
-                    except ValueError:
-                        pass
-                age_text = (entry.findtext("age") or "").strip()
-                if age_text:
-                    try:
-                        metrics.append(
-                            self.prometheus_metric(
-                                metric="panos_routing_route_age_seconds",
-                                value=int(age_text),
-                                device=device,
-                                help_text="Routing table entry age in seconds",
-                                labels=labels,
-                            )
-                        )
-                    except ValueError:
-                        pass
+                metrics.extend(ROUTE_SCHEMA.render(values, self.prometheus_metric, device, labels))
         except Exception as e:
             return self.prometheus_error_metric(device_config["host"], f"routing_route_parse: {e}")
         return "".join(dedupe_metrics(metrics))
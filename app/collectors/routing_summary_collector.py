@@ -1,6 +1,6 @@
-import xml.etree.ElementTree as ET
-
+from . import xml_backend
 from .base_collector import BaseCollector
+from .field_schema import to_int, yes_no
 from .routing_helpers import dedupe_metrics, parse_route_category_metrics
 
 
@@ -20,9 +20,9 @@ class RoutingSummaryCollector(BaseCollector):
     def parse(self, xml_data, device_config):
         metrics = []
         try:
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             device = device_config["host"]
-            for entry in root.findall(".//result/entry"):
+            for entry in xml_backend.findall(root, ".//result/entry"):
                 vr_name = entry.get("name")
                 if vr_name is None:
                     metrics.extend(
@@ -40,33 +40,20 @@ class RoutingSummaryCollector(BaseCollector):
                 labels = {"virtual_router": vr_name}
                 for elem in bgp:
                     tag = elem.tag.replace("-", "_")
-                    value = (elem.text or "").strip()
-                    if not value:
-                        continue
-                    if value in ("yes", "no"):
-                        metrics.append(
-                            self.prometheus_metric(
-                                metric=f"panos_routing_summary_bgp_{tag}",
-                                value=1 if value == "yes" else 0,
-                                device=device,
-                                help_text=f"BGP {tag} for virtual router {vr_name}",
-                                labels=labels,
-                            )
-                        )
+                    value = yes_no(elem.text)
+                    if value is None:
+                        value = to_int(elem.text)
+                    if value is None:
                         continue
-                    try:
-                        num_value = int(value)
-                        metrics.append(
-                            self.prometheus_metric(
-                                metric=f"panos_routing_summary_bgp_{tag}",
-                                value=num_value,
-                                device=device,
-                                help_text=f"BGP {tag} for virtual router {vr_name}",
-                                labels=labels,
-                            )
+                    metrics.append(
+                        self.prometheus_metric(
+                            metric=f"panos_routing_summary_bgp_{tag}",
+                            value=value,
+                            device=device,
+                            help_text=f"BGP {tag} for virtual router {vr_name}",
+                            labels=labels,
                         )
-                    except ValueError:
-                        pass
+                    )
         except Exception as e:
             return self.prometheus_error_metric(
                 device_config["host"], f"routing_summary_parse: {e}"
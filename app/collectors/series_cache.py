@@ -0,0 +1,101 @@
+import sys
+import threading
+from contextlib import contextmanager
+
+
+class SeriesCache:
+    """
+    Per-device cache of pre-rendered Prometheus text.
+    - HELP/TYPE headers keyed by (metric, help, type)
+    - `name{labels}` prefixes keyed by interned (metric, label items) tuples
+    - Entries not used during a scrape are evicted when it ends
+    - Output reused from the parse cache touches the entries it was rendered from
+    """
+
+    def __init__(self):
+        self._entries = {}
+        # rendered text -> key, to find the entries behind reused output
+        self._keys = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @contextmanager
+    def scrape(self):
+        """
+        Bracket one scrape: entries not touched before it ends are evicted.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        try:
+            yield self
+        finally:
+            self.evict(generation)
+
+    def evict(self, generation):
+        """
+        Drop entries last used before the given generation.
+        """
+        with self._lock:
+            stale = [k for k, entry in self._entries.items() if entry[1] < generation]
+            for key in stale:
+                self._keys.pop(self._entries.pop(key)[0], None)
+        return len(stale)
+
+    def _store(self, key, text):
+        with self._lock:
+            self._entries[key] = [text, self._generation]
+            self._keys[text] = key
+        return text
+
+    def touch(self, output):
+        """
+        Mark the headers and prefixes behind already rendered output as used in
+        this scrape, so reusing the output does not evict them.
+        """
+        generation = self._generation
+        lines = output.split("\n")
+        with self._lock:
+            for i, line in enumerate(lines):
+                if line.startswith("# HELP "):
+                    text = f"{line}\n{lines[i + 1]}\n" if i + 1 < len(lines) else None
+                elif not line or line.startswith("#"):
+                    continue
+                else:
+                    text = line.rpartition(" ")[0]
+                key = self._keys.get(text)
+                if key is not None:
+                    self._entries[key][1] = generation
+
+    def header(self, metric, help_text, metric_type):
+        key = ("#", metric, help_text, metric_type)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] = self._generation
+            return entry[0]
+        return self._store(key, f"# HELP {metric} {help_text}\n# TYPE {metric} {metric_type}\n")
+
+    def prefix(self, metric, labels):
+        """
+        Return the rendered `metric{k="v",...}` prefix for a series.
+        """
+        items = tuple(labels.items()) if labels else ()
+        entry = self._entries.get((metric, items))
+        if entry is not None:
+            entry[1] = self._generation
+            return entry[0]
+        # Intern names and values so series repeated across devices share strings
+        metric = sys.intern(metric)
+        items = tuple((sys.intern(k), _intern(v)) for k, v in items)
+        if items:
+            text = metric + "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+        else:
+            text = metric
+        return self._store((metric, items), text)
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
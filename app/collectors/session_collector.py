@@ -1,6 +1,6 @@
-import xml.etree.ElementTree as ET
-
+from . import xml_backend
 from .base_collector import BaseCollector
+from .routing_helpers import dedupe_metrics
 
 
 class SessionCollector(BaseCollector):
@@ -22,7 +22,7 @@ class SessionCollector(BaseCollector):
         """
         metrics = []
         try:
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             device = device_config["host"]
             result = root.find(".//result")
             if result is not None:
@@ -78,17 +78,4 @@ class SessionCollector(BaseCollector):
                     )
         except Exception as e:
             return self.prometheus_error_metric(device_config["host"], f"session_info_parse: {e}")
-        # Deduplicate metrics
-        seen = set()
-        deduped_metrics = []
-        for m in metrics:
-            lines = m.split("\n")
-            metric_line = next((line for line in lines if line and not line.startswith("#")), None)
-            if metric_line:
-                metric_name = metric_line.split("{")[0]
-                label_str = metric_line.split("{")[1].split("}")[0] if "{" in metric_line else ""
-                key = (metric_name, label_str)
-                if key not in seen:
-                    seen.add(key)
-                    deduped_metrics.append(m)
-        return "".join(deduped_metrics)
+        return "".join(dedupe_metrics(metrics))
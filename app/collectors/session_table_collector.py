@@ -0,0 +1,173 @@
+import time
+from collections import Counter
+
+from . import xml_backend
+from .base_collector import BaseCollector
+from .capabilities import Unsupported
+
+# PAN-OS returns at most this many sessions per `show session all` call
+PAGE_SIZE = 1024
+DEFAULT_MAX_PAGES = 50
+DEFAULT_MAX_SECONDS = 10
+DEFAULT_MAX_SERIES = 500
+
+# Label value for sessions that fall outside a family's cardinality cap
+OTHER = "__other__"
+
+PROTOCOLS = {"1": "icmp", "6": "tcp", "17": "udp", "47": "gre", "50": "esp", "58": "ipv6-icmp"}
+
+# family: (label names, help text)
+FAMILIES = {
+    "zone_pair": (
+        ("vsys", "from_zone", "to_zone"),
+        "Active sessions by source and destination zone",
+    ),
+    "application": (("vsys", "application"), "Active sessions by application"),
+    "protocol": (("vsys", "protocol"), "Active sessions by IP protocol"),
+}
+
+
+class SessionAggregate:
+    """
+    Running session counts per family, bounded to max_series label sets each.
+    Once a family is full, new label sets are counted under OTHER.
+    """
+
+    def __init__(self, max_series=DEFAULT_MAX_SERIES):
+        self.max_series = max_series
+        self.counts = {family: Counter() for family in FAMILIES}
+        self.sessions = 0
+
+    def _add(self, family, key):
+        counts = self.counts[family]
+        if key not in counts and len(counts) >= self.max_series:
+            key = key[:1] + (OTHER,) * (len(key) - 1)
+        counts[key] += 1
+
+    def add(self, vsys, from_zone, to_zone, application, proto):
+        self.sessions += 1
+        self._add("zone_pair", (vsys, from_zone, to_zone))
+        self._add("application", (vsys, application))
+        self._add("protocol", (vsys, PROTOCOLS.get(proto, proto)))
+
+    def add_page(self, xml_data):
+        """
+        Stream one page of `show session all` output into the counts.
+        Returns (sessions on the page, last session index seen).
+        """
+        count = 0
+        last_idx = None
+        for entry in xml_backend.iterparse(xml_data, "entry"):
+            self.add(
+                entry.findtext("vsys") or "vsys1",
+                entry.findtext("from") or "unknown",
+                entry.findtext("to") or "unknown",
+                entry.findtext("application") or "unknown",
+                entry.findtext("proto") or "unknown",
+            )
+            idx = entry.findtext("idx")
+            if idx and idx.isdigit():
+                last_idx = int(idx)
+            count += 1
+            entry.clear()
+        return count, last_idx
+
+
+class SessionTableCollector(BaseCollector):
+    """
+    Collector for session counts aggregated from the session table.
+    Pages through <show><session><all><start-at>N</start-at></all></session></show>.
+    - Sessions are streamed page by page into bounded per-family counters;
+      no per-session state or series is kept
+    - Optional per-device `session_table` settings: max_pages, max_seconds, max_series
+    - panos_session_table_truncated is 1 when a limit stopped the walk early
+    """
+
+    def __init__(self):
+        super().__init__(
+            name="session_table_collector",
+            api_command="<show><session><all></all></session></show>",
+            help_text="Session table aggregates from PAN-OS",
+        )
+
+    @staticmethod
+    def page_command(start_at):
+        return f"<show><session><all><start-at>{start_at}</start-at></all></session></show>"
+
+    def default_commands(self):
+        return [self.page_command(1)]
+
+    def scrape(self, ctx):
+        """
+        Walk the session table within the device's page and time limits.
+        """
+        settings = ctx.device_config.get("session_table") or {}
+        max_pages = settings.get("max_pages", DEFAULT_MAX_PAGES)
+        max_seconds = settings.get("max_seconds", DEFAULT_MAX_SECONDS)
+        aggregate = SessionAggregate(settings.get("max_series", DEFAULT_MAX_SERIES))
+        # Every page fetch is bounded by what is left of max_seconds
+        walk_deadline = time.monotonic() + max_seconds
+        page_ctx = ctx.with_deadline(walk_deadline)
+        start_at = 1
+        pages = 0
+        truncated = 0
+        while True:
+            try:
+                count, last_idx = aggregate.add_page(
+                    self.fetch(page_ctx, self.page_command(start_at))
+                )
+            except Unsupported as e:
+                self.logger.debug(f"Skipped on device={ctx.host}: {e}")
+                return ""
+            except Exception as e:
+                if pages and time.monotonic() >= walk_deadline:
+                    # max_seconds ran out during a page: report what was walked so far
+                    truncated = 1
+                    break
+                self.logger.error(f"HTTP error for device={ctx.host}: {e}")
+                return self.prometheus_error_metric(ctx.host, str(e))
+            pages += 1
+            if count < PAGE_SIZE or last_idx is None:
+                break
+            # The last page was full, so more sessions may follow
+            if pages >= max_pages or time.monotonic() >= walk_deadline:
+                truncated = 1
+                break
+            start_at = last_idx + 1
+        return self.render(aggregate, ctx.host, pages, truncated)
+
+    def parse(self, xml_data, device_config):
+        """
+        Aggregate a single page of session table XML.
+        """
+        try:
+            aggregate = SessionAggregate()
+            aggregate.add_page(xml_data)
+        except Exception as e:
+            return self.prometheus_error_metric(device_config["host"], f"session_table_parse: {e}")
+        return self.render(aggregate, device_config["host"], 1, 0)
+
+    def render(self, aggregate, device, pages, truncated):
+        metrics = []
+        for family, (label_names, help_text) in FAMILIES.items():
+            for key, count in sorted(aggregate.counts[family].items()):
+                metrics.append(
+                    self.prometheus_metric(
+                        metric=f"panos_session_table_{family}_sessions",
+                        value=count,
+                        device=device,
+                        help_text=help_text,
+                        labels=dict(zip(label_names, key, strict=True)),
+                    )
+                )
+        for metric, value, help_text in (
+            ("panos_session_table_sessions_scanned", aggregate.sessions, "Sessions aggregated"),
+            ("panos_session_table_pages", pages, "Session table pages fetched"),
+            (
+                "panos_session_table_truncated",
+                truncated,
+                "1 if the page or time limit stopped the session table walk",
+            ),
+        ):
+            metrics.append(self.prometheus_metric(metric, value, device, help_text=help_text))
+        return "".join(metrics)
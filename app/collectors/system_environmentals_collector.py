@@ -1,5 +1,4 @@
-import xml.etree.ElementTree as ET
-
+from . import xml_backend
 from .base_collector import BaseCollector
 
 
@@ -22,10 +21,10 @@ class SystemEnvironmentalsCollector(BaseCollector):
         """
         metrics = []
         try:
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             device = device_config["host"]
             # Thermal sensors
-            for entry in root.findall(".//thermal//entry"):
+            for entry in xml_backend.findall(root, ".//thermal//entry"):
                 desc = entry.findtext("description", default="unknown")
                 temp = entry.findtext("DegreesC")
                 alarm = entry.findtext("alarm", default="False").lower() == "true"
@@ -40,7 +39,7 @@ class SystemEnvironmentalsCollector(BaseCollector):
                         )
                     )
             # Fan sensors
-            for entry in root.findall(".//fan//entry"):
+            for entry in xml_backend.findall(root, ".//fan//entry"):
                 desc = entry.findtext("description", default="unknown")
                 rpm = entry.findtext("RPMs")
                 alarm = entry.findtext("alarm", default="False").lower() == "true"
@@ -56,7 +55,7 @@ class SystemEnvironmentalsCollector(BaseCollector):
                     )
             # Power sensors (voltage) with deduplication
             seen_power_sensors = set()
-            for entry in root.findall(".//power//entry"):
+            for entry in xml_backend.findall(root, ".//power//entry"):
                 desc = entry.findtext("description", default="unknown")
                 volts = entry.findtext("Volts")
                 alarm = entry.findtext("alarm", default="False").lower() == "true"
@@ -73,7 +72,7 @@ class SystemEnvironmentalsCollector(BaseCollector):
                     )
                     seen_power_sensors.add(key)
             # Power supply status
-            for entry in root.findall(".//power-supply//entry"):
+            for entry in xml_backend.findall(root, ".//power-supply//entry"):
                 desc = entry.findtext("description", default="unknown")
                 inserted = entry.findtext("Inserted", default="False").lower() == "true"
                 alarm = entry.findtext("alarm", default="False").lower() == "true"
@@ -1,12 +1,96 @@
-import xml.etree.ElementTree as ET
-
+from . import xml_backend
 from .base_collector import BaseCollector
+from .capabilities import capabilities
+from .field_schema import Field, Schema, findtext
+from .limiter import device_limiter
+from .routing_helpers import dedupe_metrics
+
+
+def parse_uptime(uptime_str):
+    # Example: '0 days, 20:32:51'
+    try:
+        days_part, time_part = uptime_str.split(" days, ")
+        days = int(days_part.strip())
+        h, m, s = map(int, time_part.strip().split(":"))
+        return days * 86400 + h * 3600 + m * 60 + s
+    except Exception:
+        return 0
+
+
+SYSTEM_INFO_SCHEMA = Schema(
+    [
+        Field(
+            "uptime",
+            "int",
+            "panos_system_uptime_seconds",
+            "System uptime in seconds",
+            default=0,
+            convert=parse_uptime,
+        ),
+        Field(
+            "sw-version",
+            "info",
+            "panos_system_software_version_info",
+            "System software version (info label)",
+            label="version",
+            default="unknown",
+            convert=findtext,
+        ),
+        Field(
+            "model",
+            "info",
+            "panos_system_model_info",
+            "System model (info label)",
+            label="model",
+            default="unknown",
+            convert=findtext,
+        ),
+        Field(
+            "serial",
+            "info",
+            "panos_system_serial_info",
+            "System serial (info label)",
+            label="serial",
+            default="unknown",
+            convert=findtext,
+        ),
+        Field(
+            "multi-vsys",
+            "int",
+            "panos_system_multi_vsys_enabled",
+            "System multi-vsys enabled (1=on, 0=off)",
+            default=0,
+            convert=lambda text: 1 if (text or "").lower() == "on" else 0,
+        ),
+        Field(
+            "operational-mode",
+            "info",
+            "panos_system_operational_mode_info",
+            "System operational mode (info label)",
+            label="mode",
+            default="unknown",
+            convert=findtext,
+        ),
+        Field(
+            "device-certificate-status",
+            "info",
+            "panos_system_device_certificate_status_info",
+            "Device certificate status (info label)",
+            label="status",
+            default="unknown",
+            convert=findtext,
+        ),
+        Field("mac_count", "raw", "panos_system_mac_count", "System MAC address count"),
+    ]
+)
 
 
 class SystemInfoCollector(BaseCollector):
     """
     Collector for system info metrics from PAN-OS.
     Parses <show><system><info></info></system></show> XML.
+    - Reports the device model to the request limiter for model_limits
+    - Reports model and sw-version for capability probing
     """
 
     def __init__(self):
@@ -22,123 +106,15 @@ class SystemInfoCollector(BaseCollector):
         """
         metrics = []
         try:
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             system = root.find(".//system")
             device = device_config["host"]
             if system is not None:
-                # Uptime (convert to seconds if possible)
-                uptime_str = system.findtext("uptime", default="0")
-                uptime_seconds = self._parse_uptime(uptime_str)
-                metrics.append(
-                    self.prometheus_metric(
-                        metric="panos_system_uptime_seconds",
-                        value=uptime_seconds,
-                        device=device,
-                        help_text="System uptime in seconds",
-                    )
-                )
-                # Software version
-                sw_version = system.findtext("sw-version", default="unknown")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric="panos_system_software_version_info",
-                        value=1,
-                        device=device,
-                        help_text="System software version (info label)",
-                        labels={"version": sw_version},
-                    )
-                )
-                # Model
-                model = system.findtext("model", default="unknown")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric="panos_system_model_info",
-                        value=1,
-                        device=device,
-                        help_text="System model (info label)",
-                        labels={"model": model},
-                    )
-                )
-                # Serial
-                serial = system.findtext("serial", default="unknown")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric="panos_system_serial_info",
-                        value=1,
-                        device=device,
-                        help_text="System serial (info label)",
-                        labels={"serial": serial},
-                    )
-                )
-                # Multi-vsys
-                multi_vsys = (
-                    1 if system.findtext("multi-vsys", default="off").lower() == "on" else 0
-                )
-                metrics.append(
-                    self.prometheus_metric(
-                        metric="panos_system_multi_vsys_enabled",
-                        value=multi_vsys,
-                        device=device,
-                        help_text="System multi-vsys enabled (1=on, 0=off)",
-                    )
-                )
-                # Operational mode
-                op_mode = system.findtext("operational-mode", default="unknown")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric="panos_system_operational_mode_info",
-                        value=1,
-                        device=device,
-                        help_text="System operational mode (info label)",
-                        labels={"mode": op_mode},
-                    )
-                )
-                # Device certificate status
-                cert_status = system.findtext("device-certificate-status", default="unknown")
-                metrics.append(
-                    self.prometheus_metric(
-                        metric="panos_system_device_certificate_status_info",
-                        value=1,
-                        device=device,
-                        help_text="Device certificate status (info label)",
-                        labels={"status": cert_status},
-                    )
-                )
-                # MAC count
-                mac_count = system.findtext("mac_count", default=None)
-                if mac_count is not None:
-                    metrics.append(
-                        self.prometheus_metric(
-                            metric="panos_system_mac_count",
-                            value=mac_count,
-                            device=device,
-                            help_text="System MAC address count",
-                        )
-                    )
+                values = SYSTEM_INFO_SCHEMA.extract(system)
+                if values["model"] != "unknown":
+                    device_limiter.set_model(device, values["model"])
+                    capabilities.set_info(device, values["model"], values["sw-version"])
+                metrics.extend(SYSTEM_INFO_SCHEMA.render(values, self.prometheus_metric, device))
         except Exception as e:
             return self.prometheus_error_metric(device_config["host"], f"system_info_parse: {e}")
-        # Deduplicate metrics
-        seen = set()
-        deduped_metrics = []
-        for m in metrics:
-            # Extract metric name and label set from the metric string
-            lines = m.split("\n")
-            metric_line = next((line for line in lines if line and not line.startswith("#")), None)
-            if metric_line:
-                metric_name = metric_line.split("{")[0]
-                label_str = metric_line.split("{")[1].split("}")[0] if "{" in metric_line else ""
-                key = (metric_name, label_str)
-                if key not in seen:
-                    seen.add(key)
-                    deduped_metrics.append(m)
-        return "".join(deduped_metrics)
-
-    def _parse_uptime(self, uptime_str):
-        # Example: '0 days, 20:32:51'
-        try:
-            days_part, time_part = uptime_str.split(" days, ")
-            days = int(days_part.strip())
-            h, m, s = map(int, time_part.strip().split(":"))
-            return days * 86400 + h * 3600 + m * 60 + s
-        except Exception:
-            return 0
+        return "".join(dedupe_metrics(metrics))
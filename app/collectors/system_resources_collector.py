@@ -0,0 +1,109 @@
+import re
+
+from . import xml_backend
+from .base_collector import BaseCollector
+from .mgmt_load import mgmt_load
+from .routing_helpers import dedupe_metrics
+
+LOAD_RE = re.compile(r"load average:\s*([\d.]+),\s*([\d.]+),\s*([\d.]+)")
+# Matches both "3.1 us," (newer top) and "3.1%us," (older top)
+CPU_RE = re.compile(r"([\d.]+)\s*%?\s*(us|sy|ni|id|wa|hi|si|st)\b")
+# Matches "3935.6 total" after a "MiB Mem :" prefix and "4040084k total"
+MEMORY_RE = re.compile(r"([\d.]+)([kmg]?)\s+(total|free|used|buff/cache|buffers|cached)\b")
+
+UNITS = {"KiB": 1024, "MiB": 1024**2, "GiB": 1024**3}
+SUFFIXES = {"k": 1024, "m": 1024**2, "g": 1024**3}
+
+
+def parse_top(text):
+    """
+    Parse the `top` snapshot returned by `show system resources`.
+    Returns {"load": [1m, 5m, 15m], "cpu": {mode: percent}, "memory": {...}, "swap": {...}}
+    with memory values in bytes; sections missing from the text are left empty.
+    """
+    result = {"load": [], "cpu": {}, "memory": {}, "swap": {}}
+    for line in text.splitlines():
+        match = LOAD_RE.search(line)
+        if match:
+            result["load"] = [float(v) for v in match.groups()]
+            continue
+        head, _, rest = line.partition(":")
+        if "Cpu" in head:
+            result["cpu"] = {mode: float(value) for value, mode in CPU_RE.findall(rest)}
+            continue
+        section = "memory" if "Mem" in head else "swap" if "Swap" in head else None
+        if section is None:
+            continue
+        scale = next((size for unit, size in UNITS.items() if unit in head), 1024)
+        for value, suffix, kind in MEMORY_RE.findall(rest):
+            factor = SUFFIXES[suffix] if suffix else scale
+            result[section][kind.replace("/", "_")] = int(float(value) * factor)
+    return result
+
+
+class SystemResourcesCollector(BaseCollector):
+    """
+    Collector for management-plane resources from PAN-OS.
+    Parses the `top` output of <show><system><resources></resources></system></show>.
+    - Emits management CPU by mode, load average and memory/swap usage
+    - Records CPU and load for adaptive polling of expensive collectors
+    """
+
+    # parse() feeds the management-plane load samples, so it must run every scrape
+    cache_parse = False
+
+    def __init__(self):
+        super().__init__(
+            name="system_resources_collector",
+            api_command="<show><system><resources></resources></system></show>",
+            help_text="Management plane resource metrics from PAN-OS",
+        )
+
+    def parse(self, xml_data, device_config):
+        """
+        Parse system resources XML and emit Prometheus metrics.
+        """
+        metrics = []
+        try:
+            root = xml_backend.fromstring(xml_data)
+            device = device_config["host"]
+            top = parse_top(root.findtext(".//result") or "")
+            for window, value in zip(("1m", "5m", "15m"), top["load"], strict=False):
+                metrics.append(
+                    self.prometheus_metric(
+                        metric="panos_mgmt_load_average",
+                        value=value,
+                        device=device,
+                        help_text="Management plane load average",
+                        labels={"window": window},
+                    )
+                )
+            for mode, value in top["cpu"].items():
+                metrics.append(
+                    self.prometheus_metric(
+                        metric="panos_mgmt_cpu_percent",
+                        value=value,
+                        device=device,
+                        help_text="Management plane CPU time by mode (percent)",
+                        labels={"mode": mode},
+                    )
+                )
+            for section in ("memory", "swap"):
+                for kind, value in top[section].items():
+                    metrics.append(
+                        self.prometheus_metric(
+                            metric=f"panos_mgmt_{section}_bytes",
+                            value=value,
+                            device=device,
+                            help_text=f"Management plane {section} (bytes)",
+                            labels={"type": kind},
+                        )
+                    )
+            if "id" in top["cpu"]:
+                load1 = top["load"][0] if top["load"] else 0.0
+                mgmt_load.record(device, 100.0 - top["cpu"]["id"], load1)
+        except Exception as e:
+            return self.prometheus_error_metric(
+                device_config["host"], f"system_resources_parse: {e}"
+            )
+        return "".join(dedupe_metrics(metrics))
@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("panos_exporter_scrape_trace", default=None)
+_collector = ContextVar("panos_exporter_traced_collector", default=None)
+
+
+class ScrapeTrace:
+    """
+    Per-collector time spent fetching, parsing and in total during one traced scrape.
+    Parse time is decoding XML documents (streamed ones including what the collector
+    does per element); render time, walking parsed trees and formatting series, is
+    what remains of the total. Only fetches, documents and whole collector runs are
+    timed, never single series, so the lock is taken a few times per API request,
+    document and collector.
+    Also counts API requests, response bytes, HTTP retries and fetch errors.
+    Everything is also reported to the parent trace, if any (nested tracing()).
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._timings = {}
+        self._counts = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, collector, phase, seconds):
+        with self._lock:
+            phases = self._timings.setdefault(collector, {"total": 0.0, "fetch": 0.0, "parse": 0.0})
+            phases[phase] += seconds
+        if self.parent is not None:
+            self.parent.add(collector, phase, seconds)
+
+    def _counter(self, collector):
+        return self._counts.setdefault(
+            collector, {"requests": 0, "response_bytes": 0, "retries": 0, "errors": 0}
+        )
+
+    def count(self, collector, key, n=1):
+        with self._lock:
+            self._counter(collector)[key] += n
+        if self.parent is not None:
+            self.parent.count(collector, key, n)
+
+    def error(self, collector, message):
+        """
+        Count a failed request and keep the collector's latest error message.
+        """
+        with self._lock:
+            self._counter(collector)["errors"] += 1
+            self._errors[collector] = message
+        if self.parent is not None:
+            self.parent.error(collector, message)
+
+    def counts(self):
+        """
+        Return {collector: {requests, response_bytes, retries, errors[, error]}}.
+        """
+        with self._lock:
+            result = {collector: dict(counts) for collector, counts in self._counts.items()}
+            for collector, message in self._errors.items():
+                result[collector]["error"] = message
+            return result
+
+    def breakdown(self):
+        """
+        Return {collector: {total, fetch, parse, render}} in seconds.
+        Fetch time is summed over requests, so parallel fetches can exceed the
+        collector's total.
+        """
+        with self._lock:
+            result = {}
+            for collector, phases in self._timings.items():
+                render = max(0.0, phases["total"] - phases["fetch"] - phases["parse"])
+                result[collector] = {**phases, "render": render}
+            return result
+
+
+def current_trace():
+    """
+    Return the ScrapeTrace active in this context, or None when not tracing.
+    """
+    return _current.get()
+
+
+def current_collector():
+    """
+    Return the name of the collector traced in this context, or None.
+    """
+    return _collector.get()
+
+
+@contextmanager
+def traced_collector(name):
+    """
+    Attribute phases timed inside the block without a collector name (see
+    xml_backend) to the named collector.
+    """
+    token = _collector.set(name)
+    try:
+        yield
+    finally:
+        _collector.reset(token)
+
+
+@contextmanager
+def tracing():
+    """
+    Trace collector phases for the scrapes run inside the block. An enclosing
+    trace keeps receiving them too.
+    """
+    trace = ScrapeTrace(parent=_current.get())
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
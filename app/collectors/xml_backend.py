@@ -0,0 +1,187 @@
+"""
+Pluggable XML parsing backend for collectors.
+- Uses lxml (compiled XPath, C iterparse) when it is installed
+- Falls back to xml.etree.ElementTree otherwise, with identical output
+- PANOS_XML_BACKEND=lxml|stdlib forces a backend (default: auto)
+- Documents declaring a DOCTYPE are refused by every backend, so no entity
+  expansion can happen whatever the parser
+- In traced scrapes, decoding a document counts as the collector's parse time
+"""
+
+import io
+import logging
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from .limits import check_prolog
+from .tracing import current_collector, current_trace
+
+logger = logging.getLogger("panos_exporter.xml_backend")
+
+
+class StdlibBackend:
+    """
+    xml.etree.ElementTree backend.
+    """
+
+    name = "stdlib"
+
+    def fromstring(self, xml_data):
+        return ET.fromstring(xml_data)
+
+    def findall(self, elem, path):
+        return elem.findall(path)
+
+    def iterparse(self, source, tag, parents=None):
+        """
+        Yield each completed element named tag (or any of a tuple of tags) from a
+        file-like source or bytes. Yielded elements are detached from their parent
+        once the caller moves on, so only the elements in progress stay in memory.
+        parents optionally maps a tag to the only parent tag it is yielded under;
+        elsewhere such elements stay in place and go away with their ancestor.
+        """
+        tags = _tags(tag)
+        parents = parents or {}
+        if isinstance(source, (bytes, str)):
+            source = io.BytesIO(source.encode() if isinstance(source, str) else source)
+        stack = []
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                continue
+            stack.pop()
+            if elem.tag not in tags:
+                continue
+            parent = stack[-1] if stack else None
+            if elem.tag in parents and (parent is None or parent.tag != parents[elem.tag]):
+                continue
+            yield elem
+            if parent is not None:
+                parent.remove(elem)
+
+
+class LxmlBackend:
+    """
+    lxml backend. ElementPath expressions used by collectors are valid XPath,
+    so findall() compiles and caches them as XPath objects.
+    """
+
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree
+
+        self._etree = etree
+        self._parser = etree.XMLParser(
+            remove_comments=True, remove_pis=True, resolve_entities=False, no_network=True
+        )
+        self._xpaths = {}
+
+    def fromstring(self, xml_data):
+        # lxml rejects str input carrying an encoding declaration
+        if isinstance(xml_data, str):
+            xml_data = xml_data.encode()
+        return self._etree.fromstring(xml_data, self._parser)
+
+    def findall(self, elem, path):
+        xpath = self._xpaths.get(path)
+        if xpath is None:
+            xpath = self._xpaths[path] = self._etree.XPath(path)
+        return xpath(elem)
+
+    def iterparse(self, source, tag, parents=None):
+        parents = parents or {}
+        if isinstance(source, (bytes, str)):
+            source = io.BytesIO(source.encode() if isinstance(source, str) else source)
+        for _, elem in self._etree.iterparse(
+            source,
+            events=("end",),
+            tag=_tags(tag),
+            remove_comments=True,
+            remove_pis=True,
+            resolve_entities=False,
+            no_network=True,
+        ):
+            parent = elem.getparent()
+            if elem.tag in parents and (parent is None or parent.tag != parents[elem.tag]):
+                continue
+            yield elem
+            if parent is not None:
+                parent.remove(elem)
+
+
+def _tags(tag):
+    return (tag,) if isinstance(tag, str) else tuple(tag)
+
+
+BACKENDS = {"stdlib": StdlibBackend, "lxml": LxmlBackend}
+
+
+def load_backend(name="auto"):
+    """
+    Instantiate the named backend; 'auto' prefers lxml and falls back to stdlib.
+    """
+    if name == "auto":
+        try:
+            return LxmlBackend()
+        except ImportError:
+            return StdlibBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown XML backend: {name}")
+    return BACKENDS[name]()
+
+
+_backend = load_backend(os.environ.get("PANOS_XML_BACKEND", "auto").lower())
+logger.debug(f"Using XML backend {_backend.name}")
+
+
+def set_backend(name):
+    """
+    Switch the process-wide backend (used by tests and benchmarks).
+    """
+    global _backend
+    _backend = load_backend(name)
+    return _backend
+
+
+def backend_name():
+    return _backend.name
+
+
+def fromstring(xml_data):
+    check_prolog(xml_data)
+    trace = current_trace()
+    if trace is None:
+        return _backend.fromstring(xml_data)
+    started = time.perf_counter()
+    try:
+        return _backend.fromstring(xml_data)
+    finally:
+        _add_parse(trace, current_collector(), time.perf_counter() - started)
+
+
+def findall(elem, path):
+    return _backend.findall(elem, path)
+
+
+def iterparse(source, tag, parents=None):
+    if isinstance(source, (bytes, str)):
+        check_prolog(source)
+    elements = _backend.iterparse(source, tag, parents)
+    trace = current_trace()
+    return elements if trace is None else _timed(elements, trace, current_collector())
+
+
+def _timed(elements, trace, collector):
+    # The whole walk is parse time, including the caller's work per element
+    started = time.perf_counter()
+    try:
+        yield from elements
+    finally:
+        _add_parse(trace, collector, time.perf_counter() - started)
+
+
+def _add_parse(trace, collector, seconds):
+    if collector is not None:
+        trace.add(collector, "parse", seconds)
@@ -1,7 +1,11 @@
 import logging
+import re
 
 import yaml
 
+from app.admission import PRIORITIES
+from app.collectors.registry import registry
+
 
 class ConfigLoader:
     """
@@ -39,22 +43,72 @@ class ConfigLoader:
             if "username" not in info or "password" not in info:
                 self.logger.error(f"Device {dev} missing username or password")
                 raise ValueError(f"Device {dev} missing username or password")
+            if "scrape_timeout" in info:
+                if not self._is_positive_number(info["scrape_timeout"]):
+                    self.logger.error(f"Device {dev} scrape_timeout must be a positive number")
+                    raise ValueError(f"Device {dev} scrape_timeout must be a positive number")
+            if "interface_inventory_ttl" in info:
+                ttl = info["interface_inventory_ttl"]
+                if not (self._is_positive_number(ttl) or ttl == 0):
+                    self.logger.error(f"Device {dev} interface_inventory_ttl must be >= 0")
+                    raise ValueError(f"Device {dev} interface_inventory_ttl must be >= 0")
+            if "virtual_router" in info:
+                vr = info["virtual_router"]
+                if not (
+                    isinstance(vr, str)
+                    or (isinstance(vr, list) and vr and all(isinstance(v, str) for v in vr))
+                ):
+                    self.logger.error(f"Device {dev} virtual_router must be a name or a list")
+                    raise ValueError(f"Device {dev} virtual_router must be a name or a list")
+            if "max_concurrent_requests" in info:
+                limit = info["max_concurrent_requests"]
+                if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+                    self.logger.error(f"Device {dev} max_concurrent_requests must be >= 1")
+                    raise ValueError(f"Device {dev} max_concurrent_requests must be >= 1")
+            if info.get("bgp_rib_mode", "detail") not in ("detail", "aggregate"):
+                self.logger.error(f"Device {dev} bgp_rib_mode must be detail or aggregate")
+                raise ValueError(f"Device {dev} bgp_rib_mode must be detail or aggregate")
+            if "collector_overrides" in info:
+                self._validate_collector_overrides(dev, info["collector_overrides"])
+            if "capability_reprobe_interval" in info:
+                interval = info["capability_reprobe_interval"]
+                if not (self._is_positive_number(interval) or interval == 0):
+                    self.logger.error(f"Device {dev} capability_reprobe_interval must be >= 0")
+                    raise ValueError(f"Device {dev} capability_reprobe_interval must be >= 0")
+            if not isinstance(info.get("parse_cache", True), bool):
+                self.logger.error(f"Device {dev} parse_cache must be true or false")
+                raise ValueError(f"Device {dev} parse_cache must be true or false")
+            if info.get("priority", "normal") not in PRIORITIES:
+                self.logger.error(f"Device {dev} priority must be one of {', '.join(PRIORITIES)}")
+                raise ValueError(f"Device {dev} priority must be one of {', '.join(PRIORITIES)}")
+            if "max_response_bytes" in info:
+                self._validate_max_response_bytes(dev, info["max_response_bytes"])
+            if "scrape_memory_budget" in info:
+                if not self._is_byte_count(info["scrape_memory_budget"]):
+                    self.logger.error(f"Device {dev} scrape_memory_budget must be a positive int")
+                    raise ValueError(f"Device {dev} scrape_memory_budget must be a positive int")
+            if "model" in info and not isinstance(info["model"], str):
+                self.logger.error(f"Device {dev} model must be a string")
+                raise ValueError(f"Device {dev} model must be a string")
+            if "global_counters" in info:
+                self._validate_global_counters(dev, info["global_counters"])
+            if "resource_monitor" in info:
+                self._validate_resource_monitor(dev, info["resource_monitor"])
+            if "adaptive_polling" in info:
+                self._validate_adaptive_polling(dev, info["adaptive_polling"])
+            if "session_table" in info:
+                self._validate_session_table(dev, info["session_table"])
+        if "model_limits" in self.config:
+            limits = self.config["model_limits"]
+            if not isinstance(limits, dict) or not all(
+                isinstance(v, int) and not isinstance(v, bool) and v >= 1 for v in limits.values()
+            ):
+                self.logger.error("'model_limits' must map model names to integers >= 1")
+                raise ValueError("'model_limits' must map model names to integers >= 1")
+        if "panoramas" in self.config:
+            self._validate_panoramas(self.config["panoramas"])
         if "collectors" in self.config:
-            known = set(
-                [
-                    "system_info_collector",
-                    "system_environmentals_collector",
-                    "global_counter_collector",
-                    "session_collector",
-                    "interface_collector",
-                    "interface_counter_collector",
-                    "data_processor_resource_utilization_collector",
-                    "routing_resource_collector",
-                    "routing_summary_collector",
-                    "routing_route_collector",
-                    "routing_bgp_collector",
-                ]
-            )
+            known = set(registry.names())
             if not isinstance(self.config["collectors"], list):
                 self.logger.error("'collectors' must be a list")
                 raise ValueError("'collectors' must be a list")
@@ -63,6 +117,139 @@ class ConfigLoader:
                     self.logger.error(f"Unknown collector: {c}")
                     raise ValueError(f"Unknown collector: {c}")
 
+    @staticmethod
+    def _is_positive_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+    def _validate_panoramas(self, panoramas):
+        """
+        Validate the panoramas section: connection settings for each Panorama
+        used to reach managed firewalls by serial.
+        """
+        if not isinstance(panoramas, dict):
+            self.logger.error("'panoramas' must be a dict")
+            raise ValueError("'panoramas' must be a dict")
+        for name, info in panoramas.items():
+            if not isinstance(info, dict):
+                self.logger.error(f"Panorama {name} config is not a dict")
+                raise ValueError(f"Panorama {name} config is not a dict")
+            if "host" not in info or "username" not in info or "password" not in info:
+                self.logger.error(f"Panorama {name} missing host, username or password")
+                raise ValueError(f"Panorama {name} missing host, username or password")
+            if "refresh_interval" in info and not self._is_positive_number(
+                info["refresh_interval"]
+            ):
+                self.logger.error(f"Panorama {name} refresh_interval must be a positive number")
+                raise ValueError(f"Panorama {name} refresh_interval must be a positive number")
+            if "pool_size" in info:
+                size = info["pool_size"]
+                if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+                    self.logger.error(f"Panorama {name} pool_size must be >= 1")
+                    raise ValueError(f"Panorama {name} pool_size must be >= 1")
+            if not isinstance(info.get("devices", {}), dict):
+                self.logger.error(f"Panorama {name} devices must be a dict of serials")
+                raise ValueError(f"Panorama {name} devices must be a dict of serials")
+
+    def _validate_global_counters(self, dev, settings):
+        """
+        Validate a device's global_counters filter settings.
+        """
+        if not isinstance(settings, dict):
+            self.logger.error(f"Device {dev} global_counters must be a dict")
+            raise ValueError(f"Device {dev} global_counters must be a dict")
+        allowed = {"severity", "category", "aspect", "names", "include", "exclude"}
+        for key, value in settings.items():
+            if key not in allowed:
+                self.logger.error(f"Device {dev} unknown global_counters option: {key}")
+                raise ValueError(f"Device {dev} unknown global_counters option: {key}")
+            if key in ("names", "include", "exclude"):
+                if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                    self.logger.error(f"Device {dev} global_counters.{key} must be a list")
+                    raise ValueError(f"Device {dev} global_counters.{key} must be a list")
+            elif not isinstance(value, str):
+                self.logger.error(f"Device {dev} global_counters.{key} must be a string")
+                raise ValueError(f"Device {dev} global_counters.{key} must be a string")
+        for pattern in settings.get("include", []) + settings.get("exclude", []):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                self.logger.error(f"Device {dev} invalid global_counters pattern {pattern}: {e}")
+                raise ValueError(f"Device {dev} invalid global_counters pattern {pattern}") from e
+
+    def _validate_resource_monitor(self, dev, settings):
+        """
+        Validate a device's resource_monitor window settings.
+        """
+        intervals = ("second", "minute", "hour", "day", "week")
+        if not isinstance(settings, dict):
+            self.logger.error(f"Device {dev} resource_monitor must be a dict")
+            raise ValueError(f"Device {dev} resource_monitor must be a dict")
+        if settings.get("interval", "second") not in intervals:
+            self.logger.error(f"Device {dev} resource_monitor.interval must be one of {intervals}")
+            raise ValueError(f"Device {dev} resource_monitor.interval must be one of {intervals}")
+        last = settings.get("last", 60)
+        if not isinstance(last, int) or isinstance(last, bool) or last < 1:
+            self.logger.error(f"Device {dev} resource_monitor.last must be a positive integer")
+            raise ValueError(f"Device {dev} resource_monitor.last must be a positive integer")
+
+    def _validate_adaptive_polling(self, dev, settings):
+        """
+        Validate a device's adaptive_polling thresholds (or false to disable it).
+        """
+        if settings is False:
+            return
+        if not isinstance(settings, dict):
+            self.logger.error(f"Device {dev} adaptive_polling must be a dict or false")
+            raise ValueError(f"Device {dev} adaptive_polling must be a dict or false")
+        for key, value in settings.items():
+            if key not in ("busy_cpu", "recover_cpu", "max_backoff"):
+                self.logger.error(f"Device {dev} unknown adaptive_polling option: {key}")
+                raise ValueError(f"Device {dev} unknown adaptive_polling option: {key}")
+            if not self._is_positive_number(value):
+                self.logger.error(f"Device {dev} adaptive_polling.{key} must be a positive number")
+                raise ValueError(f"Device {dev} adaptive_polling.{key} must be a positive number")
+
+    def _validate_session_table(self, dev, settings):
+        """
+        Validate a device's session_table walk limits.
+        """
+        if not isinstance(settings, dict):
+            self.logger.error(f"Device {dev} session_table must be a dict")
+            raise ValueError(f"Device {dev} session_table must be a dict")
+        for key, value in settings.items():
+            if key not in ("max_pages", "max_seconds", "max_series"):
+                self.logger.error(f"Device {dev} unknown session_table option: {key}")
+                raise ValueError(f"Device {dev} unknown session_table option: {key}")
+            if not self._is_positive_number(value):
+                self.logger.error(f"Device {dev} session_table.{key} must be a positive number")
+                raise ValueError(f"Device {dev} session_table.{key} must be a positive number")
+
+    def _validate_collector_overrides(self, dev, overrides):
+        """
+        collector_overrides maps known collector names to true (always run, never
+        skipped by capability probing) or false (never run on this device).
+        """
+        known = set(registry.names())
+        if not isinstance(overrides, dict) or not all(
+            name in known and isinstance(enabled, bool) for name, enabled in overrides.items()
+        ):
+            self.logger.error(f"Device {dev} collector_overrides must map collectors to true/false")
+            raise ValueError(f"Device {dev} collector_overrides must map collectors to true/false")
+
+    @staticmethod
+    def _is_byte_count(value):
+        return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+    def _validate_max_response_bytes(self, dev, setting):
+        """
+        max_response_bytes is a byte count for every collector, or a mapping of
+        collector names (and "default") to byte counts.
+        """
+        values = setting.values() if isinstance(setting, dict) else [setting]
+        if not all(self._is_byte_count(v) for v in values):
+            self.logger.error(f"Device {dev} max_response_bytes must be positive ints")
+            raise ValueError(f"Device {dev} max_response_bytes must be positive ints")
+
     def get_device(self, target):
         """
         Return device config for the given target.
@@ -1,85 +1,201 @@
-from app.collectors.data_processor_resource_utilization_collector import (
-    DataProcessorResourceUtilizationCollector,
-)
-from app.collectors.global_counter_collector import GlobalCounterCollector
-from app.collectors.interface_collector import InterfaceCollector
-from app.collectors.interface_counter_collector import InterfaceCounterCollector
-from app.collectors.routing_bgp_collector import RoutingBgpCollector
-from app.collectors.routing_resource_collector import RoutingResourceCollector
-from app.collectors.routing_route_collector import RoutingRouteCollector
-from app.collectors.routing_summary_collector import RoutingSummaryCollector
-from app.collectors.session_collector import SessionCollector
-from app.collectors.system_environmentals_collector import SystemEnvironmentalsCollector
-from app.collectors.system_info_collector import SystemInfoCollector
-
-COLLECTOR_CLASS_MAP = {
-    "system_info_collector": SystemInfoCollector,
-    "system_environmentals_collector": SystemEnvironmentalsCollector,
-    "global_counter_collector": GlobalCounterCollector,
-    "session_collector": SessionCollector,
-    "interface_collector": InterfaceCollector,
-    "interface_counter_collector": InterfaceCounterCollector,
-    "data_processor_resource_utilization_collector": DataProcessorResourceUtilizationCollector,
-    "routing_resource_collector": RoutingResourceCollector,
-    "routing_summary_collector": RoutingSummaryCollector,
-    "routing_route_collector": RoutingRouteCollector,
-    "routing_bgp_collector": RoutingBgpCollector,
+import time
+
+from app.adaptive import AdaptivePolicy
+from app.collectors import context
+from app.collectors.capabilities import capabilities, command_name
+from app.collectors.limiter import device_limiter
+from app.collectors.limits import ScrapeBudget
+from app.collectors.parse_cache import KINDS
+from app.collectors.registry import COST_CLASSES, registry
+from app.collectors.tracing import tracing
+from app.flight_recorder import error_message, flight_recorder, series_count
+from app.panorama import PanoramaDirectory
+
+PARSE_CACHE_HELP = {
+    "hits": "Responses or chunks whose output was reused because they were unchanged",
+    "misses": "Responses or chunks that were parsed",
 }
 
 
+def _cost_rank(name):
+    try:
+        return COST_CLASSES.index(registry.get(name).cost)
+    except ValueError:
+        return len(COST_CLASSES)
+
+
 class Exporter:
     """
     Aggregates all enabled collectors and exposes unified Prometheus metrics for a device.
     Emits a panos_up metric (1=all collectors succeed, 0=any fail).
+    Expensive collectors back off while the device's management plane is busy
+    (see AdaptivePolicy) and serve their last output in between runs.
+    All collectors of one scrape share a memory budget (scrape_memory_budget).
+    Unchanged responses reuse their parsed output (see ParseCache).
+    Each scrape is traced into the flight recorder (see FlightRecorder).
+    Collectors are skipped on devices whose model cannot serve them (see
+    Capabilities) or that turn them off with collector_overrides.
     """
 
     def __init__(self, config):
         self.config = config
-        collector_names = config.get("collectors")
-        if collector_names:
-            self.collectors = []
-            for name in collector_names:
-                cls = COLLECTOR_CLASS_MAP.get(name)
-                if cls:
-                    self.collectors.append(cls())
+        # Only enabled collectors are imported; default to the built-in defaults
+        collector_names = list(config.get("collectors") or registry.default_names())
+        self.enabled = set(collector_names)
+        # Collectors forced on for single devices run there only
+        for info in config["devices"].values():
+            for name, enabled in (info.get("collector_overrides") or {}).items():
+                if enabled and name not in collector_names:
+                    collector_names.append(name)
+        # Cheap collectors run first, so system_resources_collector refreshes the
+        # management load before the backoff for expensive ones is decided
+        collector_names.sort(key=_cost_rank)
+        self.collectors = []
+        self.specs = {}
+        for name in collector_names:
+            try:
+                self.collectors.append(registry.create(name))
+                self.specs[name] = registry.get(name)
+            except ValueError:
+                continue
+        self.adaptive = AdaptivePolicy()
+        self.panoramas = PanoramaDirectory(config)
+        # Firewalls proxied through a Panorama share its capped session pool
+        for connector in self.panoramas.connectors:
+            context.session_pool.set_limit(connector.host, connector.pool_size)
+
+    def device_config(self, target):
+        """
+        Return the collector device config for a target: a configured device, or
+        the serial of a firewall connected to one of the configured Panoramas.
+        The top-level model_limits travel with it to the request limiter.
+        Raises ValueError if the target is unknown.
+        """
+        if target in self.config["devices"]:
+            device_config = self.config["devices"][target].copy()
+            device_config["host"] = target
         else:
-            # fallback: load all collectors
-            self.collectors = [
-                SystemInfoCollector(),
-                SystemEnvironmentalsCollector(),
-                GlobalCounterCollector(),
-                SessionCollector(),
-                InterfaceCollector(),
-                InterfaceCounterCollector(),
-                DataProcessorResourceUtilizationCollector(),
-                RoutingResourceCollector(),
-                RoutingSummaryCollector(),
-                RoutingRouteCollector(),
-                RoutingBgpCollector(),
-            ]
-
-    def collect_metrics(self, target):
+            device_config = self.panoramas.device_config(target)
+            if device_config is None:
+                raise ValueError(f"Target {target} not found in config or on any Panorama")
+        if self.config.get("model_limits"):
+            device_config["model_limits"] = self.config["model_limits"]
+        return device_config
+
+    def export_state(self):
+        """
+        Cheap per-device state (discovery results and the like) for warm restarts.
+        """
+        collectors = {}
+        for collector in self.collectors:
+            state = collector.export_state()
+            if state is not None:
+                collectors[collector.name] = state
+        return {
+            "collectors": collectors,
+            "panoramas": self.panoramas.export_state(),
+            "capabilities": capabilities.export_state(),
+        }
+
+    def import_state(self, state):
+        """
+        Seed collectors and Panorama discovery from export_state() output.
+        """
+        collectors = state.get("collectors", {})
+        for collector in self.collectors:
+            if collector.name in collectors:
+                collector.import_state(collectors[collector.name])
+        self.panoramas.import_state(state.get("panoramas", {}))
+        capabilities.import_state(state.get("capabilities", {}))
+
+    def skip_reason(self, device_config, name):
+        """
+        Why a collector does not run on a device, or None if it does.
+        """
+        override = (device_config.get("collector_overrides") or {}).get(name)
+        if override is not None:
+            return None if override else "disabled"
+        if name not in self.enabled:
+            return "disabled"
+        return capabilities.collector_skip_reason(device_config, name)
+
+    def targets(self):
+        """
+        All collectable targets: configured devices, then Panorama-managed serials.
+        """
+        devices = list(self.config["devices"])
+        return devices + [s for s in self.panoramas.serials() if s not in devices]
+
+    def collect_metrics(self, target, deadline=None):
         """
         Collect metrics from all enabled collectors for the given device.
+        deadline (time.monotonic()) further caps the device's scrape_timeout.
         Returns Prometheus-formatted string with up/error metrics.
         """
-        device_config = self.config["devices"][target].copy()
-        device_config["host"] = target
+        device_config = self.device_config(target)
+        if not flight_recorder.size:
+            return self._collect_metrics(target, device_config, {}, deadline)
+        statuses = {}
+        started = time.time()
+        with tracing() as trace:
+            output = self._collect_metrics(target, device_config, statuses, deadline)
+        up = int(all(status != "error" for status, _, _ in statuses.values()))
+        duration = time.time() - started
+        flight_recorder.record(target, started, duration, up, output, statuses, trace)
+        return output
+
+    def _collect_metrics(self, target, device_config, statuses, deadline=None):
+        """
+        Run the collectors, filling statuses with {name: (status, series, error)}.
+        """
+        scrape_timeout = device_config.get("scrape_timeout")
+        if scrape_timeout:
+            device_deadline = time.monotonic() + scrape_timeout
+            deadline = device_deadline if deadline is None else min(deadline, device_deadline)
+        budget = ScrapeBudget(device_config.get("scrape_memory_budget"))
         output = ""
         up = 1
         error_metrics = []
+        # Decided at the first expensive collector, after cheap ones refreshed the load
+        backoff = None
+        cached_collectors = {}
+        skipped = {}
         for collector in self.collectors:
+            reason = self.skip_reason(device_config, collector.name)
+            if reason is not None:
+                if reason != "disabled":
+                    skipped[collector.name] = reason
+                    statuses[collector.name] = ("skipped", 0, reason)
+                continue
+            spec = self.specs[collector.name]
+            if spec.cost == "expensive":
+                if backoff is None:
+                    backoff = self.adaptive.update(target, device_config)
+                cached = self.adaptive.cached(target, spec, backoff)
+                cached_collectors[collector.name] = cached is not None
+                if cached is not None:
+                    output += cached
+                    statuses[collector.name] = ("cached", series_count(cached), None)
+                    continue
             try:
-                result = collector.collect(device_config)
+                result = collector.collect(device_config, deadline=deadline, budget=budget)
                 # If error metric present, mark up=0
                 if "# TYPE panos_error gauge" in result:
                     up = 0
                     error_metrics.append(result)
+                    statuses[collector.name] = (
+                        "error",
+                        series_count(result),
+                        error_message(result),
+                    )
                 else:
                     output += result
+                    self.adaptive.record(target, spec, result)
+                    statuses[collector.name] = ("ok", series_count(result), None)
             except Exception as e:
                 up = 0
                 error_msg = f"collector_failed: {collector.name}: {e}"
+                statuses[collector.name] = ("error", 0, str(e))
                 error_metrics.append(
                     "# HELP panos_error Error metric\n"
                     "# TYPE panos_error gauge\n"
@@ -91,4 +207,115 @@ class Exporter:
             "# TYPE panos_up gauge\n"
             f'panos_up{{device="{target}"}} {up}\n'
         )
-        return up_metric + "".join(error_metrics) + output
+        return (
+            up_metric
+            + "".join(error_metrics)
+            + self.limit_metrics(budget)
+            + output
+            + self.limiter_metrics(device_config)
+            + self.parse_cache_metrics(target)
+            + self.skipped_metrics(target, skipped)
+            + self.adaptive_metrics(backoff, cached_collectors)
+        )
+
+    @staticmethod
+    def limit_metrics(budget):
+        """
+        One series per collector whose response hit a size, memory or XML safety limit.
+        Like the other panos_exporter_* series it has no device label; the scrape's
+        instance label identifies the device.
+        """
+        if not budget.exceeded:
+            return ""
+        lines = [
+            "# HELP panos_exporter_limit_exceeded Collector failed on a response or memory limit\n"
+            "# TYPE panos_exporter_limit_exceeded gauge\n"
+        ]
+        for collector, kind in budget.exceeded:
+            lines.append(
+                f'panos_exporter_limit_exceeded{{collector="{collector}",limit="{kind}"}} 1\n'
+            )
+        return "".join(lines)
+
+    @staticmethod
+    def adaptive_metrics(backoff, cached_collectors):
+        """
+        Current backoff multiplier and which expensive collectors were served from cache.
+        """
+        if backoff is None:
+            return ""
+        lines = [
+            "# HELP panos_exporter_backoff Interval multiplier for expensive collectors\n"
+            "# TYPE panos_exporter_backoff gauge\n"
+            f"panos_exporter_backoff {backoff}\n"
+            "# HELP panos_exporter_collector_cached 1 if the collector's last output was served\n"
+            "# TYPE panos_exporter_collector_cached gauge\n"
+        ]
+        for name, cached in cached_collectors.items():
+            lines.append(f'panos_exporter_collector_cached{{collector="{name}"}} {int(cached)}\n')
+        return "".join(lines)
+
+    @staticmethod
+    def skipped_metrics(target, skipped):
+        """
+        Collectors skipped for the device's model and commands cached as unsupported.
+        """
+        unsupported = capabilities.unsupported(target)
+        if not skipped and not unsupported:
+            return ""
+        lines = [
+            "# HELP panos_exporter_collector_skipped Collector not run on this device model\n"
+            "# TYPE panos_exporter_collector_skipped gauge\n"
+        ]
+        for name, reason in skipped.items():
+            lines.append(
+                f'panos_exporter_collector_skipped{{collector="{name}",reason="{reason}"}} 1\n'
+            )
+        lines.append(
+            "# HELP panos_exporter_command_unsupported Command rejected by the device, "
+            "skipped until re-probed\n"
+            "# TYPE panos_exporter_command_unsupported gauge\n"
+        )
+        for name, cmd, _ in unsupported:
+            lines.append(
+                f'panos_exporter_command_unsupported{{collector="{name}",'
+                f'command="{command_name(cmd)}"}} 1\n'
+            )
+        return "".join(lines)
+
+    def parse_cache_metrics(self, target):
+        """
+        Per-collector hits and misses of the device's parse cache, for whole
+        responses and for the chunks of incrementally parsed ones.
+        """
+        stats = {c.name: c.parse_cache(target).stats() for c in self.collectors}
+        lines = []
+        for result, help_text in PARSE_CACHE_HELP.items():
+            lines.append(
+                f"# HELP panos_exporter_parse_cache_{result}_total {help_text}\n"
+                f"# TYPE panos_exporter_parse_cache_{result}_total counter\n"
+            )
+            for name, counts in stats.items():
+                for kind in KINDS:
+                    if (kind, "hits") in counts:
+                        lines.append(
+                            f'panos_exporter_parse_cache_{result}_total{{collector="{name}",'
+                            f'kind="{kind}"}} {counts[(kind, result)]}\n'
+                        )
+        return "".join(lines)
+
+    @staticmethod
+    def limiter_metrics(device_config):
+        """
+        Per-device request limit and cumulative time API calls spent queued for it.
+        """
+        wait_sum, wait_count = device_limiter.queue_wait(device_config["host"])
+        return (
+            "# HELP panos_exporter_request_limit Concurrent API calls allowed to the device\n"
+            "# TYPE panos_exporter_request_limit gauge\n"
+            f"panos_exporter_request_limit {device_limiter.limit_for(device_config)}\n"
+            "# HELP panos_exporter_request_queue_wait_seconds Time API calls waited for a slot\n"
+            "# TYPE panos_exporter_request_queue_wait_seconds summary\n"
+            f"panos_exporter_request_queue_wait_seconds_sum {wait_sum:.6f}\n"
+            f"panos_exporter_request_queue_wait_seconds_count {wait_count}\n"
+        )
@@ -0,0 +1,115 @@
+import os
+import re
+import time
+from collections import deque
+
+DEFAULT_SIZE = 10
+MAX_ERROR_LENGTH = 300
+
+# Per-collector values kept for each scrape, in order
+COLLECTOR_FIELDS = (
+    "total_seconds",
+    "fetch_seconds",
+    "parse_seconds",
+    "render_seconds",
+    "requests",
+    "response_bytes",
+    "retries",
+    "errors",
+    "series",
+)
+
+_ERROR_LABEL = re.compile(r'panos_error\{error="(.*)"\} 1')
+
+
+def series_count(text):
+    """
+    Number of sample lines in Prometheus text output.
+    """
+    return text.count("\n") - text.count("# HELP ") - text.count("# TYPE ")
+
+
+def error_message(text):
+    """
+    The error label of a panos_error series in collector output, or None.
+    """
+    match = _ERROR_LABEL.search(text)
+    return match.group(1)[:MAX_ERROR_LENGTH] if match else None
+
+
+class FlightRecorder:
+    """
+    The last `size` scrapes of every device, kept in memory for /debug/scrapes.
+    - One fixed-size deque per device; records are compact tuples until read
+    - Recording is a single deque append and reading a single copy, both atomic
+      under the GIL; the scrape's trace locks per API request and collector only
+    - size=0 disables recording
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self._scrapes = {}
+
+    def record(self, target, started, duration, up, output, collectors, trace):
+        """
+        Record one scrape. collectors maps collector name to (status, series, error
+        message); timings and request counts come from the scrape's trace.
+        """
+        if not self.size:
+            return
+        breakdown = trace.breakdown()
+        counts = trace.counts()
+        entries = []
+        for name, (status, series, error) in collectors.items():
+            phases = breakdown.get(name, {})
+            counted = counts.get(name, {})
+            values = (
+                round(phases.get("total", 0.0), 6),
+                round(phases.get("fetch", 0.0), 6),
+                round(phases.get("parse", 0.0), 6),
+                round(phases.get("render", 0.0), 6),
+                counted.get("requests", 0),
+                counted.get("response_bytes", 0),
+                counted.get("retries", 0),
+                counted.get("errors", 0),
+                series,
+            )
+            error = error or counted.get("error")
+            entries.append((name, status, values, error[:MAX_ERROR_LENGTH] if error else None))
+        scrapes = self._scrapes.get(target)
+        if scrapes is None:
+            scrapes = self._scrapes.setdefault(target, deque(maxlen=self.size))
+        scrapes.append(
+            (started, round(duration, 6), up, len(output), series_count(output), tuple(entries))
+        )
+
+    def scrapes(self, target):
+        """
+        Recorded scrapes of target as JSON-able dicts, newest first.
+        """
+        scrapes = self._scrapes.get(target)
+        records = tuple(scrapes) if scrapes is not None else ()
+        return [_as_dict(record) for record in reversed(records)]
+
+
+def _as_dict(record):
+    started, duration, up, output_bytes, series, entries = record
+    return {
+        "started_at": started,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+        "duration_seconds": duration,
+        "up": up,
+        "output_bytes": output_bytes,
+        "series": series,
+        "collectors": {
+            name: {
+                "status": status,
+                **dict(zip(COLLECTOR_FIELDS, values, strict=True)),
+                "error": error,
+            }
+            for name, status, values, error in entries
+        },
+    }
+
+
+flight_recorder = FlightRecorder(int(os.environ.get("FLIGHT_RECORDER_SIZE", DEFAULT_SIZE) or 0))
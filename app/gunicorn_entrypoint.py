@@ -1,4 +1,14 @@
 import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Restart delays for a poller that exited; the delay doubles up to the maximum
+POLLER_MIN_BACKOFF = 1
+POLLER_MAX_BACKOFF = 60
+# A poller that ran at least this long was healthy: the restart delay starts over
+POLLER_STABLE_SECONDS = 300
 
 
 def _env_int(name: str, default: int) -> int:
@@ -8,12 +18,86 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
+def _env_bool(name: str) -> bool:
+    return os.getenv(name, "0").lower() in ("1", "true", "yes")
+
+
+def _default_snapshot_dir() -> str:
+    # Prefer tmpfs so snapshot maps never touch disk
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "panos_exporter")
+
+
+def _parent_alive(parent_pid: int) -> bool:
+    return os.getppid() == parent_pid
+
+
+def _wait(seconds: float, parent_pid: int) -> bool:
+    """
+    Sleep up to seconds; return False as soon as parent_pid is gone.
+    """
+    deadline = time.monotonic() + seconds
+    while _parent_alive(parent_pid):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(1.0, remaining))
+    return False
+
+
+def supervise_poller(parent_pid: int, argv: list[str], env: dict[str, str]) -> None:
+    """
+    Run the poller and restart it with exponential backoff whenever it exits,
+    until parent_pid (gunicorn) is no longer our parent. The poller watches our
+    pid and stops on its own once we return.
+    """
+    backoff = POLLER_MIN_BACKOFF
+    while _parent_alive(parent_pid):
+        started = time.monotonic()
+        proc = subprocess.Popen(argv, env={**env, "POLLER_PARENT_PID": str(os.getpid())})
+        while True:
+            try:
+                proc.wait(timeout=1.0)
+                break
+            except subprocess.TimeoutExpired:
+                if not _parent_alive(parent_pid):
+                    return
+        if time.monotonic() - started >= POLLER_STABLE_SECONDS:
+            backoff = POLLER_MIN_BACKOFF
+        print(
+            f"Poller exited with status {proc.returncode}, restarting in {backoff}s",
+            file=sys.stderr,
+            flush=True,
+        )
+        if not _wait(backoff, parent_pid):
+            return
+        backoff = min(backoff * 2, POLLER_MAX_BACKOFF)
+
+
+def start_poller() -> None:
+    """
+    Start the single collection process and point the HTTP workers at its snapshots.
+    A forked supervisor keeps the poller running; gunicorn is exec'd into this
+    process, so the supervisor stops when gunicorn does.
+    """
+    os.environ.setdefault("SNAPSHOT_DIR", _default_snapshot_dir())
+    parent_pid = os.getpid()
+    if os.fork() == 0:
+        try:
+            supervise_poller(parent_pid, [sys.executable, "-m", "app.poller"], dict(os.environ))
+        finally:
+            os._exit(0)
+
+
 def main() -> None:
     port = _env_int("PORT", 9654)
     workers = _env_int("WEB_CONCURRENCY", 2)
     threads = _env_int("GUNICORN_THREADS", 4)
     timeout = _env_int("GUNICORN_TIMEOUT", 30)
 
+    if _env_bool("POLLER"):
+        start_poller()
+
     argv = [
         "gunicorn",
         "--bind",
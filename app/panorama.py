@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+
+from app.collectors import context, xml_backend
+from app.collectors.limits import ScrapeBudget, check_prolog, read_body, response_limit
+
+DISCOVERY_COMMAND = "<show><devices><connected></connected></devices></show>"
+DEFAULT_REFRESH_INTERVAL = 300
+DEFAULT_POOL_SIZE = 4
+
+# Connection settings that belong to Panorama, never to a proxied firewall
+_CONNECTION_KEYS = ("host", "username", "password", "api_key", "refresh_interval", "pool_size")
+
+
+class PanoramaConnector:
+    """
+    Collects firewalls through a Panorama instead of connecting to them directly.
+    - Managed firewalls are discovered with `show devices connected` and cached
+      for refresh_interval seconds
+    - Every op command is sent to Panorama with target=<serial>
+    - All proxied firewalls share a pool of at most pool_size keep-alive
+      sessions to Panorama (capped by the Exporter that owns the connector)
+    - Discovery runs outside the lock, one at a time; callers get the previous
+      list meanwhile, or wait for the first one when there is none yet
+    - Discovery responses are read under max_response_bytes like collector ones
+    """
+
+    def __init__(self, name, settings):
+        self.name = name
+        self.settings = settings
+        self.host = settings["host"]
+        self.refresh_interval = settings.get("refresh_interval", DEFAULT_REFRESH_INTERVAL)
+        self.pool_size = settings.get("pool_size", DEFAULT_POOL_SIZE)
+        self.logger = logging.getLogger(f"panos_exporter.panorama.{name}")
+        self._devices = {}
+        self._expires = 0.0
+        self._refreshing = False
+        self._listed = threading.Event()
+        self._lock = threading.Lock()
+
+    def devices(self):
+        """
+        Return {serial: {hostname, ip-address, model, sw-version}} for the
+        connected firewalls, refreshing the cached list when it has expired.
+        If a refresh fails the previous list is kept until the next attempt.
+        While another thread refreshes it, the previous list is returned, once
+        there is one.
+        """
+        with self._lock:
+            refresh = not self._refreshing and time.monotonic() >= self._expires
+            if refresh:
+                self._refreshing = True
+        if not refresh:
+            self._listed.wait(context.DEFAULT_TIMEOUT)
+            return self._devices
+        devices = None
+        try:
+            devices = self._discover()
+        except Exception as e:
+            self.logger.error(f"Device discovery failed for panorama={self.host}: {e}")
+        finally:
+            with self._lock:
+                if devices is not None:
+                    self._devices = devices
+                self._expires = time.monotonic() + self.refresh_interval
+                self._refreshing = False
+            self._listed.set()
+        return self._devices
+
+    def export_state(self):
+        with self._lock:
+            return {
+                "expires": self._expires + time.time() - time.monotonic(),
+                "devices": self._devices,
+            }
+
+    def import_state(self, state):
+        with self._lock:
+            if not self._devices:
+                self._devices = state.get("devices", {})
+                self._expires = state.get("expires", 0.0) + time.monotonic() - time.time()
+                if self._devices:
+                    self._listed.set()
+
+    def _discover(self):
+        with context.session_pool.acquire(self.host) as session:
+            response = session.get(
+                f"https://{self.host}/api/",
+                params={
+                    "type": "op",
+                    "cmd": DISCOVERY_COMMAND,
+                    "key": self.settings.get("api_key"),
+                },
+                verify=False,
+                timeout=context.DEFAULT_TIMEOUT,
+                auth=(self.settings["username"], self.settings["password"]),
+                stream=True,
+            )
+            text, _ = read_body(
+                response, response_limit("panorama_discovery", self.settings), ScrapeBudget()
+            )
+            response.raise_for_status()
+        check_prolog(text)
+        root = xml_backend.fromstring(text)
+        devices = {}
+        for entry in xml_backend.findall(root, ".//devices/entry"):
+            serial = entry.findtext("serial") or entry.get("name")
+            if not serial or entry.findtext("connected", "yes") != "yes":
+                continue
+            devices[serial] = {
+                tag: entry.findtext(tag) or ""
+                for tag in ("hostname", "ip-address", "model", "sw-version")
+            }
+        self.logger.info(f"Discovered {len(devices)} devices via panorama={self.host}")
+        return devices
+
+    def _credentials(self):
+        return {
+            k: self.settings[k] for k in ("username", "password", "api_key") if k in self.settings
+        }
+
+    def device_config(self, serial):
+        """
+        Return the collector device config for a managed firewall, or None if
+        Panorama does not know the serial.
+        """
+        if serial not in self.devices():
+            return None
+        # Panorama-level collector settings, then per-serial overrides
+        device_config = {
+            k: v for k, v in self.settings.items() if k not in _CONNECTION_KEYS and k != "devices"
+        }
+        device_config.update(self.settings.get("devices", {}).get(serial) or {})
+        device_config.update(self._credentials())
+        device_config["host"] = serial
+        device_config["api_host"] = self.host
+        device_config["target_serial"] = serial
+        return device_config
+
+
+class PanoramaDirectory:
+    """
+    All Panoramas from the config's `panoramas` section, searched in order.
+    """
+
+    def __init__(self, config):
+        self.connectors = [
+            PanoramaConnector(name, settings)
+            for name, settings in (config.get("panoramas") or {}).items()
+        ]
+
+    def device_config(self, serial):
+        for connector in self.connectors:
+            device_config = connector.device_config(serial)
+            if device_config is not None:
+                return device_config
+        return None
+
+    def export_state(self):
+        return {c.name: c.export_state() for c in self.connectors}
+
+    def import_state(self, state):
+        for connector in self.connectors:
+            if connector.name in state:
+                connector.import_state(state[connector.name])
+
+    def serials(self):
+        """
+        Serials of every firewall currently connected to any Panorama.
+        """
+        serials = []
+        for connector in self.connectors:
+            serials.extend(s for s in connector.devices() if s not in serials)
+        return serials
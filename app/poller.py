@@ -0,0 +1,245 @@
+"""
+Standalone collection process for panos_exporter.
+- Owns all firewall polling when POLLER is enabled
+- Writes rendered per-device snapshots to the shared SnapshotStore
+- Optionally pushes every poll to a Prometheus remote-write endpoint
+  (REMOTE_WRITE_URL), in which case the snapshot store is optional
+- Optionally persists last-known-good snapshots and collector state to a warm
+  state file (WARM_STATE_FILE) every WARM_STATE_INTERVAL seconds, in a background
+  thread, and serves them as restored snapshots after a restart
+- Exits when the process that started it (gunicorn) goes away
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+
+from app.config_loader import ConfigLoader
+from app.exporter import Exporter
+from app.flight_recorder import flight_recorder
+from app.remote_write import RemoteWriter
+from app.sharding import shard_from_env
+from app.snapshot_store import SnapshotStore
+from app.warm_state import WarmState
+
+logger = logging.getLogger("panos_exporter.poller")
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class Poller:
+    """
+    Polls every configured device on a fixed interval and publishes the results.
+    Each device's collection must finish within device_timeout seconds (default:
+    the interval), so one slow device cannot hold up the cycle.
+    """
+
+    def __init__(
+        self,
+        config,
+        store,
+        interval=30,
+        workers=4,
+        exporter=None,
+        warm_state=None,
+        shard=None,
+        remote_writer=None,
+        persist_interval=300,
+        device_timeout=None,
+    ):
+        self.config = config
+        self.store = store
+        self.interval = interval
+        self.device_timeout = device_timeout or interval
+        self.exporter = exporter or Exporter(config)
+        self.warm_state = warm_state
+        self.shard = shard
+        self.remote_writer = remote_writer
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poller")
+        # device -> (timestamp, output) of its latest scrape with panos_up 1
+        self.last_good = {}
+        self.persist_interval = persist_interval
+        self._dirty = False
+        self._next_persist = 0.0
+        self._persist_thread = None
+
+    def targets(self):
+        """
+        Devices this poller collects: every target, or only this replica's shard.
+        """
+        targets = self.exporter.targets()
+        return self.shard.owned(targets) if self.shard is not None else targets
+
+    def restore(self):
+        """
+        Load the warm state file, publish its snapshots as restored (stale) and
+        seed collector state, then mark the store ready.
+        """
+        if self.store is not None:
+            self.store.set_ready(False)
+        if self.warm_state is not None:
+            snapshots, state = self.warm_state.load()
+            self.exporter.import_state(state)
+            targets = set(self.targets())
+            for device, (timestamp, output) in snapshots.items():
+                if device not in targets:
+                    continue
+                self.last_good[device] = (timestamp, output)
+                if self.store is not None and self.store.read(device) is None:
+                    self.store.write(device, output, timestamp=timestamp, restored=True)
+            logger.info(f"Restored {len(self.last_good)} snapshots from warm state")
+        if self.store is not None:
+            self.store.set_ready()
+
+    def persist(self):
+        """
+        Save last-known-good snapshots and collector state. Never raises.
+        """
+        if self.warm_state is None:
+            return
+        self._dirty = False
+        try:
+            self.warm_state.save(dict(self.last_good), self.exporter.export_state())
+        except Exception:
+            self._dirty = True
+            logger.exception(f"Saving warm state to {self.warm_state.path} failed")
+
+    def persist_in_background(self):
+        """
+        Start persist() in a background thread when persist_interval has passed
+        since the last start and a snapshot changed, unless a save is still running.
+        Returns the thread, or None when nothing was started.
+        """
+        if self.warm_state is None or not self._dirty or time.monotonic() < self._next_persist:
+            return None
+        if self._persist_thread is not None and self._persist_thread.is_alive():
+            return None
+        self._next_persist = time.monotonic() + self.persist_interval
+        self._persist_thread = threading.Thread(target=self.persist, name="warm-state", daemon=True)
+        self._persist_thread.start()
+        return self._persist_thread
+
+    def poll_device(self, target):
+        """
+        Collect one device and publish its snapshot and/or push its samples.
+        Never raises.
+        """
+        try:
+            started = time.time()
+            deadline = time.monotonic() + self.device_timeout
+            output = self.exporter.collect_metrics(target, deadline=deadline)
+            if self.store is not None:
+                self.store.write(target, output, timestamp=started)
+                if flight_recorder.size:
+                    self.store.write_scrapes(target, flight_recorder.scrapes(target))
+            if self.remote_writer is not None:
+                self.remote_writer.push(target, output, started)
+            if f'panos_up{{device="{target}"}} 1' in output:
+                self.last_good[target] = (started, output)
+                self._dirty = True
+            logger.debug(f"Polled target={target} in {time.time() - started:.2f}s")
+        except Exception:
+            logger.exception(f"Poll failed for target={target}")
+
+    def run_once(self):
+        """
+        Publish the target list, then poll all devices (including Panorama-managed
+        firewalls) concurrently and wait for them to finish.
+        """
+        targets = self.exporter.targets()
+        if self.store is not None:
+            self.store.write_targets(targets)
+        if self.shard is not None:
+            targets = self.shard.owned(targets)
+        list(self.executor.map(self.poll_device, targets))
+
+    def run(self, parent_pid=None):
+        """
+        Poll forever, or until parent_pid is no longer our parent.
+        """
+        self.restore()
+        while True:
+            started = time.monotonic()
+            self.run_once()
+            if self.remote_writer is not None:
+                self.remote_writer.push(None, self.remote_writer.metrics(), time.time())
+            self.persist_in_background()
+            deadline = started + self.interval
+            while time.monotonic() < deadline:
+                if parent_pid is not None and os.getppid() != parent_pid:
+                    logger.info("Parent process exited, stopping poller")
+                    self.executor.shutdown(wait=False)
+                    if self._persist_thread is not None:
+                        self._persist_thread.join()
+                    if self._dirty:
+                        self.persist()
+                    if self.remote_writer is not None:
+                        self.remote_writer.close(timeout=self.interval)
+                    return
+                time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+
+
+def remote_writer_from_env():
+    """
+    Build a RemoteWriter from REMOTE_WRITE_* variables, or None when
+    REMOTE_WRITE_URL is not set.
+    """
+    url = os.environ.get("REMOTE_WRITE_URL")
+    if not url:
+        return None
+    username = os.environ.get("REMOTE_WRITE_USERNAME")
+    return RemoteWriter(
+        url,
+        batch_size=_env_int("REMOTE_WRITE_BATCH_SIZE", 2000),
+        flush_interval=_env_int("REMOTE_WRITE_FLUSH_INTERVAL", 5),
+        max_queue=_env_int("REMOTE_WRITE_MAX_QUEUE", 200000),
+        max_retries=_env_int("REMOTE_WRITE_MAX_RETRIES", 5),
+        job=os.environ.get("REMOTE_WRITE_JOB", "panos_exporter"),
+        auth=(username, os.environ.get("REMOTE_WRITE_PASSWORD", "")) if username else None,
+    )
+
+
+def main():
+    debug = os.environ.get("DEBUG", "0").lower() in ("1", "true", "yes")
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    snapshot_dir = os.environ.get("SNAPSHOT_DIR")
+    remote_writer = remote_writer_from_env()
+    if not snapshot_dir and remote_writer is None:
+        message = "The poller needs SNAPSHOT_DIR, REMOTE_WRITE_URL or both to publish polls"
+        logger.error(message)
+        raise ValueError(message)
+    config = ConfigLoader("config.yaml").load()
+    store = SnapshotStore(snapshot_dir) if snapshot_dir else None
+    warm_state_file = os.environ.get("WARM_STATE_FILE")
+    interval = _env_int("POLL_INTERVAL", 30)
+    poller = Poller(
+        config,
+        store,
+        interval=interval,
+        workers=_env_int("POLL_WORKERS", 4),
+        warm_state=WarmState(warm_state_file) if warm_state_file else None,
+        persist_interval=_env_int("WARM_STATE_INTERVAL", 300),
+        device_timeout=_env_int("POLL_DEVICE_TIMEOUT", interval),
+        shard=shard_from_env(),
+        remote_writer=remote_writer.start() if remote_writer else None,
+    )
+    parent_pid = _env_int("POLLER_PARENT_PID", 0) or None
+    logger.info(f"Poller started for {len(config['devices'])} devices")
+    poller.run(parent_pid=parent_pid)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import cProfile
+import multiprocessing
+import pstats
+import time
+import tracemalloc
+
+from app.collectors.tracing import tracing
+
+# Frames kept per tracemalloc allocation site
+TRACEMALLOC_FRAMES = 10
+# Seconds a profiling process may run before it is killed
+PROFILE_TIMEOUT = 120
+
+
+def profile_in_subprocess(config, state, target, limit=20, timeout=PROFILE_TIMEOUT):
+    """
+    Run profile_scrape in a short-lived process with its own Exporter, seeded
+    with state (Exporter.export_state()), and return its report.
+    Since Python 3.12 cProfile hooks sys.monitoring, which is process-wide, and
+    tracemalloc always is; a separate process keeps both away from the requests
+    this worker is serving. The child starts with cold caches, so the report
+    shows a first scrape. Raises multiprocessing.TimeoutError after timeout.
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply_async(_profile_child, (config, state, target, limit)).get(timeout)
+
+
+def _profile_child(config, state, target, limit):
+    from app.exporter import Exporter
+
+    exporter = Exporter(config)
+    exporter.import_state(state)
+    return profile_scrape(exporter, target, limit=limit)
+
+
+def profile_scrape(exporter, target, limit=20):
+    """
+    Run one collect_metrics(target) under cProfile and tracemalloc and return a report:
+    - collectors: per-collector total/fetch/parse/render seconds
+    - functions: hottest functions by own time
+    - allocations: top allocation sites still live after the scrape
+    Both profilers see the whole process (cProfile since Python 3.12), so run it
+    where nothing else is going on: see profile_in_subprocess.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    profiler = cProfile.Profile()
+    try:
+        with tracing() as trace:
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                output = exporter.collect_metrics(target)
+            finally:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    functions = []
+    stats = pstats.Stats(profiler).stats
+    hottest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    for (filename, line, name), (_, calls, own, cumulative, _) in hottest:
+        functions.append(
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "own_seconds": round(own, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            }
+        )
+    allocations = [
+        {"site": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+    return {
+        "target": target,
+        "seconds": round(elapsed, 6),
+        "output_bytes": len(output),
+        "peak_memory_bytes": max(0, peak - baseline),
+        "collectors": {
+            name: {phase: round(seconds, 6) for phase, seconds in phases.items()}
+            for name, phases in trace.breakdown().items()
+        },
+        "functions": functions,
+        "allocations": allocations,
+    }
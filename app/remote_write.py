@@ -0,0 +1,261 @@
+"""
+Prometheus remote-write push mode for the poller.
+- Rendered device output is parsed back into samples and queued in memory
+- A background thread sends snappy-compressed protobuf WriteRequests in batches
+  of batch_size samples, or whatever is queued every flush_interval seconds
+- Failed sends (connection errors, 429, 5xx) are retried with exponential backoff;
+  other 4xx responses drop the batch, as the remote-write spec requires
+- The queue is bounded: when full, the oldest samples are dropped and counted
+"""
+
+import logging
+import re
+import struct
+import threading
+from collections import deque
+
+import requests
+
+from app import snappy_codec
+
+logger = logging.getLogger("panos_exporter.remote_write")
+
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_MAX_QUEUE = 200000
+DEFAULT_MAX_RETRIES = 5
+MIN_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+DEFAULT_TIMEOUT = 10
+
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+_ESCAPES = {"\\\\": "\\", '\\"': '"', "\\n": "\n"}
+
+
+def parse_samples(text, extra_labels=None):
+    """
+    Parse Prometheus text output into (labels, value) pairs, labels being a sorted
+    tuple of (name, value) including __name__. Unparseable lines are skipped.
+    """
+    samples = []
+    for line in text.splitlines():
+        if not line or line[0] == "#":
+            continue
+        series, _, value = line.rpartition(" ")
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        name, brace, label_text = series.partition("{")
+        labels = {"__name__": name}
+        if brace:
+            for key, raw in _LABEL.findall(label_text):
+                labels[key] = re.sub(r'\\[\\"n]', lambda m: _ESCAPES[m.group(0)], raw)
+        if extra_labels:
+            labels.update(extra_labels)
+        samples.append((tuple(sorted(labels.items())), value))
+    return samples
+
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _field(number, payload):
+    # Length-delimited field (wire type 2)
+    return _varint((number << 3) | 2) + _varint(len(payload)) + payload
+
+
+def encode_write_request(batch):
+    """
+    Encode [(labels, value, timestamp_ms)] as a prometheus.WriteRequest, one
+    TimeSeries per label set with its samples in queue order.
+    """
+    series = {}
+    for labels, value, timestamp in batch:
+        series.setdefault(labels, []).append((value, timestamp))
+    out = bytearray()
+    for labels, points in series.items():
+        body = bytearray()
+        for name, value in labels:
+            body += _field(1, _field(1, name.encode()) + _field(2, value.encode()))
+        for value, timestamp in points:
+            # Sample: double value = 1 (wire type 1), int64 timestamp = 2 (varint)
+            body += _field(2, b"\x09" + struct.pack("<d", value) + b"\x10" + _varint(timestamp))
+        out += _field(1, bytes(body))
+    return bytes(out)
+
+
+class RemoteWriter:
+    """
+    Bounded sample queue drained to a remote-write endpoint by a background thread.
+    """
+
+    def __init__(
+        self,
+        url,
+        batch_size=DEFAULT_BATCH_SIZE,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        max_queue=DEFAULT_MAX_QUEUE,
+        max_retries=DEFAULT_MAX_RETRIES,
+        job="panos_exporter",
+        auth=None,
+        session=None,
+    ):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.job = job
+        self.auth = auth
+        self.session = session or requests.Session()
+        self.stats = {"sent": 0, "failed": 0, "dropped": 0, "retries": 0}
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closing = threading.Event()
+        self._thread = None
+
+    def push(self, instance, text, timestamp):
+        """
+        Queue every sample in a device's rendered output, labelled with the job
+        and instance and stamped with the poll time (seconds).
+        """
+        extra = {"job": self.job}
+        if instance is not None:
+            extra["instance"] = instance
+        timestamp_ms = int(timestamp * 1000)
+        samples = parse_samples(text, extra)
+        with self._cond:
+            for labels, value in samples:
+                self._queue.append((labels, value, timestamp_ms))
+            overflow = len(self._queue) - self.max_queue
+            for _ in range(max(0, overflow)):
+                self._queue.popleft()
+            if overflow > 0:
+                self.stats["dropped"] += overflow
+                logger.warning(f"Remote write queue full, dropped {overflow} oldest samples")
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return len(samples)
+
+    def queued(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _take(self, wait):
+        """
+        Pop the next batch; with wait=True block until a full batch is queued, the
+        flush interval has passed or the writer is closing.
+        """
+        with self._cond:
+            if wait:
+                self._cond.wait_for(
+                    lambda: len(self._queue) >= self.batch_size or self._closing.is_set(),
+                    timeout=self.flush_interval,
+                )
+            count = min(self.batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def send(self, batch):
+        """
+        POST one batch, retrying retryable failures. Returns True once accepted.
+        """
+        body = snappy_codec.compress(encode_write_request(batch))
+        headers = {
+            "Content-Encoding": "snappy",
+            "Content-Type": "application/x-protobuf",
+            "User-Agent": "panos_exporter",
+            "X-Prometheus-Remote-Write-Version": "0.1.0",
+        }
+        backoff = MIN_BACKOFF
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    self.url, data=body, headers=headers, auth=self.auth, timeout=DEFAULT_TIMEOUT
+                )
+                status = response.status_code
+                if status < 300:
+                    self._count("sent", len(batch))
+                    return True
+                error = f"HTTP {status}"
+                if status != 429 and status < 500:
+                    logger.error(f"Remote write rejected {len(batch)} samples: {error}")
+                    break
+            except requests.RequestException as e:
+                error = str(e)
+            # No more waiting once the writer is shutting down
+            if attempt == self.max_retries or self._closing.is_set():
+                logger.error(f"Remote write of {len(batch)} samples failed: {error}")
+                break
+            self._count("retries", 1)
+            logger.warning(f"Remote write failed ({error}), retrying in {backoff:.1f}s")
+            self._closing.wait(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+        self._count("failed", len(batch))
+        return False
+
+    def _count(self, stat, n):
+        with self._cond:
+            self.stats[stat] += n
+
+    def flush(self):
+        """
+        Send everything queued now, in batches.
+        """
+        while True:
+            batch = self._take(wait=False)
+            if not batch:
+                return
+            self.send(batch)
+
+    def run(self):
+        while not self._closing.is_set():
+            batch = self._take(wait=True)
+            if batch:
+                self.send(batch)
+        self.flush()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="remote-write", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self, timeout=None):
+        """
+        Stop the sender thread after a final flush (one attempt per batch).
+        """
+        self._closing.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self):
+        """
+        Prometheus text for the writer's own counters, pushed alongside device samples.
+        """
+        with self._cond:
+            stats = dict(self.stats)
+        lines = []
+        for metric, stat, help_text in (
+            ("samples_sent_total", "sent", "Samples accepted by the remote-write endpoint"),
+            ("samples_failed_total", "failed", "Samples dropped after failed or rejected sends"),
+            ("samples_dropped_total", "dropped", "Samples dropped because the queue was full"),
+            ("retries_total", "retries", "Remote-write send retries"),
+        ):
+            metric = f"panos_exporter_remote_write_{metric}"
+            lines.append(
+                f"# HELP {metric} {help_text}\n# TYPE {metric} counter\n{metric} {stats[stat]}\n"
+            )
+        lines.append(
+            "# HELP panos_exporter_remote_write_queue_samples Samples waiting to be sent\n"
+            "# TYPE panos_exporter_remote_write_queue_samples gauge\n"
+            f"panos_exporter_remote_write_queue_samples {self.queued()}\n"
+        )
+        return "".join(lines)
@@ -0,0 +1,79 @@
+import bisect
+import hashlib
+import os
+
+# Points per replica on the ring; more points give a more even split
+DEFAULT_VNODES = 128
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode(), usedforsecurity=False).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping devices to exporter replicas.
+    Adding or removing one of N replicas moves only about 1/N of the devices,
+    and every replica computes the same owner from the same replica list.
+    """
+
+    def __init__(self, replicas, vnodes=DEFAULT_VNODES):
+        if not replicas:
+            raise ValueError("HashRing needs at least one replica")
+        self.replicas = list(dict.fromkeys(replicas))
+        points = sorted(
+            (_hash(f"{replica}#{i}"), replica) for replica in self.replicas for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [r for _, r in points]
+
+    def owner(self, device):
+        """
+        Return the replica that owns device.
+        """
+        index = bisect.bisect(self._hashes, _hash(device)) % len(self._hashes)
+        return self._owners[index]
+
+    def assignments(self, devices):
+        """
+        Return {replica: [devices]} for every replica, in ring replica order.
+        """
+        owned = {replica: [] for replica in self.replicas}
+        for device in devices:
+            owned[self.owner(device)].append(device)
+        return owned
+
+
+class Shard:
+    """
+    This replica's view of the ring.
+    - self_address: this replica's entry in the replica list (host:port)
+    - misdirected: "redirect" (307 to the owner) or "421" (Misdirected Request)
+    """
+
+    def __init__(self, ring, self_address, misdirected="redirect"):
+        if self_address not in ring.replicas:
+            raise ValueError(f"Shard address {self_address} is not in the replica list")
+        self.ring = ring
+        self.self_address = self_address
+        self.misdirected = misdirected
+
+    def owns(self, device):
+        return self.ring.owner(device) == self.self_address
+
+    def owned(self, devices):
+        return [d for d in devices if self.owns(d)]
+
+
+def shard_from_env():
+    """
+    Build the Shard from SHARD_REPLICAS (comma-separated host:port list, identical
+    on every replica) and SHARD_SELF. Returns None when sharding is disabled.
+    """
+    replicas = [r.strip() for r in os.getenv("SHARD_REPLICAS", "").split(",") if r.strip()]
+    if not replicas:
+        return None
+    misdirected = os.getenv("SHARD_MISDIRECTED", "redirect").lower()
+    if misdirected not in ("redirect", "421"):
+        raise ValueError("SHARD_MISDIRECTED must be 'redirect' or '421'")
+    return Shard(HashRing(replicas), os.getenv("SHARD_SELF", ""), misdirected)
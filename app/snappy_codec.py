@@ -0,0 +1,127 @@
+"""
+Snappy block format, as required by Prometheus remote write.
+Uses python-snappy when it is installed; otherwise a pure-Python encoder
+(greedy 4-byte hash matching within 64 KiB blocks) with the same output format.
+"""
+
+try:
+    import snappy as _snappy
+except ImportError:
+    _snappy = None
+
+BLOCK_SIZE = 65536
+MIN_MATCH = 4
+
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _emit_literal(out, literal):
+    n = len(literal) - 1
+    if n < 0:
+        return
+    if n < 60:
+        out.append(n << 2)
+    elif n < 0x100:
+        out.append(60 << 2)
+        out.append(n)
+    else:
+        out.append(61 << 2)
+        out += n.to_bytes(2, "little")
+    out += literal
+
+
+def _emit_copy(out, offset, length):
+    # Copies with a 2-byte offset carry up to 64 bytes each
+    while length > 0:
+        chunk = min(length, 64)
+        out.append(((chunk - 1) << 2) | 2)
+        out += offset.to_bytes(2, "little")
+        length -= chunk
+
+
+def _compress_block(block, out):
+    table = {}
+    size = len(block)
+    pos = 0
+    literal_start = 0
+    while pos + MIN_MATCH <= size:
+        key = block[pos : pos + MIN_MATCH]
+        candidate = table.get(key)
+        table[key] = pos
+        if candidate is None:
+            pos += 1
+            continue
+        length = MIN_MATCH
+        while pos + length < size and block[candidate + length] == block[pos + length]:
+            length += 1
+        _emit_literal(out, block[literal_start:pos])
+        _emit_copy(out, pos - candidate, length)
+        pos += length
+        literal_start = pos
+    _emit_literal(out, block[literal_start:])
+
+
+def compress(data):
+    """
+    Compress bytes to a raw snappy block.
+    """
+    if _snappy is not None:
+        return _snappy.compress(data)
+    out = bytearray(_varint(len(data)))
+    for start in range(0, len(data), BLOCK_SIZE):
+        _compress_block(data[start : start + BLOCK_SIZE], out)
+    return bytes(out)
+
+
+def decompress(data):
+    """
+    Decompress a raw snappy block. Raises ValueError on malformed input.
+    """
+    if _snappy is not None:
+        return _snappy.uncompress(data)
+    length = shift = pos = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        length |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    out = bytearray()
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        kind = tag & 3
+        if kind == 0:
+            n = tag >> 2
+            if n >= 60:
+                width = n - 59
+                n = int.from_bytes(data[pos : pos + width], "little")
+                pos += width
+            out += data[pos : pos + n + 1]
+            pos += n + 1
+            continue
+        if kind == 1:
+            n = ((tag >> 2) & 7) + 4
+            offset = ((tag >> 5) << 8) | data[pos]
+            pos += 1
+        else:
+            width = 2 if kind == 2 else 4
+            n = (tag >> 2) + 1
+            offset = int.from_bytes(data[pos : pos + width], "little")
+            pos += width
+        if offset == 0 or offset > len(out):
+            raise ValueError("snappy copy offset out of range")
+        start = len(out) - offset
+        for i in range(n):
+            out.append(out[start + i])
+    if len(out) != length:
+        raise ValueError("snappy length mismatch")
+    return bytes(out)
@@ -0,0 +1,165 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import quote
+
+# magic, format version, flags, snapshot timestamp, payload length
+HEADER = struct.Struct("<4sHHdI")
+MAGIC = b"PSNP"
+VERSION = 2
+
+# Snapshot was restored from warm state and not yet refreshed by a poll
+FLAG_RESTORED = 0x1
+
+# Present while the poller has loaded its warm state (or had none to load)
+READY_MARKER = ".ready"
+# Every target the poller knows about, including Panorama-managed serials
+TARGETS_FILE = ".targets.json"
+
+Snapshot = namedtuple("Snapshot", "timestamp payload restored")
+
+
+class SnapshotStore:
+    """
+    Per-device rendered snapshots shared between processes through files in a
+    (preferably tmpfs) directory.
+    - The poller writes each snapshot to a temp file and atomically renames it
+    - HTTP workers memory-map the current file and remap only when it is replaced
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.logger = logging.getLogger("panos_exporter.snapshot_store")
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def _path(self, device):
+        return os.path.join(self.directory, quote(device, safe="") + ".snap")
+
+    def _scrapes_path(self, device):
+        return os.path.join(self.directory, quote(device, safe="") + ".scrapes.json")
+
+    def write(self, device, text, timestamp=None, restored=False):
+        """
+        Atomically publish the rendered metrics text for a device.
+        """
+        payload = text.encode()
+        flags = FLAG_RESTORED if restored else 0
+        header = HEADER.pack(MAGIC, VERSION, flags, timestamp or time.time(), len(payload))
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(payload)
+            os.replace(tmp_path, self._path(device))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def write_scrapes(self, device, scrapes):
+        """
+        Publish the device's flight recorder entries (see app.flight_recorder).
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(scrapes, f)
+            os.replace(tmp_path, self._scrapes_path(device))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def read_scrapes(self, device):
+        """
+        Return the device's published flight recorder entries, or None.
+        """
+        try:
+            with open(self._scrapes_path(device), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_targets(self, targets):
+        """
+        Publish the poller's target list, so workers know Panorama-managed serials.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(list(targets), f)
+            os.replace(tmp_path, os.path.join(self.directory, TARGETS_FILE))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def read_targets(self):
+        """
+        Return the poller's published target list, or None if none is published yet.
+        """
+        try:
+            with open(os.path.join(self.directory, TARGETS_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def read(self, device):
+        """
+        Return (timestamp, payload bytes) for a device, or None if no snapshot exists.
+        """
+        snapshot = self.read_snapshot(device)
+        return None if snapshot is None else snapshot[:2]
+
+    def read_snapshot(self, device):
+        """
+        Return a Snapshot(timestamp, payload, restored) for a device, or None.
+        """
+        path = self._path(device)
+        with self._lock:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return None
+            cached = self._maps.get(device)
+            if cached is None or cached[0] != (st.st_ino, st.st_mtime_ns):
+                if cached is not None:
+                    cached[1].close()
+                with open(path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                cached = self._maps[device] = ((st.st_ino, st.st_mtime_ns), mapped)
+            mapped = cached[1]
+            if len(mapped) < HEADER.size:
+                magic = version = None
+            else:
+                magic, version, flags, timestamp, length = HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC or version != VERSION:
+                self.logger.warning(f"Ignoring snapshot with bad header for device={device}")
+                return None
+            payload = mapped[HEADER.size : HEADER.size + length]
+            return Snapshot(timestamp, payload, bool(flags & FLAG_RESTORED))
+
+    def set_ready(self, ready=True):
+        """
+        Publish (or withdraw) the poller's readiness to the HTTP workers.
+        """
+        path = os.path.join(self.directory, READY_MARKER)
+        if ready:
+            with open(path, "w"):
+                pass
+        elif os.path.exists(path):
+            os.unlink(path)
+
+    def is_ready(self):
+        return os.path.exists(os.path.join(self.directory, READY_MARKER))
+
+    def close(self):
+        with self._lock:
+            for _, mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
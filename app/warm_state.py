@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+import struct
+import tempfile
+import zlib
+
+# magic, format version, compressed body length
+HEADER = struct.Struct("<4sHI")
+MAGIC = b"PWST"
+VERSION = 1
+
+
+class WarmState:
+    """
+    Last-known-good state persisted across restarts in a single local file.
+    - snapshots: {device: (timestamp, rendered metrics text)}
+    - state: cheap-to-keep collector state (see Exporter.export_state)
+    The body is zlib-compressed JSON behind a magic/version header; files with
+    another version are ignored rather than migrated.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.logger = logging.getLogger("panos_exporter.warm_state")
+
+    def save(self, snapshots, state):
+        """
+        Atomically replace the warm state file.
+        """
+        body = zlib.compress(
+            json.dumps(
+                {"snapshots": {d: list(s) for d, s in snapshots.items()}, "state": state},
+                separators=(",", ":"),
+            ).encode()
+        )
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(body)))
+                f.write(body)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self):
+        """
+        Return (snapshots, state) from the warm state file, or ({}, {}) if it is
+        missing, from another format version or unreadable.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}, {}
+        try:
+            magic, version, length = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or version != VERSION:
+                self.logger.warning(f"Ignoring warm state {self.path} with version {version}")
+                return {}, {}
+            body = json.loads(zlib.decompress(data[HEADER.size : HEADER.size + length]))
+        except (struct.error, zlib.error, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable warm state {self.path}: {e}")
+            return {}, {}
+        snapshots = {d: (s[0], s[1]) for d, s in body.get("snapshots", {}).items()}
+        return snapshots, body.get("state", {})
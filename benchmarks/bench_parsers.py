@@ -0,0 +1,107 @@
+"""
+Parser benchmarks for the route, BGP peer and global counter collectors.
+
+Runs each collector's parse() against synthetic payloads with every available
+XML backend and prints the timings and the speedup over the stdlib backend.
+
+    python -m benchmarks.bench_parsers [--repeat N]
+"""
+
+import argparse
+import time
+
+from app.collectors import xml_backend
+from app.collectors.global_counter_collector import GlobalCounterCollector
+from app.collectors.routing_bgp_collector import RoutingBgpCollector
+from app.collectors.routing_route_collector import RoutingRouteCollector
+
+DEVICE = {"host": "bench"}
+
+
+def route_payload(count=20000):
+    entries = "".join(
+        "<entry><virtual-router>default</virtual-router>"
+        f"<destination>10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}/32</destination>"
+        f"<nexthop>192.168.0.{i % 250}</nexthop><metric>10</metric><flags>A B </flags>"
+        f"<age>{i}</age><interface>ethernet1/{i % 8}</interface>"
+        "<route-table>unicast</route-table></entry>"
+        for i in range(count)
+    )
+    return f'<response status="success"><result>{entries}</result></response>'
+
+
+def bgp_peer_payload(count=500):
+    entries = "".join(
+        f'<entry peer="peer{i}" vr="default"><peer-group>pg{i % 10}</peer-group>'
+        f"<remote-as>{64512 + i}</remote-as><status>Established</status>"
+        "<status-duration>1000</status-duration><holdtime>90</holdtime>"
+        "<keepalive>30</keepalive><msg-update-in>5</msg-update-in>"
+        "<msg-update-out>6</msg-update-out><password-set>no</password-set>"
+        f"<peer-address>10.0.{i // 256}.{i % 256}:179</peer-address>"
+        '<prefix-counter><entry afi-safi="bgpAfiIpv4-unicast">'
+        "<incoming-total>100</incoming-total><incoming-accepted>90</incoming-accepted>"
+        "</entry></prefix-counter></entry>"
+        for i in range(count)
+    )
+    return f'<response status="success"><result>{entries}</result></response>'
+
+
+def global_counter_payload(count=3000):
+    entries = "".join(
+        f"<entry><category>flow</category><severity>info</severity><value>{i}</value>"
+        f"<rate>0</rate><aspect>pktproc</aspect><desc>Counter {i}</desc>"
+        f"<name>counter_{i}</name></entry>"
+        for i in range(count)
+    )
+    return (
+        '<response status="success"><result><global><counters>'
+        f"{entries}</counters></global></result></response>"
+    )
+
+
+CASES = [
+    ("routes", RoutingRouteCollector().parse, route_payload),
+    ("bgp_peers", RoutingBgpCollector()._parse_peer, bgp_peer_payload),
+    ("global_counters", GlobalCounterCollector().parse, global_counter_payload),
+]
+
+
+def available_backends():
+    names = ["stdlib"]
+    try:
+        xml_backend.load_backend("lxml")
+        names.append("lxml")
+    except ImportError:
+        pass
+    return names
+
+
+def best_of(func, payload, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(payload, DEVICE)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    default = xml_backend.backend_name()
+    print(f"default backend: {default}")
+    print(f"{'payload':<18}{'backend':<10}{'best ms':>10}{'speedup':>10}")
+    for name, func, build in CASES:
+        payload = build()
+        baseline = None
+        for backend in available_backends():
+            xml_backend.set_backend(backend)
+            elapsed = best_of(func, payload, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{name:<18}{backend:<10}{elapsed * 1000:>10.1f}{baseline / elapsed:>9.2f}x")
+    xml_backend.set_backend(default)
+
+
+if __name__ == "__main__":
+    main()
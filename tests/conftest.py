@@ -0,0 +1,237 @@
+"""
+Fakes and sample responses shared by several test modules.
+"""
+
+import random
+import re
+import threading
+import time
+
+import pytest
+from app.collectors import context
+from app.collectors.context import SessionPool
+
+DEVICE = {"host": "192.168.1.25"}
+
+
+SYSTEM_INFO_XML = """
+<response status="success">
+  <result>
+    <system>
+      <uptime>0 days, 20:32:51</uptime>
+      <sw-version>10.1.0</sw-version>
+      <model>PA-220</model>
+      <serial>1234567890</serial>
+      <multi-vsys>off</multi-vsys>
+      <operational-mode>normal</operational-mode>
+      <device-certificate-status>valid</device-certificate-status>
+      <mac_count>5</mac_count>
+    </system>
+  </result>
+</response>
+"""
+
+
+COUNTER_XML = """
+<response status="success">
+<result>
+<global>
+<counters>
+<entry>
+<category>flow</category>
+<severity>drop</severity>
+<value>12</value>
+<rate>0</rate>
+<aspect>parse</aspect>
+<desc>Packets dropped: invalid</desc>
+<name>flow_parse_drop</name>
+</entry>
+<entry>
+<category>flow</category>
+<severity>info</severity>
+<value>9000</value>
+<rate>3</rate>
+<aspect>pktproc</aspect>
+<desc>Packets received</desc>
+<name>pkt_recv</name>
+</entry>
+<entry>
+<category>ctd</category>
+<severity>drop</severity>
+<value>4</value>
+<rate>0</rate>
+<aspect>resource</aspect>
+<desc>Content drops</desc>
+<name>ctd_drop</name>
+</entry>
+</counters>
+</global>
+</result>
+</response>
+"""
+
+
+ROUTE_XML = """
+<response status="success">
+<result>
+<entry>
+<virtual-router>default</virtual-router>
+<destination>0.0.0.0/0</destination>
+<nexthop>14.203.227.233</nexthop>
+<metric/>
+<flags>A?B </flags>
+<age>101265</age>
+<interface/>
+<route-table>unicast</route-table>
+</entry>
+<entry>
+<virtual-router>default</virtual-router>
+<destination>10.0.32.0/28</destination>
+<nexthop>192.168.201.5</nexthop>
+<metric>10</metric>
+<flags>A S </flags>
+<age/>
+<interface>ethernet1/15</interface>
+<route-table>unicast</route-table>
+</entry>
+</result>
+</response>
+"""
+
+
+BGP_PEER_XML = """
+<response status="success">
+<result>
+<entry peer="PE1" vr="default">
+<peer-group>TPG-PE1</peer-group>
+<remote-as>2764</remote-as>
+<status>Established</status>
+<status-duration>101358</status-duration>
+<prefix-counter>
+<entry afi-safi="bgpAfiIpv4-unicast">
+<incoming-total>1</incoming-total>
+<incoming-accepted>1</incoming-accepted>
+</entry>
+</prefix-counter>
+</entry>
+</result>
+</response>
+"""
+
+
+BGP_LOC_RIB_XML = """
+<response status="success">
+<result>
+<entry vr="default">
+<loc-rib>
+<member>
+<prefix>0.0.0.0/0</prefix>
+<flag>*</flag>
+<nexthop>14.203.227.233</nexthop>
+<received-from>PE1</received-from>
+<as-path>2764</as-path>
+<attr><med>0</med><local-preference>200</local-preference></attr>
+<flap-stat><flap-count>0</flap-count></flap-stat>
+</member>
+</loc-rib>
+</entry>
+</result>
+</response>
+"""
+
+
+ROUTE_TEMPLATE = """
+<response status="success">
+<result>
+<entry>
+<virtual-router>{vr}</virtual-router>
+<destination>{host}/32</destination>
+<nexthop>192.0.2.1</nexthop>
+<metric>10</metric>
+<flags>A S </flags>
+<age>5</age>
+<interface>ethernet1/1</interface>
+<route-table>unicast</route-table>
+</entry>
+</result>
+</response>
+"""
+
+
+# Two VRs on one device, answered by FakeSession
+ROUTE_CONFIG = {
+    "devices": {"10.0.0.1": {"username": "u", "password": "p", "virtual_router": ["vr1", "vr2"]}},
+    "collectors": ["routing_route_collector"],
+}
+
+
+def loc_rib(routes_per_vr):
+    members = {
+        vr: "".join(
+            f"<member><prefix>10.{i // 256 % 256}.{i % 256}.0/{22 + i % 3}</prefix>"
+            f"<flag>{'*' if i % 4 else ''}</flag><received-from>PE{i % 2}</received-from>"
+            f"<as-path>65001 {{65002 65003}} {' '.join(['65010'] * (i % 3))}</as-path>"
+            f"<attr><med>{i % 50}</med><local-preference>100</local-preference></attr>"
+            "</member>"
+            for i in range(routes_per_vr)
+        )
+        for vr in ("default", "dmz")
+    }
+    entries = "".join(
+        f'<entry vr="{vr}"><loc-rib>{m}</loc-rib></entry>' for vr, m in members.items()
+    )
+    return f'<response status="success"><result>{entries}</result></response>'
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """
+    Answers route queries for whichever VR was requested and fails if two
+    threads ever use the same session at once.
+    """
+
+    def __init__(self):
+        self.in_use = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        if not self.in_use.acquire(blocking=False):
+            raise AssertionError("session used concurrently")
+        try:
+            time.sleep(random.uniform(0, 0.002))
+            host = url.split("/")[2]
+            vr = re.search(r"<virtual-router>(.*?)</virtual-router>", params["cmd"]).group(1)
+            return FakeResponse(ROUTE_TEMPLATE.format(vr=vr, host=host))
+        finally:
+            self.in_use.release()
+
+    def close(self):
+        pass
+
+
+class FakeExporter:
+    def __init__(self, targets):
+        self._targets = targets
+        self.calls = []
+
+    def targets(self):
+        return list(self._targets)
+
+    def collect_metrics(self, target, deadline=None):
+        self.calls.append(target)
+        if target == "broken":
+            raise RuntimeError("boom")
+        return f'panos_up{{device="{target}"}} 1\n'
+
+
+@pytest.fixture
+def fake_sessions(monkeypatch):
+    pool = SessionPool(factory=FakeSession)
+    monkeypatch.setattr(context, "session_pool", pool)
+    return pool
@@ -0,0 +1,83 @@
+from app.adaptive import AdaptivePolicy
+from app.collectors.mgmt_load import mgmt_load
+from app.collectors.registry import CollectorSpec
+from app.collectors.system_resources_collector import SystemResourcesCollector, parse_top
+from app.exporter import Exporter
+
+TOP = """top - 10:12:56 up 5 days, 19:24,  0 users,  load average: 2.53, 1.59, 0.61
+Tasks: 158 total,   1 running, 157 sleeping,   0 stopped,   0 zombie
+%Cpu(s): 83.1 us,  6.2 sy,  0.0 ni, 10.5 id,  0.2 wa,  0.0 hi,  0.0 si,  0.0 st
+MiB Mem :   3935.5 total,    200.0 free,   2035.5 used,   1700.0 buff/cache
+MiB Swap:   5961.0 total,   5800.0 free,    161.0 used.   1500.0 avail Mem
+"""
+
+OLD_TOP = """top - 10:12:56 up 5 days, load average: 0.10, 0.20, 0.30
+Cpu(s):  1.5%us,  0.9%sy,  0.0%ni, 97.6%id,  0.0%wa,  0.0%hi,  0.0%si,  0.0%st
+Mem:   4040084k total,  3874100k used,   165984k free,   170180k buffers
+Swap:  6242292k total,  1262776k used,  4979516k free,  1434508k cached
+"""
+
+SPEC = CollectorSpec("routes", "x:Y", cost="expensive", default_ttl=60)
+
+
+def test_parse_top_formats():
+    top = parse_top(TOP)
+    assert top["load"] == [2.53, 1.59, 0.61]
+    assert top["cpu"]["id"] == 10.5
+    assert top["memory"]["total"] == int(3935.5 * 1024**2)
+    assert top["memory"]["buff_cache"] == int(1700.0 * 1024**2)
+    assert top["swap"]["used"] == int(161.0 * 1024**2)
+    old = parse_top(OLD_TOP)
+    assert old["cpu"]["us"] == 1.5
+    assert old["memory"]["total"] == 4040084 * 1024
+    assert old["swap"]["cached"] == 1434508 * 1024
+
+
+def test_collector_records_load():
+    xml = f'<response status="success"><result><![CDATA[{TOP}]]></result></response>'
+    output = SystemResourcesCollector().parse(xml, {"host": "busy-fw"})
+    assert 'panos_mgmt_load_average{window="1m"} 2.53' in output
+    assert 'panos_mgmt_cpu_percent{mode="us"} 83.1' in output
+    cpu, load1 = mgmt_load.get("busy-fw")
+    assert round(cpu, 1) == 89.5
+    assert load1 == 2.53
+
+
+def test_backoff_grows_while_busy_and_recovers():
+    policy = AdaptivePolicy()
+    device = {"host": "fw1"}
+    assert policy.update("fw1", device) == 1
+    mgmt_load.record("fw1", 95.0, 4.0)
+    assert [policy.update("fw1", device) for _ in range(5)] == [2, 4, 8, 8, 8]
+    mgmt_load.record("fw1", 70.0, 1.0)
+    assert policy.update("fw1", device) == 8
+    mgmt_load.record("fw1", 20.0, 0.5)
+    assert [policy.update("fw1", device) for _ in range(4)] == [4, 2, 1, 1]
+    mgmt_load.record("fw1", 95.0, 4.0)
+    assert policy.update("fw1", {"host": "fw1", "adaptive_polling": False}) == 1
+
+
+def test_expensive_collector_served_from_cache_while_backed_off():
+    now = [1000.0]
+    policy = AdaptivePolicy(clock=lambda: now[0])
+    cheap = CollectorSpec("info", "x:Y", cost="cheap")
+    assert policy.cached("fw2", SPEC, 4) is None
+    policy.record("fw2", SPEC, "routes 1\n")
+    policy.record("fw2", cheap, "info 1\n")
+    assert policy.cached("fw2", SPEC, 1) is None
+    assert policy.cached("fw2", SPEC, 4) == "routes 1\n"
+    assert policy.cached("fw2", cheap, 4) is None
+    now[0] += 239
+    assert policy.cached("fw2", SPEC, 4) == "routes 1\n"
+    now[0] += 1
+    assert policy.cached("fw2", SPEC, 4) is None
+
+
+def test_cheap_collectors_run_first():
+    collectors = ["routing_route_collector", "interface_collector", "system_resources_collector"]
+    exporter = Exporter({"devices": {}, "collectors": collectors})
+    assert [c.name for c in exporter.collectors] == [
+        "system_resources_collector",
+        "interface_collector",
+        "routing_route_collector",
+    ]
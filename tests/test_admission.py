@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+from app.admission import AdmissionController, Shed, scrape_timeout
+
+
+def _queue(controller, priority, order):
+    def waiter():
+        with controller.admit(priority):
+            order.append(priority)
+
+    thread = threading.Thread(target=waiter)
+    queued = sum(len(w) for w in controller._waiters.values())
+    thread.start()
+    while sum(len(w) for w in controller._waiters.values()) <= queued:
+        time.sleep(0.001)
+    return thread
+
+
+def test_queued_requests_admitted_by_priority():
+    controller = AdmissionController(max_in_flight=1)
+    controller.acquire()
+    order = []
+    threads = [_queue(controller, p, order) for p in ("normal", "critical", "normal")]
+    controller.release()
+    for t in threads:
+        t.join()
+    assert order == ["critical", "normal", "normal"]
+    assert controller.in_flight == 0
+
+
+def test_low_priority_shed_when_full():
+    controller = AdmissionController(max_in_flight=1)
+    with controller.admit("low"):
+        with pytest.raises(Shed) as excinfo, controller.admit("low"):
+            pass
+    assert excinfo.value.reason == "overloaded"
+    assert 'panos_exporter_requests_shed_total{priority="low",reason="overloaded"} 1' in (
+        controller.metrics()
+    )
+
+
+def test_queue_timeout():
+    controller = AdmissionController(max_in_flight=1, max_queue_seconds=10)
+    controller.acquire()
+    started = time.monotonic()
+    with pytest.raises(Shed) as excinfo:
+        controller.acquire("critical", timeout=0.02)
+    assert time.monotonic() - started < 1
+    assert excinfo.value.reason == "queue_timeout"
+    assert not any(controller._waiters.values())
+    controller.release()
+    assert controller.in_flight == 0
+
+
+def test_disabled_admits_everything():
+    controller = AdmissionController()
+    with controller.admit("low"), controller.admit("low"):
+        assert controller.in_flight == 0
+
+
+def test_scrape_timeout_header():
+    assert scrape_timeout({"X-Prometheus-Scrape-Timeout-Seconds": "10"}) == 9.5
+    assert scrape_timeout({}) is None
+    assert scrape_timeout({"X-Prometheus-Scrape-Timeout-Seconds": "x"}) is None
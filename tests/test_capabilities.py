@@ -0,0 +1,158 @@
+import time
+
+import pytest
+from app.collectors import context
+from app.collectors.capabilities import (
+    Capabilities,
+    command_name,
+    reprobe_interval,
+    unsupported_reason,
+)
+from app.collectors.context import SessionPool
+from app.exporter import Exporter
+
+from conftest import FakeResponse
+
+UNEXPECTED = """<response status="error" code="17"><msg><line><![CDATA[
+ show -> routing -> protocol -> bgp  is unexpected]]></line></msg></response>"""
+EMPTY = '<response status="success"><result></result></response>'
+
+
+class ProbeSession:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append(params["cmd"])
+        return FakeResponse(UNEXPECTED if "<bgp>" in params["cmd"] else EMPTY)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(context, "session_pool", SessionPool(factory=lambda: ProbeSession(calls)))
+    return calls
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    probes = Capabilities()
+    monkeypatch.setattr("app.collectors.base_collector.capabilities", probes)
+    monkeypatch.setattr("app.collectors.system_info_collector.capabilities", probes)
+    monkeypatch.setattr("app.exporter.capabilities", probes)
+    return probes
+
+
+def _config(collectors, **device):
+    return {
+        "devices": {"fw": {"username": "u", "password": "p", **device}},
+        "collectors": collectors,
+    }
+
+
+def test_unsupported_reason():
+    assert unsupported_reason(UNEXPECTED) == "show -> routing -> protocol -> bgp is unexpected"
+    assert unsupported_reason(EMPTY) is None
+    assert unsupported_reason('<response status="error"><msg>timeout</msg></response>') is None
+    assert command_name("<show><routing><summary></summary></routing></show>") == (
+        "show routing summary"
+    )
+
+
+def test_bgp_not_configured_is_probed_once(calls, probes):
+    exporter = Exporter(_config(["routing_bgp_collector"]))
+    first = exporter.collect_metrics("fw")
+    assert len(calls) == 1
+    assert 'panos_up{device="fw"} 1' in first
+    assert "panos_error" not in first
+    assert (
+        'panos_exporter_command_unsupported{collector="routing_bgp_collector",'
+        'command="show routing protocol bgp summary"} 1' in first
+    )
+    exporter.collect_metrics("fw")
+    assert len(calls) == 1
+
+
+def test_reprobe(calls, probes):
+    exporter = Exporter(_config(["routing_bgp_collector"], capability_reprobe_interval=0.01))
+    exporter.collect_metrics("fw")
+    time.sleep(0.02)
+    exporter.collect_metrics("fw")
+    assert len(calls) == 2
+
+    probes.set_info("fw", "PA-440", "10.2.0")
+    probes.mark_unsupported("fw", "c", "<cmd/>", "is unexpected", 3600)
+    assert probes.skipped("fw", "c", "<cmd/>") == "is unexpected"
+    probes.set_info("fw", "PA-440", "11.0.0")
+    assert probes.skipped("fw", "c", "<cmd/>") is None
+
+
+def test_model_skip_and_overrides(calls, probes):
+    collectors = ["system_environmentals_collector"]
+    output = Exporter(_config(collectors, model="PA-VM")).collect_metrics("fw")
+    assert calls == []
+    assert (
+        'panos_exporter_collector_skipped{collector="system_environmentals_collector",'
+        'reason="no hardware sensors"} 1' in output
+    )
+
+    overrides = {"system_environmentals_collector": True, "session_collector": True}
+    Exporter(_config(collectors, model="PA-VM", collector_overrides=overrides)).collect_metrics(
+        "fw"
+    )
+    assert len(calls) == 2
+
+    overrides = {"system_environmentals_collector": False}
+    output = Exporter(_config(collectors, collector_overrides=overrides)).collect_metrics("fw")
+    assert len(calls) == 2
+    assert "panos_exporter_collector_skipped" not in output
+
+
+def test_forced_on_collector_reports_rejection(calls, probes):
+    overrides = {"routing_bgp_collector": True}
+    exporter = Exporter(_config(["routing_bgp_collector"], collector_overrides=overrides))
+    for _ in range(2):
+        output = exporter.collect_metrics("fw")
+        assert 'panos_up{device="fw"} 0' in output
+        assert "bgp is unexpected" in output
+    assert len(calls) == 10
+    assert probes.unsupported("fw") == []
+
+
+def test_not_configured_reprobes_soon():
+    assert reprobe_interval("show -> foo is unexpected", 3600) == 3600
+    assert reprobe_interval("BGP is not configured", 3600) == 60
+    assert reprobe_interval("BGP is not configured", 10) == 10
+
+
+def test_state_roundtrip(probes):
+    probes.set_info("fw", "PA-VM", "11.0.0")
+    probes.mark_unsupported("fw", "routing_bgp_collector", "<bgp/>", "is unexpected", 3600)
+    restored = Capabilities()
+    restored.import_state(probes.export_state())
+    assert restored.info("fw") == ("PA-VM", "11.0.0")
+    assert restored.unsupported("fw") == [("routing_bgp_collector", "<bgp/>", "is unexpected")]
+
+
+@pytest.mark.parametrize(
+    "collector, cmd",
+    [
+        (
+            "interface_counter_collector",
+            "<show><counter><interface>all</interface></counter></show>",
+        ),
+        (
+            "session_table_collector",
+            "<show><session><all><start-at>1</start-at></all></session></show>",
+        ),
+    ],
+)
+def test_cached_unsupported_command_is_skipped(calls, probes, collector, cmd):
+    probes.mark_unsupported("fw", collector, cmd, "is unexpected", 3600)
+    output = Exporter(_config([collector])).collect_metrics("fw")
+    assert calls == []
+    assert 'panos_up{device="fw"} 1' in output
+    assert "panos_error" not in output
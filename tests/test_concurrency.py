@@ -0,0 +1,35 @@
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.collectors import context
+from app.collectors.context import ScrapeContext
+from app.exporter import Exporter
+
+
+def test_parallel_scrapes_keep_device_state_apart(fake_sessions):
+    devices = {
+        f"10.0.0.{i}": {"username": "u", "password": "p", "virtual_router": f"vr{i}"}
+        for i in range(40)
+    }
+    exporter = Exporter({"devices": devices, "collectors": ["routing_route_collector"]})
+    targets = list(devices) * 10
+    random.shuffle(targets)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda t: (t, exporter.collect_metrics(t)), targets))
+
+    for target, output in results:
+        vr = devices[target]["virtual_router"]
+        assert 'panos_up{device="' + target + '"} 1' in output
+        assert set(re.findall(r'virtual_router="([^"]+)"', output)) == {vr}
+        assert f'destination="{target}/32"' in output
+
+
+def test_deadline_bounds_timeout():
+    ctx = ScrapeContext(device_config={"host": "fw"}, session=None)
+    assert ctx.timeout() == context.DEFAULT_TIMEOUT
+    expired = ScrapeContext(device_config={"host": "fw"}, session=None, deadline=0.0)
+    with pytest.raises(TimeoutError):
+        expired.timeout()
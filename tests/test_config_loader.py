@@ -47,3 +47,56 @@ def test_invalid_collector():
     loader = ConfigLoader(path)
     with pytest.raises(ValueError):
         loader.load()
+
+
+def test_global_counters_settings():
+    data = {
+        "devices": {
+            "192.168.1.1": {
+                "username": "u",
+                "password": "p",
+                "global_counters": {"severity": "drop", "include": ["^flow_"]},
+            }
+        }
+    }
+    ConfigLoader(write_temp_yaml(data)).load()
+
+
+def test_invalid_global_counters_pattern():
+    data = {
+        "devices": {
+            "192.168.1.1": {
+                "username": "u",
+                "password": "p",
+                "global_counters": {"exclude": ["("]},
+            }
+        }
+    }
+    with pytest.raises(ValueError):
+        ConfigLoader(write_temp_yaml(data)).load()
+
+
+@pytest.mark.parametrize(
+    "settings, valid",
+    [
+        ({"max_response_bytes": 1048576, "scrape_memory_budget": 4194304}, True),
+        ({"max_response_bytes": {"routing_bgp_collector": 10, "default": 5}}, True),
+        ({"max_response_bytes": {"default": 0}}, False),
+        ({"scrape_memory_budget": "1GB"}, False),
+    ],
+)
+def test_response_limits(settings, valid):
+    data = {"devices": {"192.168.1.1": {"username": "u", "password": "p", **settings}}}
+    if valid:
+        ConfigLoader(write_temp_yaml(data)).load()
+    else:
+        with pytest.raises(ValueError):
+            ConfigLoader(write_temp_yaml(data)).load()
+
+
+def test_device_priority():
+    data = {"devices": {"192.168.1.1": {"username": "u", "password": "p", "priority": "urgent"}}}
+    with pytest.raises(ValueError):
+        ConfigLoader(write_temp_yaml(data)).load()
+    data["devices"]["192.168.1.1"]["priority"] = "critical"
+    ConfigLoader(write_temp_yaml(data)).load()
@@ -0,0 +1,65 @@
+from app.collectors.data_processor_resource_utilization_collector import (
+    DataProcessorResourceUtilizationCollector,
+    window_stats,
+)
+
+WINDOW_XML = """
+<response status="success">
+<result>
+<resource-monitor>
+<data-processors>
+<dp0>
+<second>
+<task><flow_lookup>3%</flow_lookup></task>
+<cpu-load-average>
+<entry><coreid>0</coreid><value>5,1,2,90,2,1,1,3,1,4</value></entry>
+<entry><coreid>1</coreid><value>7,7,7,7,7,7,7,7,7,7</value></entry>
+</cpu-load-average>
+<resource-utilization>
+<entry><name>session</name><value>10,20</value></entry>
+</resource-utilization>
+</second>
+</dp0>
+</data-processors>
+</resource-monitor>
+</result>
+</response>
+"""
+
+
+def test_window_command():
+    cmd = DataProcessorResourceUtilizationCollector.build_command("minute", 15)
+    assert "<minute><last>15</last></minute>" in cmd
+
+
+def test_window_stats():
+    (stats,) = window_stats([[5, 1, 2, 90, 2, 1, 1, 3, 1, 4]])
+    assert stats["max"] == 90
+    assert stats["mean"] == 11
+    assert stats["p95"] == 90
+    assert stats["p99"] == 90
+
+
+def test_parse_window_summaries():
+    metrics = DataProcessorResourceUtilizationCollector().parse(WINDOW_XML, {"host": "fw"})
+    assert 'panos_data_processor_cpu_load_average{dp="dp0",coreid="0"} 5.0' in metrics
+    assert (
+        'panos_data_processor_cpu_load_average_window{dp="dp0",coreid="0",stat="max"} 90.0'
+        in metrics
+    )
+    assert (
+        'panos_data_processor_cpu_load_average_window{dp="dp0",coreid="1",stat="mean"} 7.0'
+        in metrics
+    )
+    assert (
+        'panos_data_processor_resource_utilization_window{dp="dp0",resource="session",stat="p99"}'
+        in metrics
+    )
+    assert "panos_data_processor_task_flow_lookup" in metrics
+
+
+def test_parse_minute_window():
+    xml = WINDOW_XML.replace("second>", "minute>")
+    device = {"host": "fw", "resource_monitor": {"interval": "minute", "last": 10}}
+    metrics = DataProcessorResourceUtilizationCollector().parse(xml, device)
+    assert "panos_data_processor_cpu_load_average_window" in metrics
@@ -0,0 +1,72 @@
+import xml.etree.ElementTree as ET
+
+from app.collectors.field_schema import Field, Schema, metric_fields, stripped, to_int, yes_no
+from app.collectors.system_info_collector import SystemInfoCollector
+
+ENTRY_XML = """
+<entry>
+<remote-as>2764</remote-as>
+<holdtime>not-a-number</holdtime>
+<passive>no</passive>
+<peer-address>10.0.0.1:179</peer-address>
+<status>Established</status>
+<status>ignored-duplicate</status>
+<attr><med>5</med></attr>
+</entry>
+"""
+
+SCHEMA = Schema(
+    [
+        Field("status", "label", default="unknown"),
+        Field("peer-group", "label", default="unknown"),
+        Field("attr", "element"),
+    ]
+    + metric_fields(["remote-as", "holdtime"], "int", "panos_test", "Test")
+    + metric_fields(["passive"], "yes_no", "panos_test", "Test")
+    + metric_fields(["peer-address"], "info", "panos_test", "Test")
+)
+
+
+def test_converters():
+    assert to_int(" 42 ") == 42
+    assert to_int("") is None
+    assert to_int("x") is None
+    assert yes_no("yes") == 1
+    assert yes_no("no") == 0
+    assert yes_no("maybe") is None
+
+
+def test_extract_single_pass():
+    values = SCHEMA.extract(ET.fromstring(ENTRY_XML))
+    assert values["remote-as"] == 2764
+    assert values["holdtime"] is None
+    assert values["passive"] == 0
+    assert values["status"] == "Established"
+    assert values["peer-group"] == "unknown"
+    assert values["attr"].findtext("med") == "5"
+
+
+def test_render_declared_metrics():
+    values = SCHEMA.extract(ET.fromstring(ENTRY_XML))
+    render = SystemInfoCollector().prometheus_metric
+    metrics = "".join(SCHEMA.render(values, render, "fw", {"vr": "a"}))
+    assert 'panos_test_remote_as{vr="a"} 2764' in metrics
+    assert "panos_test_holdtime" not in metrics
+    assert 'panos_test_passive{vr="a"} 0' in metrics
+    assert 'panos_test_peer_address_info{vr="a",value="10.0.0.1:179"} 1' in metrics
+
+
+def test_label_matches_findtext():
+    schema = Schema(
+        [
+            Field("as-path", "label", default="unknown"),
+            Field("flag", "label", default="", convert=stripped),
+            Field("prefix", "label", default="unknown"),
+        ]
+    )
+    entry = ET.fromstring("<member><as-path/><flag> * </flag></member>")
+    values = schema.extract(entry)
+    for field in schema.fields:
+        if field.convert is not stripped:
+            assert values[field.tag] == entry.findtext(field.tag, default=field.default)
+    assert values == {"as-path": "", "flag": "*", "prefix": "unknown"}
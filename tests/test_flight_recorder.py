@@ -0,0 +1,81 @@
+from app.collectors import context
+from app.collectors.context import SessionPool
+from app.collectors.tracing import tracing
+from app.exporter import Exporter
+from app.flight_recorder import FlightRecorder
+from app.snapshot_store import SnapshotStore
+
+from conftest import ROUTE_CONFIG, FakeSession
+
+
+class FailingSession(FakeSession):
+    def get(self, url, params=None, **kwargs):
+        if "<virtual-router>vr2<" in params["cmd"]:
+            raise ConnectionError("connection reset")
+        return super().get(url, params, **kwargs)
+
+
+def test_records_last_scrapes(monkeypatch, fake_sessions):
+    recorder = FlightRecorder(3)
+    monkeypatch.setattr("app.exporter.flight_recorder", recorder)
+    exporter = Exporter(ROUTE_CONFIG)
+    for _ in range(5):
+        exporter.collect_metrics("10.0.0.1")
+    scrapes = recorder.scrapes("10.0.0.1")
+    assert len(scrapes) == 3
+    assert scrapes[0]["started_at"] >= scrapes[-1]["started_at"]
+    assert scrapes[0]["up"] == 1
+    routes = scrapes[0]["collectors"]["routing_route_collector"]
+    assert routes["status"] == "ok"
+    assert routes["requests"] == 2
+    assert routes["response_bytes"] > 0
+    assert routes["series"] > 0
+    assert routes["fetch_seconds"] > 0
+    assert "render_seconds" in routes
+    assert routes["error"] is None
+    assert recorder.scrapes("unknown") == []
+
+
+def test_records_errors(monkeypatch):
+    recorder = FlightRecorder(3)
+    monkeypatch.setattr("app.exporter.flight_recorder", recorder)
+    monkeypatch.setattr(context, "session_pool", SessionPool(factory=FailingSession))
+    Exporter(ROUTE_CONFIG).collect_metrics("10.0.0.1")
+    routes = recorder.scrapes("10.0.0.1")[0]["collectors"]["routing_route_collector"]
+    assert routes["requests"] == 1
+    assert routes["errors"] == 1
+    assert "connection reset" in routes["error"]
+
+
+def test_outer_trace_still_sees_collectors(monkeypatch, fake_sessions):
+    monkeypatch.setattr("app.exporter.flight_recorder", FlightRecorder(3))
+    with tracing() as trace:
+        Exporter(ROUTE_CONFIG).collect_metrics("10.0.0.1")
+    assert trace.counts()["routing_route_collector"]["requests"] == 2
+    assert trace.breakdown()["routing_route_collector"]["total"] > 0
+
+
+def test_disabled(monkeypatch, fake_sessions):
+    recorder = FlightRecorder(0)
+    monkeypatch.setattr("app.exporter.flight_recorder", recorder)
+    Exporter(ROUTE_CONFIG).collect_metrics("10.0.0.1")
+    assert recorder.scrapes("10.0.0.1") == []
+
+
+def test_snapshot_store_publishes_scrapes(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    assert store.read_scrapes("fw/1") is None
+    store.write_scrapes("fw/1", [{"up": 1}])
+    assert store.read_scrapes("fw/1") == [{"up": 1}]
+
+
+def test_parse_and_render_are_timed_apart(monkeypatch, fake_sessions):
+    recorder = FlightRecorder(3)
+    monkeypatch.setattr("app.exporter.flight_recorder", recorder)
+    # One virtual router: parallel fetches would overlap the collector's total
+    config = {**ROUTE_CONFIG, "devices": {"10.0.0.1": {"username": "u", "password": "p"}}}
+    Exporter(config).collect_metrics("10.0.0.1")
+    routes = recorder.scrapes("10.0.0.1")[0]["collectors"]["routing_route_collector"]
+    assert routes["parse_seconds"] > 0
+    assert routes["render_seconds"] > 0
+    assert routes["total_seconds"] >= routes["parse_seconds"] + routes["render_seconds"]
@@ -0,0 +1,95 @@
+import threading
+
+from app.collectors import context
+from app.collectors.context import SessionPool
+from app.collectors.global_counter_collector import GlobalCounterCollector
+
+from conftest import COUNTER_XML, FakeResponse
+
+
+class CounterSession:
+    commands = []
+    lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self.lock:
+            self.commands.append(params["cmd"])
+        return FakeResponse(COUNTER_XML)
+
+    def close(self):
+        pass
+
+
+def test_default_command():
+    collector = GlobalCounterCollector()
+    assert collector.api_commands({}) == ["<show><counter><global></global></counter></show>"]
+
+
+def test_server_side_filter_command():
+    cmds = GlobalCounterCollector().api_commands({"severity": "drop", "aspect": "parse"})
+    assert cmds == [
+        "<show><counter><global><filter><severity>drop</severity>"
+        "<aspect>parse</aspect></filter></global></counter></show>"
+    ]
+
+
+def test_named_counter_commands():
+    cmds = GlobalCounterCollector().api_commands({"names": ["pkt_recv", "ctd_drop"]})
+    assert len(cmds) == 2
+    assert "<name>pkt_recv</name>" in cmds[0]
+
+
+def test_parse_unfiltered():
+    metrics = GlobalCounterCollector().parse(COUNTER_XML, {"host": "fw"})
+    assert "panos_global_counter_flow_parse_drop{" in metrics
+    assert "panos_global_counter_pkt_recv_rate{" in metrics
+    assert "panos_global_counter_ctd_drop{" in metrics
+
+
+def test_parse_exporter_side_filters():
+    device = {
+        "host": "fw",
+        "global_counters": {"severity": "drop", "exclude": ["^ctd_"]},
+    }
+    metrics = GlobalCounterCollector().parse(COUNTER_XML, device)
+    assert "panos_global_counter_flow_parse_drop{" in metrics
+    assert "pkt_recv" not in metrics
+    assert "ctd_drop" not in metrics
+
+
+def test_parse_include_list():
+    device = {"host": "fw", "global_counters": {"include": ["^pkt_"]}}
+    metrics = GlobalCounterCollector().parse(COUNTER_XML, device)
+    assert "panos_global_counter_pkt_recv{" in metrics
+    assert "flow_parse_drop" not in metrics
+
+
+def test_filter_values_are_escaped():
+    cmds = GlobalCounterCollector().api_commands({"names": ["a<b>&c"]})
+    assert "<name>a&lt;b&gt;&amp;c</name>" in cmds[0]
+
+
+def test_filter_compiled_once_per_settings():
+    collector = GlobalCounterCollector()
+    settings = {"include": ["^pkt_"], "exclude": ["_drop$"]}
+    first = collector._counter_filter(settings)
+    assert collector._counter_filter(dict(settings)) is first
+    assert collector._counter_filter({"include": ["^ctd_"]}) is not first
+    assert first("pkt_recv", "info", "packet", "pktproc")
+    assert not first("pkt_drop", "info", "packet", "pktproc")
+
+
+def test_named_counters_fetched_concurrently(monkeypatch):
+    monkeypatch.setattr(context, "session_pool", SessionPool(factory=CounterSession))
+    monkeypatch.setattr(CounterSession, "commands", [])
+    device = {
+        "host": "fw",
+        "username": "u",
+        "password": "p",
+        "global_counters": {"names": ["pkt_recv", "ctd_drop"]},
+    }
+    metrics = GlobalCounterCollector().collect(device)
+    assert len(CounterSession.commands) == 2
+    assert "panos_global_counter_pkt_recv{" in metrics
+    assert "panos_global_counter_ctd_drop{" in metrics
+    assert "flow_parse_drop" not in metrics
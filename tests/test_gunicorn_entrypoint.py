@@ -0,0 +1,20 @@
+import sys
+
+from app.gunicorn_entrypoint import supervise_poller
+
+
+def test_poller_restarted_with_backoff(monkeypatch, tmp_path, capsys):
+    starts = tmp_path / "starts"
+    starts.write_text("")
+    monkeypatch.setattr("app.gunicorn_entrypoint.POLLER_MIN_BACKOFF", 0.01)
+    monkeypatch.setattr("app.gunicorn_entrypoint.POLLER_MAX_BACKOFF", 0.02)
+    # gunicorn goes away once the poller has been started three times
+    monkeypatch.setattr(
+        "app.gunicorn_entrypoint._parent_alive", lambda pid: len(starts.read_text()) < 3
+    )
+    argv = [sys.executable, "-c", f"open({str(starts)!r}, 'a').write('x')"]
+    supervise_poller(1, argv, {})
+    assert starts.read_text() == "xxx"
+    err = capsys.readouterr().err
+    assert "restarting in 0.01s" in err
+    assert "restarting in 0.02s" in err
@@ -0,0 +1,114 @@
+import pytest
+from app.collectors import context
+from app.collectors.context import SessionPool
+from app.collectors.interface_collector import InterfaceCollector
+from app.collectors.interface_counter_collector import InterfaceCounterCollector
+from app.collectors.interface_inventory import INVENTORY_COMMAND, inventory_cache
+
+from conftest import FakeResponse
+
+INVENTORY_XML = """
+<response status="success"><result>
+<ifnet>
+<entry><name>ethernet1/1</name><zone>trust</zone><vsys>1</vsys><ip>10.0.0.1/24</ip></entry>
+</ifnet>
+<hw>
+<entry><name>ethernet1/1</name><mac>aa:bb</mac><speed>1000</speed><duplex>full</duplex>
+<state>up</state><type>0</type></entry>
+<entry><name>ethernet1/2</name><mac>aa:cc</mac><speed>ukn</speed><duplex>half</duplex>
+<state>down</state><type>0</type></entry>
+</hw>
+</result></response>
+"""
+
+COUNTER_XML = """
+<response status="success"><result>
+<hw>{hw}</hw>
+<ifnet><ifnet>
+<entry><name>ethernet1/1</name><ibytes>100</ibytes><obytes>200</obytes></entry>
+</ifnet></ifnet>
+</result></response>
+"""
+
+HW_ENTRY = "<entry><name>{name}</name><port><rx-bytes>5</rx-bytes></port></entry>"
+
+
+class FakeFirewall:
+    def __init__(self):
+        self.commands = []
+        self.hw = ["ethernet1/1", "ethernet1/2"]
+        self.inventory_error = None
+
+    def get(self, url, params=None, **kwargs):
+        self.commands.append(params["cmd"])
+        if params["cmd"] == INVENTORY_COMMAND:
+            if self.inventory_error:
+                raise self.inventory_error
+            return FakeResponse(INVENTORY_XML)
+        hw = "".join(HW_ENTRY.format(name=name) for name in self.hw)
+        return FakeResponse(COUNTER_XML.format(hw=hw))
+
+    def close(self):
+        pass
+
+
+DEVICE = {"host": "fw", "username": "u", "password": "p"}
+
+
+@pytest.fixture
+def firewall(monkeypatch):
+    fw = FakeFirewall()
+    monkeypatch.setattr(context, "session_pool", SessionPool(factory=lambda: fw))
+    inventory_cache.clear()
+    yield fw
+    inventory_cache.clear()
+
+
+def test_state_fresh_metadata_cached(firewall):
+    interfaces = InterfaceCollector()
+    counters = InterfaceCounterCollector()
+    for _ in range(3):
+        state = interfaces.collect(DEVICE)
+        counters.collect(DEVICE)
+    # interface_collector fetches every scrape and feeds the counters' metadata
+    assert firewall.commands.count(INVENTORY_COMMAND) == 3
+    assert 'panos_interface_state{interface="ethernet1/2",mac="aa:cc",type="ethernet"} 0' in state
+
+
+def test_counters_keep_labels_and_add_info(firewall):
+    output = InterfaceCounterCollector().collect(DEVICE)
+    assert 'panos_interface_counter_ibytes{interface="ethernet1/1"} 100' in output
+    assert 'panos_interface_counter_rx_bytes{interface="ethernet1/2"} 5' in output
+    assert (
+        'panos_interface_info{interface="ethernet1/1",type="ethernet",zone="trust",vsys="1"} 1'
+        in output
+    )
+    assert 'panos_interface_info{interface="ethernet1/2",type="ethernet",zone="",vsys=""} 1' in (
+        output
+    )
+    assert "panos_interface_inventory_age_seconds" in output
+
+
+def test_interface_count_change_refreshes_inventory(firewall):
+    counters = InterfaceCounterCollector()
+    counters.collect(DEVICE)
+    counters.collect(DEVICE)
+    assert firewall.commands.count(INVENTORY_COMMAND) == 1
+    firewall.hw.append("ethernet1/3")
+    counters.collect(DEVICE)
+    assert firewall.commands.count(INVENTORY_COMMAND) == 2
+
+
+def test_zero_ttl_fetches_every_scrape(firewall):
+    device = dict(DEVICE, interface_inventory_ttl=0)
+    counters = InterfaceCounterCollector()
+    counters.collect(device)
+    counters.collect(device)
+    assert firewall.commands.count(INVENTORY_COMMAND) == 2
+
+
+def test_inventory_failure_is_reported(firewall):
+    firewall.inventory_error = ConnectionError("inventory timed out")
+    output = InterfaceCounterCollector().collect(DEVICE)
+    assert 'panos_error{error="interface_inventory: inventory timed out"} 1' in output
+    assert 'panos_interface_counter_ibytes{interface="ethernet1/1"} 100' in output
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+from app.collectors.context import ScrapeContext
+from app.collectors.limiter import DeviceLimiter, FairSemaphore
+from app.exporter import Exporter
+
+
+def test_fair_semaphore_grants_in_arrival_order():
+    semaphore = FairSemaphore(1)
+    assert semaphore.acquire()
+    order = []
+
+    def waiter(i):
+        semaphore.acquire()
+        order.append(i)
+        semaphore.release()
+
+    threads = []
+    for i in range(5):
+        t = threading.Thread(target=waiter, args=(i,))
+        t.start()
+        threads.append(t)
+        # Let each thread queue before starting the next
+        while len(semaphore._waiters) <= i:
+            time.sleep(0.001)
+    semaphore.release()
+    for t in threads:
+        t.join()
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_acquire_times_out():
+    semaphore = FairSemaphore(1)
+    semaphore.acquire()
+    assert not semaphore.acquire(timeout=0.01)
+    assert not semaphore._waiters
+    semaphore.release()
+    assert semaphore.acquire(timeout=0)
+
+
+def test_limit_shared_across_callers_and_wait_recorded():
+    limiter = DeviceLimiter()
+    ctx = ScrapeContext({"host": "fw", "max_concurrent_requests": 2}, session=None)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        with limiter.slot(ctx):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.005)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) == 2
+    wait_sum, count = limiter.queue_wait("fw")
+    assert count == 8
+    assert wait_sum > 0
+
+
+def test_deadline_while_queued_raises():
+    limiter = DeviceLimiter()
+    ctx = ScrapeContext({"host": "fw", "max_concurrent_requests": 1}, session=None)
+    expiring = ScrapeContext(ctx.device_config, session=None, deadline=time.monotonic() + 0.01)
+    with limiter.slot(ctx):
+        with pytest.raises(TimeoutError):
+            with limiter.slot(expiring):
+                pass
+
+
+def test_model_limits():
+    limiter = DeviceLimiter()
+    device_config = {"host": "fw", "model_limits": {"PA-440": 1}}
+    assert limiter.limit_for(device_config) == 2
+    limiter.set_model("fw", "PA-440")
+    assert limiter.limit_for(device_config) == 1
+    assert limiter.limit_for({**device_config, "max_concurrent_requests": 4}) == 4
+    assert limiter.limit_for({"host": "fw"}) == 2
+
+
+def test_exporters_keep_their_own_model_limits():
+    devices = {"fw": {"model": "PA-440"}}
+    limited = Exporter({"devices": devices, "model_limits": {"PA-440": 1}})
+    default = Exporter({"devices": devices})
+    limiter = DeviceLimiter()
+    assert limiter.limit_for(limited.device_config("fw")) == 1
+    assert limiter.limit_for(default.device_config("fw")) == 2
@@ -0,0 +1,128 @@
+import time
+
+import pytest
+from app.collectors import context, xml_backend
+from app.collectors.context import SessionPool
+from app.collectors.limits import (
+    MemoryBudgetExceeded,
+    ResponseTooLarge,
+    ScrapeBudget,
+    UnsafeXML,
+    check_prolog,
+    read_body,
+    response_limit,
+)
+from app.exporter import Exporter
+
+from conftest import SYSTEM_INFO_XML
+
+BILLION_LAUGHS = """<?xml version="1.0"?>
+<!DOCTYPE lolz [<!ENTITY lol "lol"><!ENTITY lol2 "&lol;&lol;&lol;&lol;&lol;">]>
+<response status="success"><result>&lol2;</result></response>"""
+
+
+class StreamingResponse:
+    def __init__(self, text, content_length=True):
+        self.body = text.encode()
+        self.headers = {"Content-Length": str(len(self.body))} if content_length else {}
+        self.encoding = "utf-8"
+        self.chunks_read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            self.chunks_read += 1
+            yield self.body[i : i + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class StreamingSession:
+    body = SYSTEM_INFO_XML
+
+    def get(self, url, params=None, stream=False, **kwargs):
+        assert stream
+        return StreamingResponse(self.body)
+
+    def close(self):
+        pass
+
+
+def test_read_body_stops_at_cap():
+    response = StreamingResponse("x" * 300_000, content_length=False)
+    with pytest.raises(ResponseTooLarge):
+        read_body(response, 100_000, ScrapeBudget())
+    assert response.closed
+    assert response.chunks_read == 2
+
+    declared = StreamingResponse("x" * 300_000)
+    with pytest.raises(ResponseTooLarge):
+        read_body(declared, 100_000, ScrapeBudget())
+    assert declared.chunks_read == 0
+
+
+def test_budget_is_shared():
+    budget = ScrapeBudget(1000)
+    assert read_body(StreamingResponse("a" * 600), 10_000, budget) == ("a" * 600, 600)
+    with pytest.raises(MemoryBudgetExceeded):
+        read_body(StreamingResponse("b" * 600), 10_000, budget)
+
+
+def test_response_limit_settings():
+    assert response_limit("x", {"max_response_bytes": 10}) == 10
+    setting = {"max_response_bytes": {"routing_bgp_collector": 5, "default": 7}}
+    assert response_limit("routing_bgp_collector", setting) == 5
+    assert response_limit("interface_collector", setting) == 7
+
+
+@pytest.mark.parametrize("backend", ["stdlib", "lxml"])
+def test_doctype_rejected(backend):
+    name = xml_backend.backend_name()
+    try:
+        xml_backend.set_backend(backend)
+        with pytest.raises(UnsafeXML):
+            xml_backend.fromstring(BILLION_LAUGHS)
+        with pytest.raises(UnsafeXML):
+            list(xml_backend.iterparse(BILLION_LAUGHS.encode(), "result"))
+        assert xml_backend.fromstring(SYSTEM_INFO_XML).tag == "response"
+    finally:
+        xml_backend.set_backend(name)
+    check_prolog('<?xml version="1.0"?><!-- <!DOCTYPE x> --><response/>')
+
+
+def test_limit_exceeded_metric(monkeypatch):
+    monkeypatch.setattr(context, "session_pool", SessionPool(factory=StreamingSession))
+    config = {
+        "devices": {"fw1": {"username": "u", "password": "p", "max_response_bytes": 100}},
+        "collectors": ["system_info_collector"],
+    }
+    output = Exporter(config).collect_metrics("fw1")
+    assert 'panos_up{device="fw1"} 0' in output
+    assert (
+        'panos_exporter_limit_exceeded{collector="system_info_collector",'
+        'limit="response_bytes"} 1' in output
+    )
+
+    config["devices"]["fw1"] = {"username": "u", "password": "p"}
+    output = Exporter(config).collect_metrics("fw1")
+    assert 'panos_up{device="fw1"} 1' in output
+    assert "panos_exporter_limit_exceeded" not in output
+
+
+def test_request_deadline_caps_scrape_timeout(monkeypatch):
+    monkeypatch.setattr(context, "session_pool", SessionPool(factory=StreamingSession))
+    config = {
+        "devices": {"fw1": {"username": "u", "password": "p", "scrape_timeout": 30}},
+        "collectors": ["system_info_collector"],
+    }
+    exporter = Exporter(config)
+    # The request's budget was spent queueing for admission
+    output = exporter.collect_metrics("fw1", deadline=time.monotonic() - 1)
+    assert 'panos_up{device="fw1"} 0' in output
+    assert "scrape deadline exceeded" in output
+    output = exporter.collect_metrics("fw1", deadline=time.monotonic() + 30)
+    assert 'panos_up{device="fw1"} 1' in output
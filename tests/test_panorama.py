@@ -0,0 +1,133 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.collectors import context
+from app.collectors.context import SessionPool
+from app.exporter import Exporter
+from app.panorama import DISCOVERY_COMMAND
+
+from conftest import SYSTEM_INFO_XML, FakeResponse
+
+CONNECTED_XML = """
+<response status="success">
+<result>
+<devices>
+<entry name="0001"><serial>0001</serial><connected>yes</connected>
+<hostname>fw-a</hostname><ip-address>10.0.0.1</ip-address><model>PA-220</model></entry>
+<entry name="0002"><serial>0002</serial><connected>yes</connected>
+<hostname>fw-b</hostname><ip-address>10.0.0.2</ip-address><model>PA-440</model></entry>
+<entry name="0003"><serial>0003</serial><connected>no</connected>
+<hostname>fw-c</hostname></entry>
+</devices>
+</result>
+</response>
+"""
+
+CONFIG = {
+    "devices": {},
+    "collectors": ["system_info_collector"],
+    "panoramas": {
+        "pano": {"host": "panorama.example", "username": "u", "password": "p", "pool_size": 2},
+    },
+}
+
+
+class MockPanorama:
+    """
+    Stands in for Panorama's XML API: answers device discovery and serves
+    system info for whichever firewall the request targets.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.sessions = 0
+        self.lock = threading.Lock()
+
+    def session(self):
+        with self.lock:
+            self.sessions += 1
+        return self
+
+    def get(self, url, params=None, **kwargs):
+        with self.lock:
+            self.calls.append((url, params.get("target"), params["cmd"]))
+        if params["cmd"] == DISCOVERY_COMMAND:
+            return FakeResponse(CONNECTED_XML)
+        return FakeResponse(SYSTEM_INFO_XML.replace("1234567890", params["target"]))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def panorama(monkeypatch):
+    mock = MockPanorama()
+    monkeypatch.setattr(context, "session_pool", SessionPool(factory=mock.session))
+    return mock
+
+
+def test_discovers_connected_devices_once(panorama):
+    exporter = Exporter(CONFIG)
+    assert exporter.targets() == ["0001", "0002"]
+    exporter.targets()
+    discoveries = [c for c in panorama.calls if c[2] == DISCOVERY_COMMAND]
+    assert len(discoveries) == 1
+
+
+def test_routes_commands_by_serial(panorama):
+    exporter = Exporter(CONFIG)
+    output = exporter.collect_metrics("0002")
+    assert 'panos_up{device="0002"} 1' in output
+    assert 'serial="0002"' in output
+    url, target, _ = panorama.calls[-1]
+    assert url == "https://panorama.example/api/"
+    assert target == "0002"
+
+
+def test_unknown_serial_rejected(panorama):
+    exporter = Exporter(CONFIG)
+    with pytest.raises(ValueError):
+        exporter.device_config("0003")
+
+
+def test_sessions_bounded_by_pool_size(panorama):
+    exporter = Exporter(CONFIG)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outputs = list(pool.map(exporter.collect_metrics, ["0001", "0002"] * 20))
+    assert not any("panos_error" in out for out in outputs)
+    assert panorama.sessions <= 2
+
+
+def test_discovery_does_not_block_lookups(panorama, monkeypatch):
+    exporter = Exporter(CONFIG)
+    connector = exporter.panoramas.connectors[0]
+    connector.devices()
+    started = threading.Event()
+    release = threading.Event()
+    discover = connector._discover
+
+    def slow_discover():
+        started.set()
+        release.wait(5)
+        return discover()
+
+    monkeypatch.setattr(connector, "_discover", slow_discover)
+    connector._expires = 0.0
+    refresh = threading.Thread(target=connector.devices)
+    refresh.start()
+    assert started.wait(5)
+    # The stale list is served while the refresh is in flight, without a second discovery
+    assert list(connector.devices()) == ["0001", "0002"]
+    release.set()
+    refresh.join(5)
+    discoveries = [c for c in panorama.calls if c[2] == DISCOVERY_COMMAND]
+    assert len(discoveries) == 2
+
+
+def test_discovery_response_is_capped(panorama):
+    config = {
+        **CONFIG,
+        "panoramas": {"pano": {**CONFIG["panoramas"]["pano"], "max_response_bytes": 100}},
+    }
+    assert Exporter(config).targets() == []
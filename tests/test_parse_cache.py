@@ -0,0 +1,70 @@
+from app.collectors.bgp_rib import split_members
+from app.collectors.parse_cache import ParseCache
+from app.collectors.routing_bgp_collector import RoutingBgpCollector
+from app.exporter import Exporter
+
+from conftest import ROUTE_CONFIG, loc_rib
+
+DEVICE = {"host": "fw"}
+
+
+def test_unchanged_response_is_not_parsed_again():
+    cache = ParseCache()
+    calls = []
+
+    def parse(output):
+        calls.append(output)
+        return output
+
+    assert cache.output("cmd", "<a/>", lambda: parse("x 1\n")) == "x 1\n"
+    assert cache.output("cmd", "<a/>", lambda: parse("x 2\n")) == "x 1\n"
+    assert cache.output("cmd", "<b/>", lambda: parse("x 3\n")) == "x 3\n"
+    assert calls == ["x 1\n", "x 3\n"]
+    assert cache.stats()[("response", "hits")] == 1
+    assert cache.stats()[("response", "misses")] == 2
+
+    error = "# HELP panos_error Error metric\n# TYPE panos_error gauge\n"
+    cache.output("cmd", "<c/>", lambda: error)
+    cache.output("cmd", "<c/>", lambda: error)
+    assert cache.stats()[("response", "misses")] == 4
+
+
+def test_incremental_rib_matches_full_parse():
+    cached = RoutingBgpCollector()
+    uncached = {**DEVICE, "parse_cache": False}
+    before = loc_rib(20)
+    after = before.replace("<med>7</med>", "<med>8</med>", 1)
+    assert after != before
+
+    assert cached._parse_loc_rib_detail(before, DEVICE) == (
+        RoutingBgpCollector()._parse_loc_rib_detail(before, uncached)
+    )
+    stats = cached.parse_cache("fw").stats()
+    assert stats[("chunk", "misses")] == 40
+    assert cached._parse_loc_rib_detail(after, DEVICE) == (
+        RoutingBgpCollector()._parse_loc_rib_detail(after, uncached)
+    )
+    stats = cached.parse_cache("fw").stats()
+    # Only the route whose MED changed was parsed again
+    assert stats[("chunk", "misses")] == 41
+    assert stats[("chunk", "hits")] == 39
+
+
+def test_split_members():
+    chunks = split_members(loc_rib(2), "loc-rib")
+    assert [vr for vr, _ in chunks] == ["default", "default", "dmz", "dmz"]
+    assert all(text.startswith("<member><prefix>") for _, text in chunks)
+    assert split_members(loc_rib(2), "rib-out") == []
+    nested = '<entry vr="a"><loc-rib><member><x><member>1</member></x></member></loc-rib></entry>'
+    assert split_members(nested, "loc-rib") is None
+
+
+def test_exporter_reports_hits(fake_sessions):
+    exporter = Exporter(ROUTE_CONFIG)
+    first = exporter.collect_metrics("10.0.0.1")
+    second = exporter.collect_metrics("10.0.0.1")
+    hits = 'panos_exporter_parse_cache_hits_total{collector="routing_route_collector"'
+    assert f'{hits},kind="response"}} 0' in first
+    assert f'{hits},kind="response"}} 2' in second
+    collectors = "# HELP panos_exporter_request_limit"
+    assert first.split(collectors)[0] == second.split(collectors)[0]
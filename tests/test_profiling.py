@@ -0,0 +1,35 @@
+import json
+
+from app.exporter import Exporter
+from app.profiling import _profile_child, profile_scrape
+
+
+def test_profile_reports_breakdown(fake_sessions):
+    exporter = Exporter(
+        {
+            "devices": {"10.0.0.1": {"username": "u", "password": "p", "virtual_router": "vr1"}},
+            "collectors": ["routing_route_collector"],
+        }
+    )
+    report = profile_scrape(exporter, "10.0.0.1", limit=5)
+    json.dumps(report)
+    phases = report["collectors"]["routing_route_collector"]
+    assert set(phases) == {"total", "fetch", "parse", "render"}
+    assert phases["fetch"] > 0 and phases["parse"] > 0 and phases["render"] > 0
+    assert phases["total"] >= phases["fetch"] + phases["parse"]
+    assert len(report["functions"]) == 5
+    assert report["allocations"]
+    assert report["output_bytes"] > 0
+
+
+def test_profile_child_uses_exported_state(fake_sessions):
+    config = {
+        "devices": {"10.0.0.1": {"username": "u", "password": "p", "virtual_router": "auto"}},
+        "collectors": ["routing_route_collector"],
+    }
+    # Discovered VRs come from the serving exporter's state, not a new discovery
+    state = {"collectors": {"routing_route_collector": {"10.0.0.1": [2e9, ["vr1"]]}}}
+    report = _profile_child(config, state, "10.0.0.1", 5)
+    counts = report["collectors"]["routing_route_collector"]
+    assert counts["fetch"] > 0
+    assert report["output_bytes"] > 0
@@ -0,0 +1,45 @@
+import yaml
+from app.cli import main
+from app.collectors import context, recording
+from app.collectors.context import SessionPool
+from app.collectors.recording import Recorder, ReplaySession
+from app.exporter import Exporter
+
+from conftest import ROUTE_CONFIG
+
+
+def test_record_then_replay(tmp_path, monkeypatch, fake_sessions):
+    monkeypatch.setattr(recording, "recorder", Recorder(str(tmp_path)))
+    live = Exporter(ROUTE_CONFIG).collect_metrics("10.0.0.1")
+    assert len(list((tmp_path / "10.0.0.1").glob("*.xml"))) == 2
+
+    monkeypatch.setattr(recording, "recorder", None)
+    monkeypatch.setattr(
+        context, "session_pool", SessionPool(factory=lambda: ReplaySession(str(tmp_path)))
+    )
+    replayed = Exporter(ROUTE_CONFIG).collect_metrics("10.0.0.1")
+    assert (
+        replayed.split("# HELP panos_exporter_request")[0]
+        == live.split("# HELP panos_exporter_request")[0]
+    )
+
+
+def test_missing_recording_is_http_error(tmp_path):
+    response = ReplaySession(str(tmp_path)).get(
+        "https://fw/api/", params={"type": "op", "cmd": "<show/>"}
+    )
+    assert response.status_code == 404
+
+
+def test_cli_scrape(tmp_path, monkeypatch, capsys, fake_sessions):
+    monkeypatch.setattr(recording, "recorder", Recorder(str(tmp_path)))
+    Exporter(ROUTE_CONFIG).collect_metrics("10.0.0.1")
+    monkeypatch.setattr(recording, "recorder", None)
+
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(ROUTE_CONFIG))
+    argv = ["scrape", "--replay", str(tmp_path), "--target", "10.0.0.1", "--repeat", "3"]
+    assert main(argv + ["--config", str(config_path)]) == 0
+    out = capsys.readouterr().out
+    assert "repeats: 3" in out
+    assert "routing_route_collector" in out
@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+from app.collectors.registry import CollectorRegistry, CollectorSpec, registry
+from app.exporter import Exporter
+
+
+def test_names_do_not_import_collectors():
+    sys.modules.pop("app.collectors.session_collector", None)
+    names = CollectorRegistry().names()
+    assert "session_collector" in names
+    assert "routing_bgp_collector" in names
+    assert "app.collectors.session_collector" not in sys.modules
+
+
+def test_create_imports_lazily():
+    collector = CollectorRegistry().create("session_collector")
+    assert collector.name == "session_collector"
+
+
+def test_metadata():
+    spec = registry.get("routing_route_collector")
+    assert spec.cost == "expensive"
+    assert spec.default_ttl > 0
+    assert len(registry.get("routing_bgp_collector").commands) == 5
+
+
+def test_commands_come_from_collectors():
+    assert registry.get("routing_route_collector").commands == (
+        "<show><routing><route><virtual-router>default</virtual-router></route></routing></show>",
+    )
+    assert registry.get("data_processor_resource_utilization_collector").commands == (
+        "<show><running><resource-monitor><second><last>60</last></second>"
+        "</resource-monitor></running></show>",
+    )
+    for name in registry.builtin_names():
+        assert all(registry.get(name).commands), name
+
+
+def test_unknown_collector():
+    with pytest.raises(ValueError):
+        registry.get("not_a_real_collector")
+
+
+def test_registered_plugin_is_known():
+    local = CollectorRegistry()
+    local.register(
+        CollectorSpec(
+            "site_collector",
+            "app.collectors.session_collector:SessionCollector",
+            cost="cheap",
+        )
+    )
+    assert "site_collector" in local.names()
+    assert "site_collector" not in local.builtin_names()
+    assert local.create("site_collector").name == "session_collector"
+
+
+def test_exporter_builds_only_enabled_collectors():
+    exporter = Exporter({"devices": {}, "collectors": ["system_info_collector"]})
+    assert [c.name for c in exporter.collectors] == ["system_info_collector"]
@@ -0,0 +1,181 @@
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from app.poller import Poller
+from app.remote_write import RemoteWriter, encode_write_request, parse_samples
+from app.snappy_codec import decompress
+
+from conftest import FakeExporter
+
+
+def _varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _fields(data):
+    pos = 0
+    while pos < len(data):
+        key, pos = _varint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _varint(data, pos)
+        elif wire_type == 1:
+            value = struct.unpack("<d", data[pos : pos + 8])[0]
+            pos += 8
+        else:
+            length, pos = _varint(data, pos)
+            value = data[pos : pos + length]
+            pos += length
+        yield number, value
+
+
+def decode_write_request(body):
+    """
+    Decode a WriteRequest into [(labels dict, [(value, timestamp)])].
+    """
+    series = []
+    for _, ts in _fields(body):
+        labels, samples = {}, []
+        for number, value in _fields(ts):
+            if number == 1:
+                label = dict(_fields(value))
+                labels[label[1].decode()] = label[2].decode()
+            else:
+                sample = dict(_fields(value))
+                samples.append((sample[1], sample[2]))
+        series.append((labels, samples))
+    return series
+
+
+class Receiver:
+    """
+    Stand-in remote-write endpoint answering with the queued status codes, then 204.
+    """
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                status = receiver.statuses.pop(0) if receiver.statuses else 204
+                if status < 300:
+                    receiver.requests.append(
+                        (dict(self.headers), decode_write_request(decompress(body)))
+                    )
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v1/write"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def samples(self):
+        return [s for _, series in self.requests for s in series]
+
+
+@pytest.fixture
+def receiver():
+    instances = []
+
+    def make(statuses=()):
+        instances.append(Receiver(statuses))
+        return instances[-1]
+
+    yield make
+    for r in instances:
+        r.server.shutdown()
+        r.server.server_close()
+
+
+OUTPUT = (
+    "# HELP panos_up Device scrape status\n"
+    "# TYPE panos_up gauge\n"
+    'panos_up{device="fw1"} 1\n'
+    'panos_error{error="say \\"hi\\""} 1\n'
+    "panos_system_uptime_seconds 73971\n"
+)
+
+
+def test_parse_samples():
+    samples = parse_samples(OUTPUT, {"instance": "fw1"})
+    assert samples[0] == (
+        (("__name__", "panos_up"), ("device", "fw1"), ("instance", "fw1")),
+        1.0,
+    )
+    assert dict(samples[1][0])["error"] == 'say "hi"'
+    assert len(samples) == 3
+
+
+def test_pushes_batches(receiver):
+    endpoint = receiver()
+    writer = RemoteWriter(endpoint.url, batch_size=2, flush_interval=0.05).start()
+    writer.push("fw1", OUTPUT, 1700000000.5)
+    writer.close(timeout=5)
+    assert len(endpoint.requests) == 2
+    headers = endpoint.requests[0][0]
+    assert headers["Content-Encoding"] == "snappy"
+    assert headers["X-Prometheus-Remote-Write-Version"] == "0.1.0"
+    labels, points = endpoint.samples()[2]
+    assert labels == {
+        "__name__": "panos_system_uptime_seconds",
+        "instance": "fw1",
+        "job": "panos_exporter",
+    }
+    assert points == [(73971.0, 1700000000500)]
+    assert writer.stats["sent"] == 3
+
+
+def test_retries_with_backoff(receiver, monkeypatch):
+    monkeypatch.setattr("app.remote_write.MIN_BACKOFF", 0.01)
+    endpoint = receiver([503, 429])
+    writer = RemoteWriter(endpoint.url)
+    writer.push("fw1", OUTPUT, 1)
+    writer.flush()
+    assert writer.stats["retries"] == 2
+    assert writer.stats["sent"] == 3
+    assert len(endpoint.samples()) == 3
+
+
+def test_client_errors_are_not_retried(receiver):
+    endpoint = receiver([400])
+    writer = RemoteWriter(endpoint.url)
+    writer.push("fw1", OUTPUT, 1)
+    writer.flush()
+    assert writer.stats == {"sent": 0, "failed": 3, "dropped": 0, "retries": 0}
+    assert "panos_exporter_remote_write_samples_failed_total 3" in writer.metrics()
+
+
+def test_queue_is_bounded():
+    writer = RemoteWriter("http://127.0.0.1:9/", max_queue=4)
+    writer.push("fw1", OUTPUT, 1)
+    writer.push("fw2", OUTPUT, 2)
+    assert writer.queued() == 4
+    assert writer.stats["dropped"] == 2
+    batch = writer._take(wait=False)
+    assert dict(batch[0][0])["instance"] == "fw1"
+    assert len(decode_write_request(encode_write_request(batch))) == 4
+
+
+def test_poller_pushes_without_snapshot_store(receiver):
+    endpoint = receiver()
+    writer = RemoteWriter(endpoint.url, flush_interval=0.05)
+    config = {"devices": {"fw1": {}, "fw2": {}}}
+    Poller(config, None, exporter=FakeExporter(config["devices"]), remote_writer=writer).run_once()
+    writer.flush()
+    assert sorted(labels["instance"] for labels, _ in endpoint.samples()) == ["fw1", "fw2"]
@@ -1,9 +1,14 @@
+import threading
+import time
+
+import pytest
+from app.collectors import xml_backend
 from app.collectors.routing_bgp_collector import RoutingBgpCollector
 from app.collectors.routing_resource_collector import RoutingResourceCollector
 from app.collectors.routing_route_collector import RoutingRouteCollector
 from app.collectors.routing_summary_collector import RoutingSummaryCollector
 
-DEVICE = {"host": "192.168.1.25"}
+from conftest import BGP_LOC_RIB_XML, BGP_PEER_XML, DEVICE, ROUTE_XML, loc_rib
 
 RESOURCE_XML = """
 <response status="success">
@@ -36,33 +41,6 @@ SUMMARY_XML = """
 </response>
 """
 
-ROUTE_XML = """
-<response status="success">
-<result>
-<entry>
-<virtual-router>default</virtual-router>
-<destination>0.0.0.0/0</destination>
-<nexthop>14.203.227.233</nexthop>
-<metric/>
-<flags>A?B </flags>
-<age>101265</age>
-<interface/>
-<route-table>unicast</route-table>
-</entry>
-<entry>
-<virtual-router>default</virtual-router>
-<destination>10.0.32.0/28</destination>
-<nexthop>192.168.201.5</nexthop>
-<metric>10</metric>
-<flags>A S </flags>
-<age/>
-<interface>ethernet1/15</interface>
-<route-table>unicast</route-table>
-</entry>
-</result>
-</response>
-"""
-
 BGP_SUMMARY_XML = """
 <response status="success">
 <result>
@@ -76,25 +54,6 @@ BGP_SUMMARY_XML = """
 </response>
 """
 
-BGP_PEER_XML = """
-<response status="success">
-<result>
-<entry peer="PE1" vr="default">
-<peer-group>TPG-PE1</peer-group>
-<remote-as>2764</remote-as>
-<status>Established</status>
-<status-duration>101358</status-duration>
-<prefix-counter>
-<entry afi-safi="bgpAfiIpv4-unicast">
-<incoming-total>1</incoming-total>
-<incoming-accepted>1</incoming-accepted>
-</entry>
-</prefix-counter>
-</entry>
-</result>
-</response>
-"""
-
 BGP_PEER_GROUP_XML = """
 <response status="success">
 <result>
@@ -106,26 +65,6 @@ BGP_PEER_GROUP_XML = """
 </response>
 """
 
-BGP_LOC_RIB_XML = """
-<response status="success">
-<result>
-<entry vr="default">
-<loc-rib>
-<member>
-<prefix>0.0.0.0/0</prefix>
-<flag>*</flag>
-<nexthop>14.203.227.233</nexthop>
-<received-from>PE1</received-from>
-<as-path>2764</as-path>
-<attr><med>0</med><local-preference>200</local-preference></attr>
-<flap-stat><flap-count>0</flap-count></flap-stat>
-</member>
-</loc-rib>
-</entry>
-</result>
-</response>
-"""
-
 BGP_RIB_OUT_XML = """
 <response status="success">
 <result>
@@ -199,3 +138,159 @@ def test_parse_bgp_rib_out_detail():
     metrics = RoutingBgpCollector()._parse_rib_out_detail(BGP_RIB_OUT_XML, DEVICE)
     assert "panos_bgp_rib_out_route_info" in metrics
     assert 'peer="PE1"' in metrics
+
+
+def test_bgp_rib_aggregate():
+    collector = RoutingBgpCollector()
+    metrics = collector._aggregate_loc_rib(loc_rib(8), DEVICE)
+    assert "panos_bgp_loc_rib_route_info" not in metrics
+    assert 'panos_bgp_loc_rib_routes{virtual_router="dmz",best="yes"} 6' in metrics
+    assert 'panos_bgp_loc_rib_routes{virtual_router="dmz",best="no"} 2' in metrics
+    assert 'panos_bgp_loc_rib_peer_routes{virtual_router="default",peer="PE1",best="yes"} 4' in (
+        metrics
+    )
+    histogram = 'panos_bgp_loc_rib_route_prefix_length_bucket{virtual_router="default",afi="ipv4"'
+    assert f'{histogram},le="22"}} 3' in metrics
+    assert f'{histogram},le="+Inf"}} 8' in metrics
+    # "65001 {65002 65003}" is two hops, plus 0-2 more
+    assert 'panos_bgp_loc_rib_route_as_path_length_sum{virtual_router="default"} 23' in metrics
+    assert "# TYPE panos_bgp_loc_rib_route_med histogram" in metrics
+
+    rib_out = collector._aggregate_rib_out(BGP_RIB_OUT_XML, DEVICE)
+    assert (
+        'panos_bgp_rib_out_peer_routes{virtual_router="default",peer="PE1",'
+        'advertise_status="advertised"} 1' in rib_out
+    )
+
+
+NESTED_LOC_RIB_XML = BGP_LOC_RIB_XML.replace(
+    "<as-path>2764</as-path>",
+    "<as-path>2764</as-path>"
+    "<community><member>2764:100</member><member>2764:200</member></community>",
+)
+
+
+@pytest.mark.parametrize("backend", ["stdlib", "lxml"])
+def test_bgp_rib_aggregate_ignores_nested_members(backend):
+    name = xml_backend.backend_name()
+    try:
+        xml_backend.set_backend(backend)
+        metrics = RoutingBgpCollector()._aggregate_loc_rib(NESTED_LOC_RIB_XML, DEVICE)
+    finally:
+        xml_backend.set_backend(name)
+    assert 'panos_bgp_loc_rib_routes{virtual_router="default",best="yes"} 1' in metrics
+    assert 'best="no"' not in metrics
+    assert 'peer="unknown"' not in metrics
+    assert 'panos_bgp_loc_rib_peer_routes{virtual_router="default",peer="PE1",best="yes"} 1' in (
+        metrics
+    )
+
+
+def test_bgp_rib_aggregate_size_is_independent_of_rib_size():
+    collector = RoutingBgpCollector()
+    small = collector._aggregate_loc_rib(loc_rib(12), DEVICE)
+    large = collector._aggregate_loc_rib(loc_rib(3000), DEVICE)
+    assert len(small.splitlines()) == len(large.splitlines())
+
+
+def test_bgp_rib_mode_aggregate_scrape(monkeypatch):
+    collector = RoutingBgpCollector()
+
+    def fetch(ctx, cmd=None):
+        if "loc-rib-detail" in cmd:
+            return loc_rib(4)
+        if "rib-out-detail" in cmd:
+            return BGP_RIB_OUT_XML
+        return BGP_PEER_XML if "<peer>" in cmd else '<response status="success"/>'
+
+    monkeypatch.setattr(collector, "fetch", fetch)
+    device = {"host": "fw", "username": "u", "password": "p", "bgp_rib_mode": "aggregate"}
+    metrics = collector.collect(device)
+    assert "panos_bgp_loc_rib_routes" in metrics
+    assert "panos_bgp_rib_out_routes" in metrics
+    assert "panos_bgp_loc_rib_route_info" not in metrics
+    assert "panos_bgp_peer_up" in metrics
+
+
+MULTI_VR_SUMMARY_XML = """
+<response status="success">
+<result>
+<entry><All-Routes><total>3</total></All-Routes></entry>
+<entry name="default"><bgp/></entry>
+<entry name="dmz"><bgp/></entry>
+<entry name="mgmt"><bgp/></entry>
+</result>
+</response>
+"""
+
+
+def _route_fetcher(calls):
+    def fetch(ctx, cmd=None):
+        calls.append(cmd)
+        if "<summary>" in cmd:
+            return MULTI_VR_SUMMARY_XML
+        vr = cmd.split("<virtual-router>")[1].split("</virtual-router>")[0]
+        if vr == "broken":
+            raise RuntimeError("timeout")
+        return ROUTE_XML.replace("<virtual-router>default<", f"<virtual-router>{vr}<")
+
+    return fetch
+
+
+def test_route_collector_multiple_vrs(monkeypatch):
+    collector = RoutingRouteCollector()
+    calls = []
+    monkeypatch.setattr(collector, "fetch", _route_fetcher(calls))
+    device = {"host": "fw", "username": "u", "password": "p", "virtual_router": ["a", "b"]}
+    metrics = collector.collect(device)
+    assert 'virtual_router="a"' in metrics
+    assert 'virtual_router="b"' in metrics
+    assert len(calls) == 2
+
+
+def test_route_collector_auto_discovery(monkeypatch):
+    collector = RoutingRouteCollector()
+    calls = []
+    monkeypatch.setattr(collector, "fetch", _route_fetcher(calls))
+    device = {"host": "fw", "username": "u", "password": "p", "virtual_router": "auto"}
+    metrics = collector.collect(device)
+    for vr in ("default", "dmz", "mgmt"):
+        assert f'virtual_router="{vr}"' in metrics
+    collector.collect(device)
+    # Discovery is cached between scrapes
+    assert sum("<summary>" in c for c in calls) == 1
+
+
+def test_route_collector_partial_vr_failure(monkeypatch):
+    collector = RoutingRouteCollector()
+    monkeypatch.setattr(collector, "fetch", _route_fetcher([]))
+    device = {"host": "fw", "username": "u", "password": "p", "virtual_router": ["a", "broken"]}
+    metrics = collector.collect(device)
+    assert 'virtual_router="a"' in metrics
+    assert "routing_route_broken: timeout" in metrics
+
+
+def test_route_collector_fetches_vrs_concurrently_within_limit(monkeypatch):
+    collector = RoutingRouteCollector()
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def fetch(ctx, cmd=None):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return ROUTE_XML
+
+    monkeypatch.setattr(collector, "fetch", fetch)
+    device = {
+        "host": "fw",
+        "username": "u",
+        "password": "p",
+        "virtual_router": ["a", "b", "c", "d"],
+        "max_concurrent_requests": 2,
+    }
+    collector.collect(device)
+    assert in_flight[1] == 2
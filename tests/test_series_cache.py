@@ -0,0 +1,57 @@
+from app.collectors.routing_route_collector import RoutingRouteCollector
+from app.collectors.series_cache import SeriesCache
+
+from conftest import ROUTE_XML
+
+
+def test_prefix_rendering_and_reuse():
+    cache = SeriesCache()
+    with cache.scrape():
+        first = cache.prefix("panos_x", {"a": "1", "b": "2"})
+        assert first == 'panos_x{a="1",b="2"}'
+        assert cache.prefix("panos_x", {"a": "1", "b": "2"}) is first
+        assert cache.prefix("panos_y", None) == "panos_y"
+    assert len(cache) == 2
+
+
+def test_evicts_series_that_disappear():
+    cache = SeriesCache()
+    with cache.scrape():
+        cache.prefix("panos_x", {"peer": "a"})
+        cache.prefix("panos_x", {"peer": "b"})
+    with cache.scrape():
+        cache.prefix("panos_x", {"peer": "a"})
+    assert len(cache) == 1
+
+
+def test_collect_keeps_only_current_series(monkeypatch):
+    collector = RoutingRouteCollector()
+    device = {"host": "fw", "username": "u", "password": "p"}
+    payloads = iter([ROUTE_XML, ROUTE_XML.replace("10.0.32.0/28", "10.0.33.0/28")])
+    monkeypatch.setattr(collector, "fetch", lambda ctx, cmd=None: next(payloads))
+    first = collector.collect(device)
+    second = collector.collect(device)
+    assert 'destination="10.0.32.0/28"' in first
+    assert 'destination="10.0.33.0/28"' in second
+    cached = "".join(e[0] for e in collector.series_cache("fw")._entries.values())
+    assert "10.0.32.0/28" not in cached
+    assert "10.0.33.0/28" in cached
+
+
+def test_parse_cache_hit_keeps_series(monkeypatch):
+    collector = RoutingRouteCollector()
+    device = {"host": "fw", "username": "u", "password": "p"}
+    changed = ROUTE_XML.replace("10.0.32.0/28", "10.0.33.0/28")
+    payloads = iter([ROUTE_XML, ROUTE_XML, changed])
+    monkeypatch.setattr(collector, "fetch", lambda ctx, cmd=None: next(payloads))
+    cache = collector.series_cache("fw")
+    collector.collect(device)
+    rendered = dict(cache._entries)
+    collector.collect(device)
+    assert collector.parse_cache("fw").stats()[("response", "hits")] == 1
+    assert cache._entries == rendered
+    collector.collect(device)
+    # The unchanged default route was not rendered again
+    default = [k for k, e in rendered.items() if "0.0.0.0/0" in e[0]]
+    assert default
+    assert all(cache._entries[k] is rendered[k] for k in default)
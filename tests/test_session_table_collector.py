@@ -0,0 +1,110 @@
+import time
+
+from app.collectors import context
+from app.collectors.context import SessionPool
+from app.collectors.session_table_collector import (
+    PAGE_SIZE,
+    SessionAggregate,
+    SessionTableCollector,
+)
+
+from conftest import FakeResponse
+
+ENTRY = (
+    "<entry><idx>{idx}</idx><vsys>vsys1</vsys><from>{src}</from><to>untrust</to>"
+    "<application>{app}</application><proto>{proto}</proto></entry>"
+)
+
+
+def page(start, count, apps=("ssl", "dns")):
+    entries = "".join(
+        ENTRY.format(
+            idx=i,
+            src="trust" if i % 2 else "dmz",
+            app=apps[i % len(apps)],
+            proto="6" if i % 2 else "17",
+        )
+        for i in range(start, start + count)
+    )
+    return f'<response status="success"><result>{entries}</result></response>'
+
+
+class SessionTable:
+    """
+    Serves a session table of `total` entries in PAN-OS sized pages.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.starts = []
+
+    def get(self, url, params=None, **kwargs):
+        start = int(params["cmd"].split("<start-at>")[1].split("<")[0])
+        self.starts.append(start)
+        return FakeResponse(page(start, max(0, min(PAGE_SIZE, self.total - start + 1))))
+
+    def close(self):
+        pass
+
+
+def collect(monkeypatch, table, settings=None):
+    monkeypatch.setattr(context, "session_pool", SessionPool(factory=lambda: table))
+    device_config = {"host": "fw", "username": "u", "password": "p"}
+    if settings:
+        device_config["session_table"] = settings
+    return SessionTableCollector().collect(device_config)
+
+
+def test_aggregates_every_page(monkeypatch):
+    table = SessionTable(2500)
+    output = collect(monkeypatch, table)
+    assert table.starts == [1, 1025, 2049]
+    assert "panos_session_table_sessions_scanned 2500" in output
+    assert "panos_session_table_truncated 0" in output
+    assert 'panos_session_table_protocol_sessions{vsys="vsys1",protocol="tcp"} 1250' in output
+    zone_pair = 'vsys="vsys1",from_zone="dmz",to_zone="untrust"'
+    assert f"panos_session_table_zone_pair_sessions{{{zone_pair}}} 1250" in output
+
+
+def test_page_limit_truncates(monkeypatch):
+    table = SessionTable(5000)
+    output = collect(monkeypatch, table, {"max_pages": 2})
+    assert len(table.starts) == 2
+    assert "panos_session_table_sessions_scanned 2048" in output
+    assert "panos_session_table_truncated 1" in output
+
+
+class SlowTable(SessionTable):
+    """
+    Serves the first page, then hangs until the request's timeout.
+    """
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        if self.starts:
+            self.timeouts.append(timeout)
+            time.sleep(timeout)
+            raise TimeoutError("read timed out")
+        return super().get(url, params=params)
+
+
+def test_time_limit_bounds_page_fetch(monkeypatch):
+    table = SlowTable(5000)
+    table.timeouts = []
+    output = collect(monkeypatch, table, {"max_seconds": 0.05})
+    assert table.timeouts[0] <= 0.05
+    assert "panos_session_table_sessions_scanned 1024" in output
+    assert "panos_session_table_truncated 1" in output
+
+
+def test_short_last_page_is_not_truncated(monkeypatch):
+    table = SessionTable(1500)
+    output = collect(monkeypatch, table, {"max_pages": 2})
+    assert "panos_session_table_truncated 0" in output
+
+
+def test_cardinality_cap_folds_into_other():
+    aggregate = SessionAggregate(max_series=2)
+    aggregate.add_page(page(1, 10, apps=("a", "b", "c", "d", "e")))
+    apps = aggregate.counts["application"]
+    assert len(apps) == 3
+    assert apps[("vsys1", "__other__")] == 6
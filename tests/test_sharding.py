@@ -0,0 +1,48 @@
+import pytest
+from app.poller import Poller
+from app.sharding import HashRing, Shard, shard_from_env
+from app.snapshot_store import SnapshotStore
+
+from conftest import FakeExporter
+
+DEVICES = [f"10.0.{i // 256}.{i % 256}" for i in range(2000)]
+
+
+def test_owner_is_stable_and_balanced():
+    ring = HashRing(["a:9654", "b:9654", "c:9654"])
+    again = HashRing(["c:9654", "a:9654", "b:9654"])
+    assert all(ring.owner(d) == again.owner(d) for d in DEVICES)
+    counts = {r: len(ds) for r, ds in ring.assignments(DEVICES).items()}
+    assert sum(counts.values()) == len(DEVICES)
+    assert all(400 < n < 950 for n in counts.values())
+
+
+def test_adding_replica_moves_about_one_nth():
+    before = HashRing(["a:9654", "b:9654", "c:9654"])
+    after = HashRing(["a:9654", "b:9654", "c:9654", "d:9654"])
+    moved = [d for d in DEVICES if before.owner(d) != after.owner(d)]
+    assert all(after.owner(d) == "d:9654" for d in moved)
+    assert 0.15 < len(moved) / len(DEVICES) < 0.35
+
+
+def test_shard_from_env(monkeypatch):
+    monkeypatch.delenv("SHARD_REPLICAS", raising=False)
+    assert shard_from_env() is None
+    monkeypatch.setenv("SHARD_REPLICAS", "a:9654, b:9654")
+    monkeypatch.setenv("SHARD_SELF", "b:9654")
+    shard = shard_from_env()
+    assert shard.ring.replicas == ["a:9654", "b:9654"]
+    assert shard.misdirected == "redirect"
+    monkeypatch.setenv("SHARD_SELF", "c:9654")
+    with pytest.raises(ValueError):
+        shard_from_env()
+
+
+def test_poller_collects_only_owned_devices(tmp_path):
+    devices = DEVICES[:50]
+    shard = Shard(HashRing(["a:9654", "b:9654"]), "a:9654")
+    exporter = FakeExporter(devices)
+    store = SnapshotStore(str(tmp_path))
+    Poller({"devices": {}}, store, exporter=exporter, shard=shard).run_once()
+    assert sorted(exporter.calls) == sorted(shard.owned(devices))
+    assert 0 < len(exporter.calls) < len(devices)
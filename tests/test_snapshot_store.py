@@ -0,0 +1,62 @@
+import time
+
+import pytest
+from app.poller import Poller, main
+from app.snapshot_store import SnapshotStore
+
+from conftest import FakeExporter
+
+
+def test_write_and_read(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    assert store.read("192.168.1.1") is None
+    store.write("192.168.1.1", "panos_up 1\n", timestamp=1000.0)
+    assert store.read("192.168.1.1") == (1000.0, b"panos_up 1\n")
+
+
+def test_reader_sees_replaced_snapshot(tmp_path):
+    writer = SnapshotStore(str(tmp_path))
+    reader = SnapshotStore(str(tmp_path))
+    writer.write("fw/1", "panos_up 1\n", timestamp=1.0)
+    assert reader.read("fw/1")[1] == b"panos_up 1\n"
+    writer.write("fw/1", "panos_up 0\n", timestamp=2.0)
+    assert reader.read("fw/1") == (2.0, b"panos_up 0\n")
+    reader.close()
+
+
+def test_poller_publishes_every_device(tmp_path):
+    config = {"devices": {"fw1": {}, "fw2": {}, "broken": {}}}
+    store = SnapshotStore(str(tmp_path))
+    exporter = FakeExporter(config["devices"])
+    Poller(config, store, exporter=exporter).run_once()
+    assert sorted(exporter.calls) == ["broken", "fw1", "fw2"]
+    assert store.read("fw2")[1] == b'panos_up{device="fw2"} 1\n'
+    assert store.read("broken") is None
+
+
+def test_poller_publishes_targets_before_polling(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    assert store.read_targets() is None
+    exporter = FakeExporter(["fw1", "0123456789"])
+    published = []
+    exporter.collect_metrics = lambda target, deadline=None: (
+        published.append(store.read_targets()) or ""
+    )
+    Poller({"devices": {"fw1": {}}}, store, exporter=exporter).run_once()
+    assert published == [["fw1", "0123456789"]] * 2
+    assert store.read_targets() == ["fw1", "0123456789"]
+
+
+def test_poller_bounds_each_device(tmp_path):
+    exporter = FakeExporter(["fw1"])
+    deadlines = []
+    exporter.collect_metrics = lambda target, deadline=None: deadlines.append(deadline) or ""
+    Poller({"devices": {}}, None, exporter=exporter, interval=30, device_timeout=5).run_once()
+    assert 4 < deadlines[0] - time.monotonic() <= 5
+
+
+def test_poller_requires_an_output(monkeypatch):
+    monkeypatch.delenv("SNAPSHOT_DIR", raising=False)
+    monkeypatch.delenv("REMOTE_WRITE_URL", raising=False)
+    with pytest.raises(ValueError, match="SNAPSHOT_DIR"):
+        main()
@@ -0,0 +1,94 @@
+import time
+
+from app.collectors.routing_route_collector import RoutingRouteCollector
+from app.poller import Poller
+from app.snapshot_store import SnapshotStore
+from app.warm_state import HEADER, WarmState
+
+
+class FakeExporter:
+    def __init__(self, targets):
+        self._targets = targets
+        self.imported = None
+
+    def targets(self):
+        return list(self._targets)
+
+    def collect_metrics(self, target, deadline=None):
+        return f'panos_up{{device="{target}"}} 1\n'
+
+    def export_state(self):
+        return {"collectors": {"x": [1, 2]}}
+
+    def import_state(self, state):
+        self.imported = state
+
+
+def test_round_trip(tmp_path):
+    warm = WarmState(str(tmp_path / "warm.state"))
+    assert warm.load() == ({}, {})
+    warm.save({"fw1": (10.0, "panos_up 1\n")}, {"collectors": {}})
+    assert warm.load() == ({"fw1": (10.0, "panos_up 1\n")}, {"collectors": {}})
+
+
+def test_other_version_ignored(tmp_path):
+    path = tmp_path / "warm.state"
+    WarmState(str(path)).save({"fw1": (10.0, "x")}, {})
+    data = bytearray(path.read_bytes())
+    data[4:6] = (99).to_bytes(2, "little")
+    path.write_bytes(bytes(data))
+    assert WarmState(str(path)).load() == ({}, {})
+    path.write_bytes(b"garbage"[: HEADER.size - 1])
+    assert WarmState(str(path)).load() == ({}, {})
+
+
+def test_poller_restores_then_refreshes(tmp_path):
+    warm = WarmState(str(tmp_path / "warm.state"))
+    warm.save(
+        {"fw1": (10.0, 'panos_up{device="fw1"} 1\n'), "gone": (10.0, "x")},
+        {"collectors": {"x": [1]}},
+    )
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    exporter = FakeExporter(["fw1", "fw2"])
+    poller = Poller({"devices": {}}, store, exporter=exporter, warm_state=warm)
+
+    assert not store.is_ready()
+    poller.restore()
+    assert store.is_ready()
+    assert exporter.imported == {"collectors": {"x": [1]}}
+    snapshot = store.read_snapshot("fw1")
+    assert snapshot.timestamp == 10.0 and snapshot.restored
+    assert store.read("gone") is None
+
+    poller.run_once()
+    poller.persist()
+    assert not store.read_snapshot("fw1").restored
+    snapshots, state = warm.load()
+    assert set(snapshots) == {"fw1", "fw2"}
+    assert snapshots["fw1"][0] > 10.0
+    assert state == {"collectors": {"x": [1, 2]}}
+
+
+def test_route_discovery_survives_restart():
+    collector = RoutingRouteCollector()
+    collector._discovered["fw"] = (time.monotonic() + 100, ["vr1", "vr2"])
+    restored = RoutingRouteCollector()
+    restored.import_state(collector.export_state())
+    expires, names = restored._discovered["fw"]
+    assert names == ["vr1", "vr2"]
+    assert 90 < expires - time.monotonic() <= 100
+
+
+def test_persist_in_background_on_interval(tmp_path):
+    warm = WarmState(str(tmp_path / "warm.state"))
+    poller = Poller(
+        {"devices": {}}, None, exporter=FakeExporter(["fw1"]), warm_state=warm, persist_interval=60
+    )
+    assert poller.persist_in_background() is None
+    poller.run_once()
+    thread = poller.persist_in_background()
+    thread.join(5)
+    assert set(warm.load()[0]) == {"fw1"}
+    # Within the interval nothing is saved, even after new polls
+    poller.run_once()
+    assert poller.persist_in_background() is None
@@ -0,0 +1,46 @@
+import pytest
+from app.collectors import xml_backend
+from app.collectors.global_counter_collector import GlobalCounterCollector
+from app.collectors.routing_bgp_collector import RoutingBgpCollector
+from app.collectors.routing_route_collector import RoutingRouteCollector
+
+from conftest import BGP_LOC_RIB_XML, BGP_PEER_XML, COUNTER_XML, DEVICE, ROUTE_XML
+
+
+@pytest.fixture
+def restore_backend():
+    name = xml_backend.backend_name()
+    yield
+    xml_backend.set_backend(name)
+
+
+def render_all():
+    bgp = RoutingBgpCollector()
+    return [
+        RoutingRouteCollector().parse(ROUTE_XML, DEVICE),
+        bgp._parse_peer(BGP_PEER_XML, DEVICE),
+        bgp._parse_loc_rib_detail(BGP_LOC_RIB_XML, DEVICE),
+        GlobalCounterCollector().parse(COUNTER_XML, DEVICE),
+    ]
+
+
+def test_stdlib_backend(restore_backend):
+    backend = xml_backend.set_backend("stdlib")
+    root = backend.fromstring(ROUTE_XML)
+    assert len(xml_backend.findall(root, ".//result/entry")) == 2
+    entries = list(xml_backend.iterparse(ROUTE_XML, "entry"))
+    assert [e.findtext("destination") for e in entries] == ["0.0.0.0/0", "10.0.32.0/28"]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        xml_backend.load_backend("expat")
+
+
+def test_lxml_matches_stdlib(restore_backend):
+    pytest.importorskip("lxml")
+    xml_backend.set_backend("stdlib")
+    expected = render_all()
+    xml_backend.set_backend("lxml")
+    assert xml_backend.backend_name() == "lxml"
+    assert render_all() == expected